@@ -1,19 +1,36 @@
 import argparse
-import dpkt
-import socket
 import os
 import sys
 import glob
 import gzip
+import heapq
+import multiprocessing
 
-from helper.csv_writer import write_to_csv, read_from_csv
+import numpy as np
+
+from helper.csv_writer import write_to_csv, read_from_csv, recompress_csv
 from helper.pcap_data import PcapData, DataInfo
 from helper.create_plots import plot_all
-from helper.util import check_directory, print_line, open_compressed_file, colorize
+from helper.html_report import write_report
+from helper.util import check_directory, print_line, colorize, print_warning
+from helper.util import find_capture_files
+from helper.capture import order_chunks, read_chunks
+from helper.profiler import StageProfiler
+from helper.measurement import check_measurement
+from helper.fidelity import check_fidelity, fidelity_series
+from helper.log_parser import parse_flow_file, parse_buffer_file
+from helper.flow_index import FlowIndex
+from helper.quantiles import QuantileSketch
+from helper.packet_join import PacketJoin
+from helper.resample import TimeGrid, HOLD, MEAN
+from helper.rates import CumulativeSeries, rate_grid, sliding_rates, parse_window, RTT_WINDOW
+from helper.results_index import open_index, index_run
+from helper.manifest import Manifest, input_files, directory_files
 
 from helper import PCAP1, PCAP2, PLOT_PATH, CSV_PATH, PLOT_TYPES
 from helper import BUFFER_FILE_EXTENSION, FLOW_FILE_EXTENSION
 from helper import COMPRESSION_METHODS, COMPRESSION_EXTENSIONS
+from helper import FCT_SIZE_BUCKETS, PROFILE_FILE, PROFILE_PATH, INDEX_FILE, JOIN_WINDOW, HTML_PATH
 
 
 def main():
@@ -29,10 +46,22 @@ def main():
     parser.add_argument('-t', dest='delta_t',
                         default='0.2', help='Interval in seconds for computing average throughput,... '
                                             '(default: 0.2)')
+    parser.add_argument('-w', dest='join_window', type=float, default=JOIN_WINDOW,
+                        help='Seconds after which a packet that has not arrived behind the bottleneck is counted as '
+                             'dropped. (default: {})'.format(JOIN_WINDOW))
+    parser.add_argument('--rate-window', dest='rate_window', type=parse_window,
+                        help='Compute sending rate, throughput and goodput over a sliding window of this many seconds, '
+                             'or "rtt" for the minimum RTT of each connection, instead of fixed intervals.')
+    parser.add_argument('--rate-step', dest='rate_step', type=float,
+                        help='Interval in seconds between the values of the sliding window rates. '
+                             '(default: value of -t)')
     parser.add_argument('-r', dest='recursive', action='store_true',
                         help='Process all sub-directories recursively.')
     parser.add_argument('-n', dest='new', action='store_true',
-                        help='Only process new (unprocessed) directories.')
+                        help='Only process directories that have not been analyzed completely, regardless of '
+                             'changed inputs or options.')
+    parser.add_argument('-f', dest='force', action='store_true',
+                        help='Redo all stages, even if inputs, options and outputs are unchanged.')
     parser.add_argument('--hide-total', dest='hide_total', action='store_true',
                         help='Hide total values in plots for sending rate, throughput, ...')
     parser.add_argument('-a --add-plot', action='append', choices=PLOT_TYPES, dest='added_plots',
@@ -42,8 +71,23 @@ def main():
     parser.add_argument('-c --compression', dest='compression',
                         choices=COMPRESSION_METHODS, default=COMPRESSION_METHODS[1],
                         help='Compression method of the output files. Default: {}'.format(COMPRESSION_METHODS[1]))
+    parser.add_argument('-j', dest='processes', type=int, default=multiprocessing.cpu_count(),
+                        help='Number of processes decoding the chunks of rotated captures in parallel. '
+                             '(default: number of CPUs)')
+    parser.add_argument('--profile', dest='profile', action='store_true',
+                        help='Measure wall time, CPU time and peak memory of each stage and write them to {}. '
+                             'Memory tracing slows down the analysis.'.format(PROFILE_FILE))
+    parser.add_argument('--cprofile', dest='cprofile', action='store_true',
+                        help='Additionally run cProfile for each stage, the statistics are stored in {}/.'.format(
+                            PROFILE_PATH))
+    parser.add_argument('--html', dest='html', action='store_true',
+                        help='Additionally write an interactive HTML report of the plot types to {}/.'.format(
+                            HTML_PATH))
     parser.add_argument('--all-plots', dest='all_plots', action='store_true',
                         help='Additionally store each plot in an individual PDF file.')
+    parser.add_argument('--index', dest='index',
+                        help='SQLite results index to add the analyzed runs to. '
+                             '(default: {} in the directory with -r, none otherwise)'.format(INDEX_FILE))
 
     args = parser.parse_args()
 
@@ -60,56 +104,163 @@ def main():
 
     if args.recursive:
         for subdirs, _, _ in os.walk(directory):
-            if check_directory(subdirs, only_new=args.new):
+            if check_directory(subdirs):
                 paths.append(subdirs)
     else:
-        if check_directory(directory, only_new=args.new):
+        if check_directory(directory):
             paths = [directory]
+    if args.new:
+        paths = [p for p in paths if not is_complete(Manifest(p), args.output, args.html)]
     print('Found {} valid sub directories.'.format(len(paths)))
 
     paths = sorted(paths)
 
-    for i, directory in enumerate(paths):
-        print('{}/{} Processing {}'.format(i + 1, len(paths), directory))
-        if args.source is 'pcap':
+    profiler = StageProfiler(enabled=args.profile or args.cprofile, cprofile=args.cprofile)
 
-            pcap_data = parse_pcap(path=directory, delta_t=float(args.delta_t))
+    index_path = args.index
+    if index_path is None and args.recursive:
+        index_path = os.path.join(directory, INDEX_FILE)
+    index = open_index(index_path) if index_path is not None else None
+    # run directories are stored relative to the directory of the index
+    index_root = os.path.dirname(os.path.abspath(index_path)) if index_path is not None else None
+    summaries = []
 
-            if 'csv' in args.output:
-                string = 'Writing to CSV'
-                if args.compression != COMPRESSION_METHODS[0]:
-                    string += ' and compressing with {}'.format(args.compression)
-                print(string)
-                write_to_csv(directory, pcap_data, compression=args.compression)
-        else:
-            pcap_data = read_from_csv(directory)
-            if pcap_data == -1:
+    for i, directory in enumerate(paths):
+        print('{}/{} Processing {}'.format(i + 1, len(paths), directory))
+        for warning in check_measurement(directory) + check_fidelity(directory):
+            print_warning('  {}'.format(warning))
+        profiler.start()
+
+        try:
+            manifest = Manifest(directory)
+            if args.force:
+                manifest.invalidate()
+
+            csv_path = os.path.join(directory, CSV_PATH)
+            plot_options = {'plots': plots, 'hide_total': args.hide_total, 'all_plots': args.all_plots}
+            if args.source == 'pcap':
+                source = manifest.key(input_files(directory), {'delta_t': float(args.delta_t),
+                                                               'join_window': args.join_window,
+                                                               'rate_window': args.rate_window,
+                                                               'rate_step': args.rate_step})
+                csv_key = manifest.key([], {'source': source, 'compression': args.compression})
+                # the csv files hold the parsed data of the current inputs
+                csv_valid = manifest.is_current('csv', source=source)
+                csv_current = manifest.is_current('csv', key=csv_key)
+            else:
+                source = manifest.key(directory_files(csv_path), {})
+                csv_valid = csv_current = True
+            plot_key = manifest.key([], dict(plot_options, source=source))
+
+            write_csv = 'csv' in args.output and not csv_current
+            create_plots = 'pdf' in args.output and not manifest.is_current('plot', key=plot_key)
+            report_key = manifest.key([], {'plots': plots, 'source': source})
+            create_report = args.html and not manifest.is_current('report', key=report_key)
+            profiler.lap('manifest')
+
+            if not write_csv and not create_plots and not create_report:
+                print('  Inputs, options and outputs unchanged, nothing to do.')
                 continue
 
-        if 'pdf' in args.output:
-            if args.all_plots:
-                print('Creating {} plots'.format(len(plots) + 1))
+            if not csv_valid:
+                pcap_data = parse_pcap(path=directory, delta_t=float(args.delta_t), processes=args.processes,
+                                       profiler=profiler, join_window=args.join_window,
+                                       rate_window=args.rate_window, rate_step=args.rate_step)
+
+                if write_csv:
+                    manifest.invalidate('csv')
+                    string = 'Writing to CSV'
+                    if args.compression != COMPRESSION_METHODS[0]:
+                        string += ' and compressing with {}'.format(args.compression)
+                    print(string)
+                    write_to_csv(directory, pcap_data, compression=args.compression)
+                    manifest.record('csv', csv_key, directory_files(csv_path), source=source)
+                    profiler.lap('csv writing')
             else:
-                print('Creating Complete plot')
-            plot_all(directory, pcap_data, plot_only=plots, hide_total=args.hide_total, all_plots=args.all_plots)
-
-
-def parse_pcap(path, delta_t):
-    # Find correct .pcap files
-    pcap1 = glob.glob(os.path.join(path, PCAP1 + '*'))[0]
-    pcap2 = glob.glob(os.path.join(path, PCAP2 + '*'))[0]
-
-    total_packets = len(list(dpkt.pcap.Reader(open_compressed_file(pcap1)))) + \
-                    len(list(dpkt.pcap.Reader(open_compressed_file(pcap1))))
-    print('  Found {} frames.'.format(colorize(total_packets, 'green')))
-    processed_packets = 0
-
-    f = open_compressed_file(pcap1)
-
-    pcap = dpkt.pcap.Reader(f)
+                if write_csv:
+                    # only the compression has changed
+                    print('Compressing CSV with {}'.format(args.compression))
+                    recompress_csv(directory, args.compression)
+                    manifest.record('csv', csv_key, directory_files(csv_path), source=source)
+                    profiler.lap('csv writing')
+                if not create_plots and not create_report:
+                    pcap_data = None
+                else:
+                    pcap_data = read_from_csv(directory)
+                    profiler.lap('csv reading')
+                    if pcap_data == -1:
+                        continue
+
+            if create_plots:
+                manifest.invalidate('plot')
+                if args.all_plots:
+                    print('Creating {} plots'.format(len(plots) + 1))
+                else:
+                    print('Creating Complete plot')
+                plot_all(directory, pcap_data, plot_only=plots, hide_total=args.hide_total, all_plots=args.all_plots)
+                manifest.record('plot', plot_key, directory_files(os.path.join(directory, PLOT_PATH)))
+                profiler.lap('plotting')
+
+            if create_report:
+                manifest.invalidate('report')
+                print('Creating HTML report')
+                report_path = os.path.join(directory, HTML_PATH)
+                write_report(directory, pcap_data, os.path.basename(os.path.abspath(directory)), plots)
+                manifest.record('report', report_key, [os.path.join(root, f) for root, _, files in os.walk(report_path)
+                                                       for f in files])
+                profiler.lap('html report')
+
+            if index is not None and os.path.isdir(csv_path):
+                index_run(index, index_root, os.path.abspath(directory), pcap_data, force=pcap_data is not None)
+                profiler.lap('indexing')
+        finally:
+            # also for directories with nothing to do or unreadable csv files
+            if profiler.enabled:
+                profiler.stop()
+                profiler.write_report(directory)
+                summaries.append('{}: {}'.format(directory, profiler.summary()))
+                print('Profile: {}'.format(profiler.summary()))
+
+    if len(summaries) > 1:
+        print('Profile summary:')
+        for summary in summaries:
+            print('  {}'.format(summary))
+
+    if index is not None:
+        index.close()
+        print('Updated results index {}'.format(index_path))
+
+
+def is_complete(manifest, output, html=False):
+    stages = {'csv': 'csv', 'pdf': 'plot'}
+    complete = all(manifest.is_current(stages[o]) for o in output.split('+'))
+    return complete and (not html or manifest.is_current('report'))
+
+
+def parse_pcap(path, delta_t, processes=1, profiler=None, join_window=JOIN_WINDOW, rate_window=None, rate_step=None):
+    """
+    Without rate_window sending rate, throughput and goodput are averaged over fixed intervals of delta_t. Otherwise
+    they are computed over a sliding window of rate_window seconds (or the minimum RTT of each connection) every
+    rate_step seconds (default: delta_t).
+    """
+    profiler = profiler or StageProfiler()
+    sliding = rate_window is not None
+
+    # A capture is a single file or, if tcpdump rotated it, a list of chunks
+    pcap1_chunks = order_chunks(find_capture_files(os.path.join(path, PCAP1)))
+    pcap2_chunks = order_chunks(find_capture_files(os.path.join(path, PCAP2)))
+
+    sizes = dict((chunk, os.path.getsize(chunk)) for chunk in pcap1_chunks + pcap2_chunks)
+    total_size = sum(sizes.values())
+    print('  Found {} capture files ({:.1f} MB).'.format(colorize(len(sizes), 'green'), total_size / 1e6))
+
+    # Both captures are read in a single pass, merged in time order, so that every packet behind the
+    # bottleneck can be matched with its departure before the bottleneck
+    packets = merge_captures([pcap1_chunks, pcap2_chunks], processes, sizes, total_size)
 
     connections = []
-    active_connections = []
+    connection_ids = {}
+    active_connections = set()
 
     round_trips = {}
     inflight = {}
@@ -124,6 +275,7 @@ def parse_pcap(path, delta_t):
     inflight_avg = {}
 
     avg_rtt_samples = {}
+    rtt_sketches = {}
 
     total_throughput = ([], [])
     total_sending_rate = ([], [])
@@ -141,32 +293,103 @@ def parse_pcap(path, delta_t):
     ts_vals = {}
     seqs = {}
 
+    syn_ts = {}
+    fin_seq = {}
+    ack_advance_ts = {}
+    completion_ts = {}
+
     start_ts = -1
 
+    # Throughput after the bottleneck, every tuple maps to the connection its SYN passed the bottleneck with
+    s3_connection_ids = {}
+    s3_active_connections = set()
+    throughput = {}
+    goodput = {}
+
+    throughput_data_size = {}
+    # new data behind the bottleneck, i.e. advances of the highest sequence number
+    goodput_data_size = {}
+    s3_start_seq = {}
+    s3_highest_seq = {}
+    total_goodput = ([], [])
+
+    # bits sent, received and new data received up to each packet, for the sliding window rates
+    sent_bits = {}
+    received_bits = {}
+    goodput_bits = {}
+
+    throughput_t = 0
+
+    join = PacketJoin(join_window)
+
     print('Connections:')
-    for ts, buf in pcap:
+    for _, capture, packet in packets:
+        ts, tcp_tuple, from_client, flags, seq, ack, ip_len, ts_val, ts_ecr, ip_id, payload = packet
         if start_ts < 0:
             start_ts = ts
             t = start_ts + delta_t
+            throughput_t = start_ts + delta_t
+
+        if capture == 1:
+            while ts >= throughput_t:
+                total_throughput[0].append(throughput_t)
+                total_throughput[1].append(0)
+                total_goodput[0].append(throughput_t)
+                total_goodput[1].append(0)
+
+                for c in s3_active_connections:
+                    i = s3_connection_ids[c]
+                    tp = float(throughput_data_size[i]) / delta_t
+                    throughput[i][0].append(throughput_t)
+                    throughput[i][1].append(tp)
+                    total_throughput[1][-1] += tp
+                    throughput_data_size[i] = 0
+
+                    gp = float(goodput_data_size[i]) / delta_t
+                    goodput[i][0].append(throughput_t)
+                    goodput[i][1].append(gp)
+                    total_goodput[1][-1] += gp
+                    goodput_data_size[i] = 0
+                throughput_t += delta_t
+
+            if is_new_connection(flags, tcp_tuple, s3_connection_ids, s3_active_connections) and \
+                    tcp_tuple in connection_ids:
+                # the last connection of this tuple before the bottleneck
+                connection_index = connection_ids[tcp_tuple]
+                s3_connection_ids[tcp_tuple] = connection_index
+                s3_active_connections.add(tcp_tuple)
+                s3_start_seq[connection_index] = seq
+                # the SYN occupies the first sequence number
+                s3_highest_seq[connection_index] = 1
+
+            if tcp_tuple not in s3_connection_ids:
+                # no SYN of this connection has passed the bottleneck
+                continue
 
-        processed_packets += 1
-        if processed_packets % 500 == 0:
-            print_progress(processed_packets, total_packets)
-
-        eth = dpkt.ethernet.Ethernet(buf)
-        ip = eth.data
-        tcp = ip.data
+            connection_index = s3_connection_ids[tcp_tuple]
+            if from_client and payload > 0:
+                # a FIN may carry the last data of the connection
+                end_seq = unwrap_seq(seq, s3_start_seq[connection_index], s3_highest_seq[connection_index]) + payload
+                if end_seq > s3_highest_seq[connection_index]:
+                    goodput_data_size[connection_index] += (end_seq - s3_highest_seq[connection_index]) * 8
+                    if sliding:
+                        goodput_bits[connection_index].add(ts, (end_seq - s3_highest_seq[connection_index]) * 8)
+                    s3_highest_seq[connection_index] = end_seq
+
+            if flags & 0x01:
+                if tcp_tuple in s3_active_connections:
+                    s3_active_connections.remove(tcp_tuple)
+                continue
 
-        src_ip = socket.inet_ntoa(ip.src)
-        dst_ip = socket.inet_ntoa(ip.dst)
-        src_port = tcp.sport
-        dst_port = tcp.dport
+            if from_client:
+                # client -> server
+                throughput_data_size[connection_index] += ip_len * 8
+                if sliding:
+                    received_bits[connection_index].add(ts, ip_len * 8)
 
-        # identify a connection always as (client port, server port)
-        if src_port > dst_port:
-            tcp_tuple = (src_ip, src_port, dst_ip, dst_port)
-        else:
-            tcp_tuple = (dst_ip, dst_port, src_ip, src_port)
+                if payload > 0:
+                    join.arrival(ts, connection_index, seq, ip_id)
+            continue
 
         while ts >= t:
 
@@ -177,10 +400,8 @@ def parse_pcap(path, delta_t):
             total_retransmisions[1].append(0)
             total_retransmisions[2].append(0)
 
-            for i, c in enumerate(connections):
-
-                if c not in active_connections:
-                    continue
+            for c in active_connections:
+                i = connection_ids[c]
 
                 tp = float(sending_rate_data_size[i]) / delta_t
                 sending_rate[i][0].append(t)
@@ -212,12 +433,15 @@ def parse_pcap(path, delta_t):
 
             t += delta_t
 
-        if tcp.flags & 0x02 and tcp_tuple not in connections:
+        if is_new_connection(flags, tcp_tuple, connection_ids, active_connections):
+            connection_index = len(connections)
             connections.append(tcp_tuple)
-            active_connections.append(tcp_tuple)
-            connection_index = connections.index(tcp_tuple)
+            connection_ids[tcp_tuple] = connection_index
+            active_connections.add(tcp_tuple)
 
-            start_seq[connection_index] = tcp.seq
+            start_seq[connection_index] = seq
+            syn_ts[connection_index] = ts
+            ack_advance_ts[connection_index] = ts
 
             round_trips[connection_index] = ([], [])
             inflight[connection_index] = ([], [])
@@ -233,8 +457,18 @@ def parse_pcap(path, delta_t):
             inflight_avg[connection_index] = []
 
             sending_rate_data_size[connection_index] = 0
+            sent_bits[connection_index] = CumulativeSeries()
+
+            throughput[connection_index] = ([], [])
+            throughput_data_size[connection_index] = 0
+            goodput[connection_index] = ([], [])
+            goodput_data_size[connection_index] = 0
+            received_bits[connection_index] = CumulativeSeries()
+            goodput_bits[connection_index] = CumulativeSeries()
 
             avg_rtt_samples[connection_index] = []
+            rtt_sketches[connection_index] = QuantileSketch()
+            join.add_connection(connection_index)
 
             retransmissions[connection_index] = ([],)
             retransmission_counter[connection_index] = 0
@@ -244,34 +478,41 @@ def parse_pcap(path, delta_t):
             print('  [SYN] {}:{} -> {}:{}'.format(tcp_tuple[0], tcp_tuple[1],
                                                   tcp_tuple[2], tcp_tuple[3]))
 
-        if tcp.flags & 0x01:
+        if flags & 0x01:
             if tcp_tuple in active_connections:
                 active_connections.remove(tcp_tuple)
                 print('  [FIN] {}:{} -> {}:{}'.format(tcp_tuple[0], tcp_tuple[1],
                                                       tcp_tuple[2], tcp_tuple[3]))
-            continue
 
-        connection_index = connections.index(tcp_tuple)
-
-        ts_val = None
-        ts_ecr = None
+            if tcp_tuple in connection_ids:
+                connection_index = connection_ids[tcp_tuple]
+                if from_client:
+                    if connection_index not in fin_seq:
+                        fin_seq[connection_index] = (seq - start_seq[connection_index]) % 2 ** 32
+                        # all data might have been acknowledged before the FIN was sent
+                        if inflight_ack[connection_index] >= fin_seq[connection_index]:
+                            completion_ts[connection_index] = ack_advance_ts[connection_index]
+                elif flags & 0x10:
+                    check_completion(connection_index, (ack - start_seq[connection_index]) % 2 ** 32, ts,
+                                     fin_seq, completion_ts)
+            continue
 
-        options = dpkt.tcp.parse_opts(tcp.opts)
-        for opt in options:
-            if opt[0] == dpkt.tcp.TCP_OPT_TIMESTAMP:
-                ts_val = reduce(lambda x, r: (x << 8) + r, map(ord, opt[1][:4]))
-                ts_ecr = reduce(lambda x, r: (x << 8) + r, map(ord, opt[1][4:]))
+        connection_index = connection_ids[tcp_tuple]
 
-        if src_port > dst_port:
+        if from_client:
             # client -> server
-            tcp_seq = tcp.seq - start_seq[connection_index]
+            tcp_seq = seq - start_seq[connection_index]
             if tcp_seq < 0:
                 tcp_seq += 2 ** 32
 
             packet_counter[connection_index] += 1
+            if payload > 0:
+                join.departure(ts, connection_index, seq, ip_id)
 
             inflight_seq[connection_index] = max(tcp_seq, inflight_seq[connection_index])
-            sending_rate_data_size[connection_index] += ip.len * 8
+            sending_rate_data_size[connection_index] += ip_len * 8
+            if sliding:
+                sent_bits[connection_index].add(ts, ip_len * 8)
 
             if tcp_seq in seqs[connection_index]:
                 retransmissions[connection_index][0].append(ts)
@@ -285,11 +526,14 @@ def parse_pcap(path, delta_t):
 
         else:
             # server -> client
-            tcp_ack = tcp.ack - start_seq[connection_index]
+            tcp_ack = ack - start_seq[connection_index]
             if tcp_ack < 0:
                 tcp_ack += 2 ** 32
 
+            if tcp_ack > inflight_ack[connection_index]:
+                ack_advance_ts[connection_index] = ts
             inflight_ack[connection_index] = max(tcp_ack, inflight_ack[connection_index])
+            check_completion(connection_index, tcp_ack, ts, fin_seq, completion_ts)
 
             seqs[connection_index] = [x for x in seqs[connection_index] if x >= tcp_ack]
 
@@ -301,6 +545,7 @@ def parse_pcap(path, delta_t):
                 ts_vals[connection_index][1].pop(index)
 
                 avg_rtt_samples[connection_index].append(rtt)
+                rtt_sketches[connection_index].add(rtt)
 
                 round_trips[connection_index][0].append(ts)
                 round_trips[connection_index][1].append(rtt)
@@ -308,98 +553,60 @@ def parse_pcap(path, delta_t):
         inflight_data = max(0, inflight_seq[connection_index] - inflight_ack[connection_index])
         inflight_avg[connection_index].append(inflight_data * 8)
 
-    f.close()
-
-    # Compute throughput after the bottleneck
-    f = open_compressed_file(pcap2)
-
-    pcap = dpkt.pcap.Reader(f)
-
-    connections = []
-    active_connections = []
-    throughput = {}
-
-    throughput_data_size = {}
-
-    t = start_ts + delta_t
-
-    for ts, buf in pcap:
-
-        processed_packets += 1
-        if processed_packets % 500 == 0:
-            print_progress(processed_packets, total_packets)
-
-        eth = dpkt.ethernet.Ethernet(buf)
-        ip = eth.data
-        tcp = ip.data
-
-        src_ip = socket.inet_ntoa(ip.src)
-        dst_ip = socket.inet_ntoa(ip.dst)
-        src_port = tcp.sport
-        dst_port = tcp.dport
-
-        # identify a connection always as (client port, server port)
-        if src_port > dst_port:
-            tcp_tuple = (src_ip, src_port, dst_ip, dst_port)
-        else:
-            tcp_tuple = (dst_ip, dst_port, src_ip, src_port)
-
-        while ts >= t:
-            total_throughput[0].append(t)
-            total_throughput[1].append(0)
-
-            for i, c in enumerate(connections):
-                if c not in active_connections:
-                    continue
-                tp = float(throughput_data_size[i]) / delta_t
-                throughput[i][0].append(t)
-                throughput[i][1].append(tp)
-                total_throughput[1][-1] += tp
-                throughput_data_size[i] = 0
-            t += delta_t
-
-        if tcp.flags & 0x02 and tcp_tuple not in connections:
-            connections.append(tcp_tuple)
-            active_connections.append(tcp_tuple)
-            connection_index = connections.index(tcp_tuple)
-
-            throughput[connection_index] = ([], [])
-            throughput_data_size[connection_index] = 0
-
-        if tcp.flags & 0x01:
-            if tcp_tuple in active_connections:
-                active_connections.remove(tcp_tuple)
-            continue
-
-        connection_index = connections.index(tcp_tuple)
-
-        if src_port > dst_port:
-            # client -> server
-            throughput_data_size[connection_index] += ip.len * 8
-
     print('  100.00%')
-
-    fairness_troughput = compute_fairness(throughput, delta_t)
-    fairness_sending_rate = compute_fairness(sending_rate, delta_t)
+    if join.unmatched > 0:
+        print_warning('  {} packets behind the bottleneck have not been seen before it.'.format(join.unmatched))
+    profiler.lap('capture pass')
+
+    fairness_interval = delta_t
+    if sliding:
+        rate_step = rate_step or delta_t
+        end_ts = max([s.timestamps[-1] for s in sent_bits.values() + received_bits.values()
+                      if len(s.timestamps) > 0] or [start_ts])
+        grid = rate_grid(start_ts, rate_step, end_ts)
+
+        windows = rate_windows(rate_window, round_trips, delta_t)
+        sending_rate, total_sending_rate = sliding_rates(sent_bits, grid, windows)
+        throughput, total_throughput = sliding_rates(received_bits, grid, windows)
+        goodput, total_goodput = sliding_rates(goodput_bits, grid, windows)
+        fairness_interval = rate_step
+        profiler.lap('sliding rates')
+
+    fairness_troughput = compute_fairness(throughput, fairness_interval)
+    fairness_sending_rate = compute_fairness(sending_rate, fairness_interval)
     fairness = {
         'Throughput': fairness_troughput,
         'Sending Rate': fairness_sending_rate
     }
 
-    bbr_values, cwnd_values = parse_bbr_and_cwnd_values(path)
+    flow_completion = compute_flow_completion(syn_ts, fin_seq, completion_ts)
+    profiler.lap('fairness')
+
+    flows = FlowIndex(connections, [syn_ts[i] for i in range(len(connections))])
+    bbr_values, cwnd_values = parse_bbr_and_cwnd_values(path, flows)
+    profiler.lap('bbr parsing')
     bbr_total_values, sync_phases, sync_duration = compute_total_values(bbr_values)
+    profiler.lap('total values')
     buffer_backlog = parse_buffer_backlog(path)
+    profiler.lap('buffer parsing')
+    fidelity = fidelity_series(path)
+    profiler.lap('fidelity')
 
     data_info = DataInfo(sync_duration=sync_duration,
-                         sync_phases=sync_phases)
+                         sync_phases=sync_phases,
+                         rtt_sketches=rtt_sketches,
+                         connections=connections,
+                         connection_starts=[syn_ts[i] for i in range(len(connections))])
 
     throughput[len(throughput)] = total_throughput
+    goodput[len(goodput)] = total_goodput
     sending_rate[len(sending_rate)] = total_sending_rate
     retransmissions_interval[len(retransmissions_interval)] = total_retransmisions
 
     return PcapData(rtt=round_trips,
                     inflight=inflight,
                     throughput=throughput,
+                    goodput=goodput,
                     fairness=fairness,
                     avg_rtt=avg_rtt,
                     sending_rate=sending_rate,
@@ -409,11 +616,99 @@ def parse_pcap(path, delta_t):
                     retransmissions=retransmissions,
                     retransmissions_interval=retransmissions_interval,
                     buffer_backlog=buffer_backlog,
+                    fidelity=fidelity,
+                    flow_completion=flow_completion,
+                    sojourn_time=join.sojourn_time,
+                    drops=join.drops,
                     data_info=data_info)
 
 
+def rate_windows(rate_window, round_trips, default):
+    """
+    Window of each connection in seconds.
+    """
+    if rate_window != RTT_WINDOW:
+        return dict((i, rate_window) for i in round_trips)
+    # the minimum RTT of the connection
+    return dict((i, min(round_trips[i][1]) / 1000.0 if len(round_trips[i][1]) > 0 else default) for i in round_trips)
+
+
+def merge_captures(captures, processes, sizes, total_size):
+    """
+    Yield (ts, capture index, packet) of the chunks of all captures in time order. On equal timestamps the packet
+    of the first capture comes first, i.e. the departure before the bottleneck.
+    """
+    progress = [0] * len(captures)
+    # the decoding processes are shared among the captures
+    workers = max(1, processes // len(captures))
+
+    def read_capture(index, chunks):
+        done = 0
+        for chunk in read_chunks(chunks, workers):
+            size = sizes[chunk.path]
+            for n, packet in enumerate(chunk):
+                if n % 500 == 0:
+                    # compressed chunks are read beyond their file size
+                    progress[index] = done + min(size, chunk.position)
+                    print_progress(sum(progress), total_size)
+                yield packet[0], index, packet
+            if chunk.errors > 0:
+                print_warning('  Skipped {} undecodable frames in {}'.format(chunk.errors,
+                                                                             os.path.basename(chunk.path)))
+            done += size
+
+    return heapq.merge(*[read_capture(i, chunks) for i, chunks in enumerate(captures)])
+
+
+def is_new_connection(flags, tcp_tuple, connection_ids, active_connections):
+    # A SYN of a tuple that has been closed before starts a new connection with a reused port
+    if not flags & 0x02:
+        return False
+    if tcp_tuple not in connection_ids:
+        return True
+    return not flags & 0x10 and tcp_tuple not in active_connections
+
+
+def unwrap_seq(seq, start_seq, reference):
+    # sequence number relative to start_seq, unwrapped to the value closest to reference beyond 2^32 bytes
+    difference = (seq - start_seq - reference) % 2 ** 32
+    if difference >= 2 ** 31:
+        difference -= 2 ** 32
+    return reference + difference
+
+
+def check_completion(connection_index, tcp_ack, ts, fin_seq, completion_ts):
+    if connection_index in fin_seq and connection_index not in completion_ts:
+        if tcp_ack >= fin_seq[connection_index]:
+            completion_ts[connection_index] = ts
+
+
+def compute_flow_completion(syn_ts, fin_seq, completion_ts):
+    """
+    Flow completion time from the SYN until all data is acknowledged, grouped by flow size.
+    Returns {bucket: ([start timestamps], [completion times in ms], [sizes in byte])}
+    """
+    flows = []
+    for c in completion_ts:
+        # the SYN occupies the first sequence number
+        size = fin_seq[c] - 1
+        flows.append((syn_ts[c], (completion_ts[c] - syn_ts[c]) * 1000, size))
+
+    output = {}
+    for start, fct, size in sorted(flows):
+        for limit, label in FCT_SIZE_BUCKETS:
+            if size < limit:
+                break
+        if label not in output:
+            output[label] = ([], [], [])
+        output[label][0].append(start)
+        output[label][1].append(fct)
+        output[label][2].append(size)
+    return output
+
+
 def print_progress(current, total):
-    print_line('  {:7.3}%          '.format( 100 * current / float(total)))
+    print_line('  {:6.2f}%          '.format(100 * current / float(total)))
 
 
 def parse_buffer_backlog(path):
@@ -421,196 +716,101 @@ def parse_buffer_backlog(path):
     paths = glob.glob(os.path.join(path, '*.{}*'.format(BUFFER_FILE_EXTENSION)))
 
     for i, file_path in enumerate(paths):
-        output[i] = ([], [])
-        f = open_compressed_file(file_path)
-        for line in f:
-            split = line.split(';')
-            timestamp = parse_timestamp(split[0])
-            size = split[1].replace('b\n', '')
-            if 'K' in size:
-                size = float(size.replace('K', '')) * 1000
-            elif 'M' in size:
-                size = float(size.replace('M', '')) * 1000000
-            elif 'G' in size:
-                size = float(size.replace('G', '')) * 1000000000
-            output[i][0].append(timestamp)
-            output[i][1].append(float(size) * 8)
-        f.close()
+        output[i] = parse_buffer_file(file_path)
     return output
 
 
-def parse_bbr_and_cwnd_values(path):
-    bbr_values = {}
-    cwnd_values = {}
-
-    paths = glob.glob(os.path.join(path, '*.{}*'.format(FLOW_FILE_EXTENSION)))
-
-    all_files = sorted(paths)
-
-    for i, file_path in enumerate(all_files):
-
-        bbr_values[i] = ([], [], [], [], [], [])
-        cwnd_values[i] = ([], [], [])
-
-        f = open_compressed_file(file_path)
-
-        for line in f:
-            split = map(lambda x: x.strip(), line.split(';'))
-
-            timestamp = parse_timestamp(split[0])
-            cwnd, ssthresh = 0, 0
-
-            if split[1] != '':
-                cwnd = int(split[1])
-            if split[2] != '':
-                ssthresh = int(split[2])
-
-            cwnd_values[i][0].append(timestamp)
-            cwnd_values[i][1].append(cwnd)
-            cwnd_values[i][2].append(ssthresh)
-
-            if split[3] != '':
-                bbr = split[3].replace('bw:', '')\
-                    .replace('mrtt:','')\
-                    .replace('pacing_gain:', '')\
-                    .replace('cwnd_gain:', '')
-                bbr = bbr.split(',')
-
-                if len(bbr) < 4:
-                    pacing_gain = 0
-                    cwnd_gain = 0
-                else:
-                    pacing_gain = float(bbr[2])
-                    cwnd_gain = float(bbr[3])
-
-                if 'Mbps' in bbr[0]:
-                    bw = float(bbr[0].replace('Mbps', '')) * 1000000
-                elif 'Kbps' in bbr[0]:
-                    bw = float(bbr[0].replace('Kbps', '')) * 1000
-                elif 'bps' in bbr[0]:
-                    bw = float(bbr[0].replace('bps', ''))
-                else:
-                    bw = 0
-
-                rtt = float(bbr[1])
-
-                bbr_values[i][0].append(timestamp)
-                bbr_values[i][1].append(bw)
-                bbr_values[i][2].append(rtt)
-                bbr_values[i][3].append(pacing_gain)
-                bbr_values[i][4].append(cwnd_gain)
-                bbr_values[i][5].append(bw * rtt / 1000)
-
-        f.close()
+def parse_bbr_and_cwnd_values(path, flows=None):
+    """
+    BBR and cwnd values of every connection. The samples are assigned by the 4-tuple of their socket to the
+    connections of the captures in the FlowIndex flows, so they share the connection index of all other values.
+    Without flows or for older samples without 4-tuple the sockets are numbered in the order of the files.
+    """
+    sockets = []
+    for file_path in sorted(glob.glob(os.path.join(path, '*.{}*'.format(FLOW_FILE_EXTENSION)))):
+        series = parse_flow_file(file_path)
+        for key in sorted(series, key=lambda k: (k is not None, k)):
+            sockets.append((key, ) + series[key])
+
+    if flows is None or any(key is None for key, _, _ in sockets):
+        bbr_values = dict((i, bbr) for i, (_, bbr, _) in enumerate(sockets))
+        cwnd_values = dict((i, cwnd) for i, (_, _, cwnd) in enumerate(sockets))
+        return bbr_values, cwnd_values
+
+    bbr_values = dict((i, ([], [], [], [], [], [])) for i in range(flows.connections))
+    cwnd_values = dict((i, ([], [], [])) for i in range(flows.connections))
+    unmatched = 0
+    for key, bbr, cwnd in sockets:
+        slices = flows.split(key, cwnd[0])
+        if len(slices) == 0:
+            # e.g. the SYN of the connection has not been captured
+            unmatched += 1
+            continue
+        for index, first, last in slices:
+            for column, values in zip(cwnd, cwnd_values[index]):
+                values.extend(column[first:last])
+        for index, first, last in flows.split(key, bbr[0]):
+            for column, values in zip(bbr, bbr_values[index]):
+                values.extend(column[first:last])
+
+    if unmatched > 0:
+        print_warning('  Skipped the samples of {} sockets without connection in the captures.'.format(unmatched))
     return bbr_values, cwnd_values
 
 
-def parse_timestamp(string):
-    return float(string)
-
-
 def compute_total_values(bbr):
-    connection_first_index = [0, ] * len(bbr)
-    current_bw = [0, ] * len(bbr)
-    current_window = [0, ] * len(bbr)
-    current_gain = [0, ] * len(bbr)
-    total_bw = ([], [])
-    total_window = ([], [])
-    total_gain = ([], [])
+    """
+    Sum of the BtlBw, window gain and pacing gain of all connections at every timestamp of a socket sample, each
+    connection holds its last sample until its final one. All connections are synchronized while the sum of their
+    window gains equals the number of connections started so far, i.e. all are in ProbeRTT.
+    """
+    grid = TimeGrid.events(bbr)
+    _, bw = grid.resample(bbr, column=1, method=HOLD, fill=0)
+    _, window = grid.resample(bbr, column=4, method=HOLD, fill=0)
+    _, gain = grid.resample(bbr, column=3, method=HOLD, fill=0)
+    total_window = window.sum(axis=0)
+    started = np.searchsorted(grid.first_bins(bbr), np.arange(len(grid)), side='right')
 
     sync_window_start = -1
     sync_window_phases = []
     sync_window_durations = []
-
-    while True:
-        active_connections = 0
-        current_timestamps = {}
-
-        for c in bbr:
-            if connection_first_index[c] < len(bbr[c][0]):
-                current_timestamps[c] = bbr[c][0][connection_first_index[c]]
-                active_connections += 1
-            else:
-                current_window[c] = 0
-                current_bw[c] = 0
-                current_gain[c] = 0
-
-        if active_connections < 1:
-            break
-
-        c, ts = min(current_timestamps.items(), key=lambda x: x[1])
-        current_bw[c] = bbr[c][1][connection_first_index[c]]
-        current_window[c] = float(bbr[c][4][connection_first_index[c]])
-        current_gain[c] = float(bbr[c][3][connection_first_index[c]])
-        connection_first_index[c] += 1
-
-        total_bw[0].append(ts)
-        total_bw[1].append(sum(current_bw))
-
-        total_window[0].append(ts)
-        total_window[1].append(sum(current_window))
-
-        total_gain[0].append(ts)
-        total_gain[1].append(sum(current_gain))
-
-        min_window = 0
-        for i in connection_first_index:
-            if i > 0:
-                min_window += 1
-
-        if sum(current_window) == min_window:
-            if sync_window_start < 0:
-                sync_window_start = ts
-                sync_window_phases.append(sync_window_start)
+    synchronized = (total_window == started).astype(np.int8)
+    for i in np.flatnonzero(np.diff(np.concatenate(([0], synchronized)))):
+        ts = float(grid.times[i])
+        if synchronized[i]:
+            sync_window_start = ts
+            sync_window_phases.append(sync_window_start)
         elif sync_window_start > 0:
-            duration = (ts - sync_window_start) * 1000
+            sync_window_durations.append((ts - sync_window_start) * 1000)
             sync_window_start = -1
-            sync_window_durations.append(duration)
 
-    return {0: total_bw, 1: total_window, 2: total_gain}, sync_window_phases, sync_window_durations
+    timestamps = grid.times.tolist()
+    totals = {
+        0: (timestamps, bw.sum(axis=0).tolist()),
+        1: (list(timestamps), total_window.tolist()),
+        2: (list(timestamps), gain.sum(axis=0).tolist()),
+    }
+    return totals, sync_window_phases, sync_window_durations
 
 
 def compute_fairness(data, interval):
-    output = ([], [])
-    connections = [0, ] * len(data.keys())
-
-    max_ts = 0
-    min_ts = float('inf')
-    for c in data:
-        max_ts = max(max_ts, max(data[c][0]))
-        min_ts = min(min_ts, min(data[c][0]))
-
-    ts = min_ts
-    while True:
-        if ts > max_ts:
-            return output
-
-        shares = []
-        for i in data.keys():
-            if len(data[i][0]) <= connections[i]:
-                continue
-            if data[i][0][connections[i]] == ts:
-                shares.append(data[i][1][connections[i]])
-                connections[i] += 1
-
-        output[0].append(ts)
-        output[1].append(compute_jain_index(*shares))
-        ts += interval
-
-
-def compute_jain_index(*args):
-
-    sum_normal = 0
-    sum_square = 0
-
-    for arg in args:
-        sum_normal += arg
-        sum_square += arg**2
-
-    if len(args) == 0 or sum_square == 0:
-        return 1
-
-    return sum_normal ** 2 / (len(args) * sum_square)
+    """
+    Jain's index of the values of all connections with a value at each timestamp of the interval grid.
+    """
+    timestamps = [ts for c in data for ts in data[c][0][:1] + data[c][0][-1:]]
+    if len(timestamps) == 0:
+        return [], []
+    grid = TimeGrid.regular(min(timestamps), interval, max(timestamps))
+    _, shares = grid.resample(data, method=MEAN)
+
+    present = ~np.isnan(shares)
+    shares = np.where(present, shares, 0)
+    sum_normal = shares.sum(axis=0)
+    sum_square = (shares ** 2).sum(axis=0)
+    count = present.sum(axis=0)
+    defined = (count > 0) & (sum_square > 0)
+    index = sum_normal ** 2 / np.where(defined, count * sum_square, 1)
+    return grid.times.tolist(), [i if d else 1 for i, d in zip(index.tolist(), defined.tolist())]
 
 
 if __name__ == "__main__":
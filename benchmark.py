@@ -0,0 +1,274 @@
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import dpkt
+
+import analyze
+from helper.csv_writer import write_to_csv, read_from_csv
+from helper.create_plots import plot_all, filter_smooth
+from helper.synthetic import generate_result_directory
+from helper.util import open_compressed_file, print_error, print_warning, print_success, monotonic
+from helper import PCAP1, PCAP2, PLOT_TYPES, CSV_PATH, TEXT_WIDTH
+
+
+# name, flows, duration in seconds, packets per second and flow
+SCENARIOS = [
+    ('small', 2, 10, 100),
+    ('medium', 4, 30, 200),
+    ('large', 8, 60, 400),
+]
+SHORT_FLOWS_PER_SECOND = 1
+
+STAGES = ['parse_pcap', 'parse_logs', 'compute_total_values', 'write_csv', 'read_csv', 'filter_smooth', 'plot_all']
+# stages reading the csv files of write_csv
+CSV_STAGES = ['read_csv', 'filter_smooth', 'plot_all']
+
+DELTA_T = 0.2
+BASELINE_FILE = 'benchmark_baseline.json'
+
+
+def setup_stage(stage, directory):
+    """
+    Prepare the input of a stage and return the function to measure.
+    """
+    if stage == 'parse_pcap':
+        return lambda: analyze.parse_pcap(directory, DELTA_T, processes=1)
+
+    if stage == 'parse_logs':
+        return lambda: (analyze.parse_bbr_and_cwnd_values(directory), analyze.parse_buffer_backlog(directory))
+
+    if stage == 'compute_total_values':
+        bbr_values, _ = analyze.parse_bbr_and_cwnd_values(directory)
+        return lambda: analyze.compute_total_values(bbr_values)
+
+    if stage == 'write_csv':
+        pcap_data = analyze.parse_pcap(directory, DELTA_T, processes=1)
+        return lambda: write_to_csv(directory, pcap_data, compression='none')
+
+    if stage == 'read_csv':
+        return lambda: read_from_csv(directory)
+
+    pcap_data = read_from_csv(directory)
+
+    if stage == 'filter_smooth':
+        series = []
+        for values in [pcap_data.throughput, pcap_data.sending_rate, pcap_data.avg_rtt, pcap_data.inflight]:
+            series += [(values[c][0], values[c][1]) for c in values]
+        return lambda: [filter_smooth(data, 5, 2) for data in series]
+
+    return lambda: plot_all(directory, pcap_data, plot_only=PLOT_TYPES)
+
+
+def read_status(key):
+    # value of /proc/self/status in kB
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(key + ':'):
+                return int(line.split()[1])
+    return None
+
+
+def reset_peak_rss():
+    """
+    Reset the peak RSS of this process to its current RSS (Linux 4.0+), returns False if not supported.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except (IOError, OSError):
+        return False
+
+
+def measure_stage(stage, directory, results):
+    # runs in a separate process, the setup of its input runs there as well
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, sys.stdout.fileno())
+
+    function = setup_stage(stage, directory)
+    gc.collect()
+    # the peak of the setup, e.g. the parsing before write_csv, must not count for the stage
+    input_rss = read_status('VmRSS')
+    reset = reset_peak_rss()
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = usage.ru_utime + usage.ru_stime
+    start = monotonic()
+
+    function()
+
+    wall = monotonic() - start
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    results.put({
+        'wall': wall,
+        'cpu': usage.ru_utime + usage.ru_stime - cpu,
+        # kilobytes on Linux
+        'peak_rss_mb': (read_status('VmHWM') if reset else usage.ru_maxrss) / 1024.0,
+        # held by the input of the stage when it started
+        'input_rss_mb': input_rss / 1024.0,
+        'peak_includes_setup': not reset,
+    })
+
+
+def run_stage(stage, directory):
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=measure_stage, args=(stage, directory, results))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError('Stage {} failed with exit code {}'.format(stage, process.exitcode))
+    return results.get()
+
+
+def count_frames(directory):
+    frames = 0
+    for name in [PCAP1, PCAP2]:
+        f = open_compressed_file(os.path.join(directory, name))
+        frames += sum(1 for _ in dpkt.pcap.Reader(f))
+        f.close()
+    return frames
+
+
+def run_benchmark(scenarios, stages, directory, repeat):
+    results = {}
+    for name, flows, duration, rate in scenarios:
+        scenario_directory = os.path.join(directory, name)
+        if not os.path.isfile(os.path.join(scenario_directory, PCAP1)):
+            print('Generating {}: {} flows, {}s, {} packets/s per flow'.format(name, flows, duration, rate))
+            generate_result_directory(scenario_directory, flows, duration, rate,
+                                      short_flows=int(duration * SHORT_FLOWS_PER_SECOND))
+        frames = count_frames(scenario_directory)
+
+        if 'write_csv' not in stages and any(s in CSV_STAGES for s in stages) and \
+                not os.path.isdir(os.path.join(scenario_directory, CSV_PATH)):
+            run_stage('write_csv', scenario_directory)
+
+        results[name] = {}
+        for stage in stages:
+            runs = [run_stage(stage, scenario_directory) for _ in range(repeat)]
+            best = min(runs, key=lambda r: r['wall'])
+            best['peak_rss_mb'] = max(r['peak_rss_mb'] for r in runs)
+            best['input_rss_mb'] = max(r['input_rss_mb'] for r in runs)
+            if best['peak_includes_setup']:
+                print_warning('  Cannot reset the peak RSS, the peak of {} includes its setup.'.format(stage))
+            best['frames'] = frames
+            best['packets_per_s'] = frames / best['wall'] if best['wall'] > 0 else 0
+            results[name][stage] = best
+            print('  {:<8} {:<22} {:>12.0f} {:>9.3f} {:>9.3f} {:>9.1f} {:>9.1f}'.format(
+                name, stage, best['packets_per_s'], best['wall'], best['cpu'], best['peak_rss_mb'],
+                best['input_rss_mb']))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Flag every stage whose wall time or peak RSS grew by more than threshold compared to the baseline.
+    """
+    regressions = []
+    for name in sorted(results):
+        for stage in STAGES:
+            if stage not in results[name] or stage not in baseline.get(name, {}):
+                continue
+            current = results[name][stage]
+            reference = baseline[name][stage]
+            for key in ['wall', 'peak_rss_mb']:
+                if reference[key] <= 0:
+                    continue
+                change = current[key] / reference[key] - 1
+                line = '  {:<8} {:<22} {:<12} {:>+8.1%}'.format(name, stage, key, change)
+                if change > threshold:
+                    print_error(line)
+                    regressions.append((name, stage, key))
+                elif change < -threshold:
+                    print_success(line)
+                else:
+                    print(line)
+    return regressions
+
+
+def load_baseline(path):
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, results):
+    # results of scenarios that were not run are kept
+    baseline = load_baseline(path) or {'results': {}}
+    baseline['results'].update(results)
+    baseline['python'] = platform.python_version()
+    baseline['machine'] = platform.node()
+    baseline['created'] = time.strftime('%Y-%m-%d %H:%M:%S')
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the analysis stages on synthetic result directories. '
+                                                 'Needs neither Mininet nor root.')
+    parser.add_argument('-s', dest='scenarios', action='append', choices=[s[0] for s in SCENARIOS],
+                        help='Scenario to run, can be given several times. (default: all)')
+    parser.add_argument('--stage', dest='stages', action='append', choices=STAGES,
+                        help='Stage to measure, can be given several times. (default: all)')
+    parser.add_argument('-n', dest='repeat', type=int, default=1,
+                        help='Repetitions per stage, the fastest one is reported. (default: 1)')
+    parser.add_argument('-d', dest='directory',
+                        help='Directory for the generated result directories, which are reused by later runs. '
+                             '(default: temporary directory)')
+    parser.add_argument('-b', dest='baseline', default=BASELINE_FILE,
+                        help='Baseline to compare with. (default: {})'.format(BASELINE_FILE))
+    parser.add_argument('--save', dest='save', action='store_true',
+                        help='Store the results as new baseline.')
+    parser.add_argument('-t', dest='threshold', type=float, default=0.2,
+                        help='Relative increase of wall time or peak RSS reported as regression. (default: 0.2)')
+
+    args = parser.parse_args()
+
+    scenarios = [s for s in SCENARIOS if args.scenarios is None or s[0] in args.scenarios]
+    stages = [s for s in STAGES if args.stages is None or s in args.stages]
+
+    directory = args.directory or tempfile.mkdtemp(prefix='benchmark_')
+
+    print('-' * TEXT_WIDTH)
+    print('  {:<8} {:<22} {:>12} {:>9} {:>9} {:>9} {:>9}'.format('Scenario', 'Stage', 'Packets/s', 'Wall s',
+                                                                 'CPU s', 'Peak MB', 'Input MB'))
+    try:
+        results = run_benchmark(scenarios, stages, directory, max(1, args.repeat))
+    except RuntimeError as e:
+        print_error(e)
+        return 1
+    finally:
+        if args.directory is None:
+            shutil.rmtree(directory)
+
+    regressions = []
+    baseline = load_baseline(args.baseline)
+    if baseline is not None:
+        print('-' * TEXT_WIDTH)
+        print('Compared to baseline from {} ({}, Python {})'.format(baseline['created'], baseline['machine'],
+                                                                     baseline['python']))
+        regressions = compare(results, baseline['results'], args.threshold)
+
+    if args.save:
+        save_baseline(args.baseline, results)
+        print('Saved baseline to {}'.format(args.baseline))
+
+    print('-' * TEXT_WIDTH)
+    if len(regressions) > 0:
+        print_warning('{} regressions above {:.0%}.'.format(len(regressions), args.threshold))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import argparse
+import sys
+
+from helper.poller import Poller, run_pollers, single_sample
+from helper.qdisc_stats import QdiscStats
+from helper.fidelity import SystemStats
+from helper.measurement import print_poll_statistics
+from helper.util import print_error
+
+
+def qdisc_poller(interface, output, pid=None):
+    stats = QdiscStats(interface, pid)
+    return Poller(output, single_sample(stats.query), stats.close)
+
+
+def system_poller(interface, output):
+    stats = SystemStats(interface)
+    return Poller(output, single_sample(stats.query))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Poll backlog, drops, overlimits and requeues of the root qdisc '
+                                                 'of an interface via rtnetlink.')
+    parser.add_argument('interval', type=float,
+                        help='Poll interval in seconds.')
+    parser.add_argument('interface',
+                        help='Name of the interface.')
+    parser.add_argument('output',
+                        help='Path to the output file.')
+    parser.add_argument('--pid', dest='pid', type=int,
+                        help='Process id of a process inside the network namespace of the interface. '
+                             '(default: own namespace)')
+    parser.add_argument('--fidelity', dest='fidelity',
+                        help='Additionally write the CPU load and the counters of the interface in the root network '
+                             'namespace to this file. (default: none)')
+    args = parser.parse_args()
+
+    try:
+        pollers = [qdisc_poller(args.interface, args.output, args.pid)]
+    except (IOError, OSError) as e:
+        print_error('Cannot poll qdisc of {}: {}'.format(args.interface, e))
+        return 1
+
+    if args.fidelity is not None:
+        try:
+            pollers.append(system_poller(args.interface, args.fidelity))
+        except (IOError, OSError) as e:
+            print_error('Cannot poll CPU load and counters of {}: {}'.format(args.interface, e))
+
+    print_poll_statistics(run_pollers(args.interval, pollers))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
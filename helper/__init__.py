@@ -5,14 +5,24 @@ BUFFER_FILE_EXTENSION = 'buffer'
 FLOW_FILE_EXTENSION = 'bbr'
 
 
+EVENT_FILE = 'events.csv'
+FIDELITY_FILE = 'fidelity.csv'
+PARAMETERS_FILE = 'parameters.txt'
+
+
+WORKLOAD_DISTRIBUTIONS = ['pareto', 'exponential', 'fixed']
+
+
 PCAP1 = 's1.pcap'
 PCAP2 = 's3.pcap'
 
 
 PLOT_PATH = 'pdf_plots'
+HTML_PATH = 'html_report'
 PLOT_TYPES = [
     'sending_rate',
     'throughput',
+    'goodput',
     'fairness',
     'retransmission',
     'avg_rtt',
@@ -25,6 +35,10 @@ PLOT_TYPES = [
     'rt_prop',
     'window_gain',
     'pacing_gain',
+    'flow_completion',
+    'sojourn_time',
+    'drops',
+    'fidelity',
 ]
 
 
@@ -49,8 +63,33 @@ CSV_FILE_NAMES = {
     'cwnd_values': 'cwnd_values.csv',
     'retransmissions': 'retransmissions.csv',
     'retransmissions_interval': 'retransmissions_interval.csv',
-    'buffer_backlog': 'buffer_backlog.csv'
+    'buffer_backlog': 'buffer_backlog.csv',
+    'flow_completion': 'flow_completion.csv',
+    'sojourn_time': 'sojourn_time.csv',
+    'drops': 'drops.csv',
+    'goodput': 'goodput.csv',
+    'fidelity': 'fidelity.csv',
 }
 
 INFORMATION_FILE = 'values.info'
+CONNECTIONS_FILE = 'connections.csv'
+INDEX_FILE = 'results.sqlite'
+
+
+# Upper limit in byte and name of the flow size groups for flow completion times
+FCT_SIZE_BUCKETS = [
+    (10 * 1024, '<10KB'),
+    (100 * 1024, '10KB-100KB'),
+    (1024 * 1024, '100KB-1MB'),
+    (float('inf'), '>1MB'),
+]
+
+
+# Seconds after which a packet that has not arrived behind the bottleneck is counted as dropped,
+# must be larger than the maximum queuing and netem delay of the bottleneck
+JOIN_WINDOW = 2.0
+
 
+MANIFEST_FILE = 'analysis_manifest.json'
+PROFILE_FILE = 'analysis_profile.json'
+PROFILE_PATH = 'profile'
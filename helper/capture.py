@@ -0,0 +1,168 @@
+import collections
+import multiprocessing
+import socket
+import struct
+
+import dpkt
+
+from helper.util import open_compressed_file
+
+# Packets per batch handed from the decoder to the analysis
+BATCH_SIZE = 10000
+# Batches a worker process decodes ahead of the analysis before it waits
+QUEUED_BATCHES = 4
+
+
+def first_timestamp(path):
+    f = open_compressed_file(path)
+    try:
+        for ts, _ in dpkt.pcap.Reader(f):
+            return ts
+    except (dpkt.UnpackError, ValueError, IOError, EOFError, struct.error):
+        pass
+    finally:
+        f.close()
+    return float('inf')
+
+
+def order_chunks(paths):
+    """
+    Sort the chunks of a rotated capture by the timestamp of their first packet, independent of the naming
+    scheme of tcpdump (-C appends a counter, -G a time) and of compression.
+    """
+    return sorted(paths, key=lambda path: (first_timestamp(path), path))
+
+
+def decode_frame(buf):
+    """
+    Decode one frame into
+        (tcp_tuple, from_client, flags, seq, ack, ip_len, ts_val, ts_ecr, ip_id, payload)
+    The tuple identifies a connection always as (client ip, client port, server ip, server port), payload is the
+    length of the TCP payload, which is not part of the snapshot.
+    """
+    ip = dpkt.ethernet.Ethernet(buf).data
+    tcp = ip.data
+
+    src_ip = socket.inet_ntoa(ip.src)
+    dst_ip = socket.inet_ntoa(ip.dst)
+
+    ts_val = None
+    ts_ecr = None
+    for option, data in dpkt.tcp.parse_opts(tcp.opts):
+        if option == dpkt.tcp.TCP_OPT_TIMESTAMP and len(data) >= 8:
+            ts_val, ts_ecr = struct.unpack('!II', data[:8])
+
+    # identify a connection always as (client port, server port)
+    from_client = tcp.sport > tcp.dport
+    if from_client:
+        tcp_tuple = (src_ip, tcp.sport, dst_ip, tcp.dport)
+    else:
+        tcp_tuple = (dst_ip, tcp.dport, src_ip, tcp.sport)
+
+    payload = ip.len - ip.hl * 4 - tcp.off * 4
+    return tcp_tuple, from_client, tcp.flags, tcp.seq, tcp.ack, ip.len, ts_val, ts_ecr, ip.id, payload
+
+
+def decode_batches(path, batch_size=BATCH_SIZE):
+    """
+    Decode the packets of one capture file straight from the reader and yield them in lists of at most batch_size
+    packets (ts, tcp_tuple, from_client, flags, seq, ack, ip_len, ts_val, ts_ecr, ip_id, payload), each with the
+    bytes of the capture read so far and the number of frames that could not be decoded, e.g. of a truncated last
+    chunk.
+    """
+    packets = []
+    errors = 0
+    # pcap file header
+    position = 24
+
+    f = open_compressed_file(path)
+    try:
+        for ts, buf in dpkt.pcap.Reader(f):
+            # pcap record header
+            position += 16 + len(buf)
+            try:
+                packets.append((ts,) + decode_frame(buf))
+            except (dpkt.UnpackError, AttributeError, ValueError, struct.error):
+                errors += 1
+                continue
+            if len(packets) >= batch_size:
+                yield position, errors, packets
+                packets = []
+    except (dpkt.UnpackError, ValueError, IOError, EOFError, struct.error):
+        # corrupted tail, keep all packets before it
+        errors += 1
+    finally:
+        f.close()
+
+    yield position, errors, packets
+
+
+def queue_batches(path, queue):
+    # runs in a worker process, blocks while the queue is full, ends with None
+    for batch in decode_batches(path):
+        queue.put(batch)
+    queue.put(None)
+
+
+class DecodedChunk:
+    """
+    The packets of one capture file, decoded while they are iterated. position (bytes of the capture read) and
+    errors (undecodable frames) are updated along the way.
+    """
+
+    def __init__(self, path, batches):
+        self.path = path
+        self.batches = batches
+        self.position = 0
+        self.errors = 0
+
+    def __iter__(self):
+        for position, errors, packets in self.batches:
+            self.position = position
+            self.errors = errors
+            for packet in packets:
+                yield packet
+
+
+def read_chunks(paths, processes=1):
+    """
+    Yield a DecodedChunk for every capture file in the order of paths. Without worker processes the packets are
+    decoded while the caller iterates them. Otherwise up to processes chunks are decoded ahead in worker
+    processes, each handing over at most QUEUED_BATCHES batches at a time, so memory stays bounded by the batches
+    in flight instead of the size of the chunks. Only decoding runs in parallel, the caller merges the packets of
+    consecutive chunks into its per-flow state, so sequence numbers, outstanding segments and timestamps carry
+    over chunk boundaries.
+    """
+    if processes <= 1 or len(paths) <= 1:
+        for path in paths:
+            yield DecodedChunk(path, decode_batches(path))
+        return
+
+    remaining = iter(paths)
+    pending = collections.deque()
+
+    def start(path):
+        queue = multiprocessing.Queue(QUEUED_BATCHES)
+        process = multiprocessing.Process(target=queue_batches, args=(path, queue))
+        process.daemon = True
+        process.start()
+        pending.append((path, process, queue))
+
+    try:
+        for path in remaining:
+            start(path)
+            if len(pending) >= processes:
+                break
+
+        while len(pending) > 0:
+            path, process, queue = pending[0]
+            yield DecodedChunk(path, iter(queue.get, None))
+            process.join()
+            pending.popleft()
+            for next_path in remaining:
+                start(next_path)
+                break
+    finally:
+        for _, process, _ in pending:
+            if process.is_alive():
+                process.terminate()
@@ -8,8 +8,9 @@ matplotlib.use('Agg')
 
 import matplotlib.pyplot as plt
 from pcap_data import PcapData
-from helper import PLOT_PATH, PLOT_TYPES
+from helper import PLOT_PATH, PLOT_TYPES, FCT_SIZE_BUCKETS
 from helper.util import print_line
+from helper.resample import TimeGrid, HOLD
 from helper import TEXT_WIDTH
 
 PLOT_TOTAL = True
@@ -42,6 +43,7 @@ def plot_all(path, pcap_data, plot_only, hide_total=False, all_plots=False):
     pcap_data = shift_timestamps(pcap_data)
 
     throughput = pcap_data.throughput
+    goodput = pcap_data.goodput
     fairness = pcap_data.fairness
     rtt = pcap_data.rtt
     inflight = pcap_data.inflight
@@ -53,6 +55,10 @@ def plot_all(path, pcap_data, plot_only, hide_total=False, all_plots=False):
     retransmissions = pcap_data.retransmissions
     retransmissions_interval = pcap_data.retransmissions_interval
     buffer_backlog = pcap_data.buffer_backlog
+    flow_completion = pcap_data.flow_completion
+    sojourn_time = pcap_data.sojourn_time
+    drops = pcap_data.drops
+    fidelity = pcap_data.fidelity
 
     t_max = pcap_data.get_max_ts()
     t_min = pcap_data.get_min_ts()
@@ -68,6 +74,11 @@ def plot_all(path, pcap_data, plot_only, hide_total=False, all_plots=False):
             Plot((throughput, retransmissions), plot_throughput, 'plot_throughput.pdf', 'Throughput', 'bit/s', len(throughput))
         ]
 
+    if 'goodput' in plot_only and len(goodput) > 0:
+        plots += [
+            Plot((goodput, retransmissions), plot_throughput, 'plot_goodput.pdf', 'Goodput', 'bit/s', len(goodput))
+        ]
+
     if 'fairness' in plot_only and len(sending_rate.keys()) > 2:
         plots += [
             Plot(fairness, plot_fairness, 'plot_fairness.pdf', 'Fairness', "Jain's Index", len(fairness))
@@ -104,6 +115,28 @@ def plot_all(path, pcap_data, plot_only, hide_total=False, all_plots=False):
             Plot((buffer_backlog, retransmissions), plot_buffer_backlog, 'plot_buffer_backlog.pdf', 'Buffer Backlog', 'bit', len(buffer_backlog))
         ]
 
+    if 'flow_completion' in plot_only and len(flow_completion) > 0:
+        plots += [
+            Plot(flow_completion, plot_flow_completion, 'plot_flow_completion.pdf', 'Flow Completion Time', 'ms',
+                 len(flow_completion))
+        ]
+
+    if 'sojourn_time' in plot_only and len(sojourn_time) > 0:
+        plots += [
+            Plot((sojourn_time, drops), plot_sojourn_time, 'plot_sojourn_time.pdf', 'Sojourn Time', 'ms',
+                 len(sojourn_time))
+        ]
+
+    if 'drops' in plot_only and len(drops) > 0:
+        plots += [
+            Plot(drops, plot_drops, 'plot_drops.pdf', 'Drops', '#', len(drops))
+        ]
+
+    if 'fidelity' in plot_only and len(fidelity) > 0:
+        plots += [
+            Plot(fidelity, plot_fidelity, 'plot_fidelity.pdf', 'Emulation Fidelity', 'fraction', len(fidelity))
+        ]
+
     has_bbr = False
     for i in bbr_values:
         if len(bbr_values[i][0]) > 0:
@@ -294,6 +327,47 @@ def plot_buffer_backlog(data, p_plt):
         p_plt.plot(data, np.zeros_like(data), '.', color='red')
 
 
+def plot_flow_completion(fct, p_plt):
+    for limit, label in FCT_SIZE_BUCKETS:
+        if label not in fct:
+            continue
+        data = fct[label]
+        p_plt.plot(data[0], data[1], '.', label='{} ({} flows)'.format(label, len(data[0])))
+    p_plt.set_yscale('log')
+
+
+def plot_sojourn_time(data, p_plt):
+    sojourn_time = data[0]
+    drops = data[1]
+    for c in sojourn_time:
+        data = sojourn_time[c]
+        p_plt.plot(data[0], data[1], label='{}'.format(c))
+
+    for c in drops:
+        data = drops[c]
+        p_plt.plot(data, np.zeros_like(data), '.', color='red')
+    p_plt.set_ylim(ymin=0)
+
+
+def plot_drops(drops, p_plt):
+    for c in drops:
+        data = drops[c][0]
+        if len(data) == 0:
+            continue
+        p_plt.step(data, np.arange(1, len(data) + 1), where='post', label='{}'.format(c))
+
+
+def plot_fidelity(fidelity, p_plt):
+    for c in sorted(fidelity):
+        if c == 'Utilization':
+            # only defined for the intervals in which the bottleneck was backlogged
+            p_plt.plot(fidelity[c][0], fidelity[c][1], '.', markersize=2, label=c)
+        else:
+            p_plt.plot(fidelity[c][0], fidelity[c][1], label=c)
+
+    p_plt.set_ylim(ymin=0, ymax=1.1)
+
+
 def plot_bbr_bw(data, p_plt):
     bbr = data[0]
     bbr_bw_total = data[1]
@@ -403,28 +477,16 @@ def plot_diff_inflight_bdp(data, p_plt):
     bbr = data[1]
     for c in inflight:
 
-        if c not in bbr:
+        if c not in bbr or len(bbr[c][0]) == 0:
             continue
 
-        ts = []
-        diff = []
-
-        bbr_ts = bbr[c][0]
-        bdp = bbr[c][5]
-
-        for i, t1 in enumerate(inflight[c][0]):
-            for j, t2 in enumerate(bbr_ts):
-                if t1 > t2:
-                    ts.append(t2)
-                    if bdp[j] == 0:
-                        diff.append(0)
-                    else:
-                        diff.append((inflight[c][1][i]) / bdp[j])
-                else:
-                    bbr_ts = bbr_ts[j:]
-                    bdp = bdp[j:]
-                    break
-        ts, diff = filter_smooth((ts, diff), 10, 5)
+        # inflight at each BBR sample
+        grid = TimeGrid(bbr[c][0])
+        _, held = grid.resample({c: inflight[c]}, method=HOLD, fill=0)
+        bdp = np.asarray(bbr[c][5], dtype=float)
+        diff = np.where(bdp > 0, held[0] / np.where(bdp > 0, bdp, 1), 0)
+
+        ts, diff = filter_smooth((bbr[c][0], diff.tolist()), 10, 5)
         p_plt.plot(ts, diff, label='{}'.format(c))
 
 
@@ -1,12 +1,14 @@
 import os
 import errno
+import shutil
 import numpy as np
 
 from pcap_data import PcapData
 
-from helper import CSV_PATH, CSV_FILE_NAMES, INFORMATION_FILE
+from helper import CSV_PATH, CSV_FILE_NAMES, INFORMATION_FILE, CONNECTIONS_FILE
 from helper import COMPRESSION_EXTENSIONS
 from helper.util import open_compressed_file, find_file
+from helper.quantiles import QUANTILES, QuantileSketch, summarize
 
 
 def write_to_csv(path, pcap_data, compression):
@@ -20,12 +22,32 @@ def write_to_csv(path, pcap_data, compression):
                 raise
 
     write_info_file(path, pcap_data)
+    write_connections(os.path.join(path, CONNECTIONS_FILE), pcap_data.data_info.connections,
+                      pcap_data.data_info.connection_starts)
     value_dict = pcap_data.values_as_dict()
 
     for value in value_dict:
         write_csv(os.path.join(path, CSV_FILE_NAMES[value]), value_dict[value], compression=compression)
 
 
+def recompress_csv(path, compression):
+    """
+    Convert existing csv files to another compression without parsing them.
+    """
+    path = os.path.join(path, CSV_PATH)
+    for name in CSV_FILE_NAMES.values():
+        source = find_file(os.path.join(path, name))
+        target = os.path.join(path, name) + COMPRESSION_EXTENSIONS[compression]
+        if source is None or source == target:
+            continue
+        f_in = open_compressed_file(source)
+        f_out = open_compressed_file(target, write=True)
+        shutil.copyfileobj(f_in, f_out)
+        f_in.close()
+        f_out.close()
+        os.remove(source)
+
+
 def write_csv(path, data, compression):
     f = open_compressed_file('{}{}'.format(path, COMPRESSION_EXTENSIONS[compression]), write=True)
     connections = []
@@ -68,7 +90,12 @@ def read_from_csv(path):
         'cwnd_values_file': os.path.join(path, CSV_FILE_NAMES['cwnd_values']),
         'retransmissions_file': os.path.join(path, CSV_FILE_NAMES['retransmissions']),
         'retransmissions_interval_file': os.path.join(path, CSV_FILE_NAMES['retransmissions_interval']),
-        'buffer_backlog_file': os.path.join(path, CSV_FILE_NAMES['buffer_backlog'])
+        'buffer_backlog_file': os.path.join(path, CSV_FILE_NAMES['buffer_backlog']),
+        'flow_completion_file': os.path.join(path, CSV_FILE_NAMES['flow_completion']),
+        'sojourn_time_file': os.path.join(path, CSV_FILE_NAMES['sojourn_time']),
+        'drops_file': os.path.join(path, CSV_FILE_NAMES['drops']),
+        'goodput_file': os.path.join(path, CSV_FILE_NAMES['goodput']),
+        'fidelity_file': os.path.join(path, CSV_FILE_NAMES['fidelity']),
     }
 
     throughput = read_csv(data_files['throughput_file'], 2)
@@ -83,6 +110,11 @@ def read_from_csv(path):
     retransmissions = read_csv(data_files['retransmissions_file'], 1)
     retransmissions_interval = read_csv(data_files['retransmissions_interval_file'], 3)
     buffer_backlog = read_csv(data_files['buffer_backlog_file'])
+    flow_completion = read_csv(data_files['flow_completion_file'], 3, required=False)
+    sojourn_time = read_csv(data_files['sojourn_time_file'], required=False)
+    drops = read_csv(data_files['drops_file'], 1, required=False)
+    goodput = read_csv(data_files['goodput_file'], 2, required=False)
+    fidelity = read_csv(data_files['fidelity_file'], 2, required=False)
 
     return PcapData(throughput=throughput,
                     rtt=rtt,
@@ -95,48 +127,93 @@ def read_from_csv(path):
                     cwnd_values=cwnd_values,
                     retransmissions=retransmissions,
                     retransmissions_interval=retransmissions_interval,
-                    buffer_backlog=buffer_backlog)
-
-
-def read_csv(path, columns_per_connection=2):
+                    buffer_backlog=buffer_backlog,
+                    flow_completion=flow_completion,
+                    sojourn_time=sojourn_time,
+                    drops=drops,
+                    goodput=goodput,
+                    fidelity=fidelity)
+
+
+def write_connections(path, connections, starts):
+    with open(path, 'w') as f:
+        f.write('connection;client;client_port;server;server_port;start\n')
+        for i, tcp_tuple in enumerate(connections):
+            f.write('{};{};{};{};{};{:.6f}\n'.format(i, tcp_tuple[0], tcp_tuple[1], tcp_tuple[2], tcp_tuple[3],
+                                                      starts[i]))
+
+
+def read_connections(path):
+    """
+    Returns {connection index: (client ip, client port, server ip, server port)}, empty for older runs.
+    """
+    connections = {}
+    file_path = os.path.join(path, CSV_PATH, CONNECTIONS_FILE)
+    if not os.path.isfile(file_path):
+        return connections
+    with open(file_path) as f:
+        f.readline()
+        for line in f:
+            split = line.strip().split(';')
+            connections[int(split[0])] = (split[1], int(split[2]), split[3], int(split[4]))
+    return connections
+
+
+def read_csv(path, columns_per_connection=2, required=True):
     output = {}
     file_path = find_file(path)
 
     if file_path is None:
+        # Series added later are missing in csv data of older runs
+        if not required:
+            return output
         raise IOError('File not found {}'.format(path))
 
     f = open_compressed_file(file_path)
 
     first_line = f.readline().split(';')[:-1]
+    indices = []
+    for i in range(0, len(first_line), columns_per_connection):
+        try:
+            index = int(first_line[i])
+        except ValueError:
+            index = first_line[i]
+        indices.append(index)
+        # connections without values, e.g. short flows, only appear in the header
+        output[index] = tuple([[] for _ in range(0, columns_per_connection)])
+
     for line in f:
         split = line.split(';')
         for i in range(0, len(first_line), columns_per_connection):
             if split[i] == '':
                 continue
 
-            try:
-                index = int(first_line[i])
-            except ValueError:
-                index = first_line[i]
-
-            if index not in output:
-                output[index] = tuple([[] for _ in range(0, columns_per_connection)])
+            index = indices[i // columns_per_connection]
             for column in range(0, columns_per_connection):
                 output[index][column].append(float(split[i + column]))
     f.close()
     return output
 
 
+def format_summary(name, summary):
+    values = [summary['mean'], summary['std'], summary['min']] + \
+             [summary['quantiles'][q] for q in QUANTILES] + [summary['max']]
+    return '{:13}'.format(name) + ''.join('  {:>11.3f}'.format(v) for v in values) + '\n'
+
+
 def write_info_file(path, pcap_data):
 
     data_values = [
         ('Sending Rate', pcap_data.sending_rate, 1, False),
         ('Throughput', pcap_data.throughput, 1, False),
+        ('Goodput', pcap_data.goodput, 1, False),
         ('Fairness', pcap_data.fairness, 1, False),
         ('Avg Rtt', pcap_data.avg_rtt, 1, False),
         ('Inflight', pcap_data.inflight, 1, False),
         ('BDP', pcap_data.bbr_values, 5, False),
-        ('Buffer Backlog', pcap_data.buffer_backlog, 1, False)
+        ('Buffer Backlog', pcap_data.buffer_backlog, 1, False),
+        ('Flow Completion Time', pcap_data.flow_completion, 1, False),
+        ('Sojourn Time', pcap_data.sojourn_time, 1, False),
     ]
 
     path = os.path.join(path, INFORMATION_FILE)
@@ -150,28 +227,44 @@ def write_info_file(path, pcap_data):
     else:
         f.write('Avg:\n 0\n')
 
+    columns = ['Mean', 'Std Dev', 'Min'] + ['P{}'.format(q) if q != 50 else 'Median' for q in QUANTILES] + ['Max']
+    header = '{:13}'.format('Connection') + ''.join('  {:>11}'.format(c) for c in columns) + '\n'
+
+    rtt_sketches = pcap_data.data_info.rtt_sketches
+    if len(rtt_sketches) > 0:
+        # summarized while the capture was streamed, the quantiles are accurate to 1%
+        f.write('\n{:-<58}\n\nRTT of all packets (streaming sketch):\n'.format(''))
+        f.write(header)
+        total = QuantileSketch()
+        for c in sorted(rtt_sketches):
+            if rtt_sketches[c].count > 0:
+                f.write(format_summary(str(c), rtt_sketches[c].summary()))
+                total.merge(rtt_sketches[c])
+        if total.count > 0:
+            f.write(format_summary('Total', total.summary()))
+
     percentages = [1, 0.3]
 
     for percentage in percentages:
         f.write('\n{:-<58}\n\nValues used: last {}%\n'.format('', percentage * 100))
 
         for d in data_values:
-            total = 0
             f.write('\n{}:\n'.format(d[0]))
-            f.write('{:13}  {:>13}  {:>13}  {:>13}  {:>13}  {:>13}\n'.format('Connection',
-                                                                             'Median', 'Mean',
-                                                                             'Std Dev', 'Min',
-                                                                             'Max'))
+            f.write(header)
             for c, data in d[1].iteritems():
-                value_range = int(len(data[d[2]]) * percentage)
+                values = np.asarray(data[d[2]], dtype=float)
+                value_range = int(len(values) * percentage)
                 if value_range < 1:
                     continue
-                median = np.median(data[d[2]][-value_range:])
-                mean = np.mean(data[d[2]][-value_range:])
-                std = np.std(data[d[2]][-value_range:])
-                min_value = np.min(data[d[2]][-value_range:])
-                max_value = np.max(data[d[2]][-value_range:])
-                f.write('{:13}  {:>13.3f}  {:>13.3f}  {:>13.3f} {:>13.3f} {:>13.3f}\n'.format(
-                    str(c), median, mean, std, min_value, max_value))
+                summary = summarize(values[-value_range:])
+                f.write(format_summary(str(c), summary))
+
+    if len(pcap_data.drops) > 0:
+        f.write('\n{:-<58}\n\nDropped at the bottleneck:\n'.format(''))
+        total = 0
+        for c in sorted(pcap_data.drops):
+            total += len(pcap_data.drops[c][0])
+            f.write('{:13}  {:>11}\n'.format(str(c), len(pcap_data.drops[c][0])))
+        f.write('{:13}  {:>11}\n'.format('Total', total))
 
     f.close()
@@ -0,0 +1,264 @@
+import bisect
+import glob
+import os
+
+from helper import FIDELITY_FILE, BUFFER_FILE_EXTENSION, FLOW_FILE_EXTENSION, PARAMETERS_FILE, EVENT_FILE
+from helper.util import open_compressed_file, parse_rate
+
+# A CPU busy for more than this fraction of a poll interval is saturated
+CPU_BUSY_THRESHOLD = 0.95
+# Thresholds for a degraded emulation
+CPU_SATURATED_THRESHOLD = 0.05
+SOFTIRQ_THRESHOLD = 0.5
+UTILIZATION_THRESHOLD = 0.9
+RTT_THRESHOLD = 0.1
+# Absolute tolerance of the base RTT for the serialization and the poll interval, in ms
+RTT_TOLERANCE = 2.0
+
+VERDICT_PREFIX = 'Fidelity: '
+PROBLEM_PREFIX = 'Fidelity problem: '
+
+
+class SystemSample:
+    def __init__(self, busy, softirq, tx_bytes, tx_packets):
+        self.busy = busy
+        self.softirq = softirq
+        self.tx_bytes = tx_bytes
+        self.tx_packets = tx_packets
+
+    def to_line(self, timestamp):
+        """
+        Mean and maximum busy and softirq fraction of all CPUs since the last poll and the raw counters of the
+        bottleneck interface:
+            <timestamp>;<busy mean>;<busy max>;<softirq mean>;<softirq max>;<tx bytes>;<tx packets>
+        """
+        return '{:.6f};{:.4f};{:.4f};{:.4f};{:.4f};{};{}\n'.format(
+            timestamp, sum(self.busy) / len(self.busy), max(self.busy),
+            sum(self.softirq) / len(self.softirq), max(self.softirq), self.tx_bytes, self.tx_packets)
+
+
+def read_cpu_times():
+    """
+    Total and (busy, softirq) jiffies of every CPU from /proc/stat.
+    """
+    times = {}
+    with open('/proc/stat') as f:
+        for line in f:
+            if not line.startswith('cpu') or line.startswith('cpu '):
+                continue
+            split = line.split()
+            # user nice system idle iowait irq softirq steal, guests are included in user and nice
+            values = [int(x) for x in split[1:9]]
+            idle = values[3] + values[4]
+            times[split[0]] = (sum(values), sum(values) - idle, values[6])
+    return times
+
+
+class SystemStats:
+    """
+    Load of all CPUs and the transmitted bytes of an interface of the root network namespace.
+    """
+
+    def __init__(self, interface):
+        self.statistics = '/sys/class/net/{}/statistics'.format(interface)
+        self.last = read_cpu_times()
+
+    def read_counter(self, name):
+        with open(os.path.join(self.statistics, name)) as f:
+            return int(f.read())
+
+    def query(self):
+        times = read_cpu_times()
+        busy = []
+        softirq = []
+        for cpu, (total, cpu_busy, cpu_softirq) in times.items():
+            if cpu not in self.last or total <= self.last[cpu][0]:
+                continue
+            elapsed = float(total - self.last[cpu][0])
+            busy.append((cpu_busy - self.last[cpu][1]) / elapsed)
+            softirq.append((cpu_softirq - self.last[cpu][2]) / elapsed)
+        self.last = times
+        if len(busy) == 0:
+            # less than a jiffy since the last poll
+            return None
+        return SystemSample(busy, softirq, self.read_counter('tx_bytes'), self.read_counter('tx_packets'))
+
+
+def parse_fidelity(path):
+    """
+    Returns the timestamps and columns of the fidelity samples of a run: busy mean, busy max, softirq mean,
+    softirq max, tx bytes and tx packets.
+    """
+    output = ([], [], [], [], [], [], [])
+    file_path = os.path.join(path, FIDELITY_FILE)
+    if not os.path.isfile(file_path):
+        return output
+    with open(file_path) as f:
+        for line in f:
+            split = line.strip().split(';')
+            if len(split) != 7:
+                continue
+            output[0].append(float(split[0]))
+            for i in range(1, 5):
+                output[i].append(float(split[i]))
+            output[5].append(int(split[5]))
+            output[6].append(int(split[6]))
+    return output
+
+
+def parse_backlog(path):
+    """
+    Timestamps and backlog in bytes of the bottleneck qdisc in time order.
+    """
+    samples = []
+    for file_path in glob.glob(os.path.join(path, '*.{}*'.format(BUFFER_FILE_EXTENSION))):
+        f = open_compressed_file(file_path)
+        for line in f:
+            split = line.split(';')
+            try:
+                samples.append((float(split[0]), int(split[1])))
+            except (IndexError, ValueError):
+                continue
+        f.close()
+    samples.sort()
+    return [ts for ts, _ in samples], [b for _, b in samples]
+
+
+def read_bandwidth_changes(path):
+    """
+    Timestamps and rates in bytes/s of the configured bottleneck bandwidth from the parameters and the event log of
+    a run. The initial bandwidth applies from the start.
+    """
+    changes = []
+    parameters = os.path.join(path, PARAMETERS_FILE)
+    if os.path.isfile(parameters):
+        with open(parameters) as f:
+            for line in f:
+                if line.startswith('Initial Bandwidth: '):
+                    changes.append((0, parse_rate(line.split(': ', 1)[1].strip())))
+    events = os.path.join(path, EVENT_FILE)
+    if os.path.isfile(events):
+        with open(events) as f:
+            f.readline()
+            for line in f:
+                split = line.strip().split(';')
+                if len(split) == 5 and split[4].startswith('link bw '):
+                    changes.append((float(split[1]), parse_rate(split[4][len('link bw '):])))
+    return changes
+
+
+def utilization(samples, backlog, bandwidth):
+    """
+    Rate of the bottleneck interface relative to the configured rate for every poll interval in which the
+    bottleneck queue was backlogged, i.e. the link should have been busy all the time.
+    bandwidth is a list of (timestamp, rate in bytes/s) of all bandwidth changes.
+    Returns the end timestamps and utilization of these intervals.
+    """
+    timestamps, utilizations = [], []
+    for i in range(1, len(samples[0])):
+        start, end = samples[0][i - 1], samples[0][i]
+        first = bisect.bisect_left(backlog[0], start)
+        last = bisect.bisect_right(backlog[0], end)
+        if first == last or min(backlog[1][first:last]) == 0:
+            continue
+        rates = [rate for ts, rate in bandwidth if ts <= start]
+        if len(rates) == 0 or any(start < ts <= end for ts, _ in bandwidth):
+            # before the bottleneck was set up or the configured rate changed within the interval
+            continue
+        timestamps.append(end)
+        utilizations.append((samples[5][i] - samples[5][i - 1]) / (end - start) / rates[-1])
+    return timestamps, utilizations
+
+
+def min_rtt(path, address):
+    """
+    Minimum RTT in ms polled from the sockets of a sender.
+    """
+    values = []
+    for file_path in glob.glob(os.path.join(path, '{}.{}*'.format(address, FLOW_FILE_EXTENSION))):
+        f = open_compressed_file(file_path)
+        for line in f:
+            split = line.split(';')
+            try:
+                rtt = float(split[6])
+            except (IndexError, ValueError):
+                continue
+            if rtt > 0:
+                values.append(rtt)
+        f.close()
+    return min(values) if len(values) > 0 else None
+
+
+def fidelity_series(path):
+    """
+    CPU load and bottleneck utilization of a run for the plots, all as fraction.
+    """
+    samples = parse_fidelity(path)
+    if len(samples[0]) == 0:
+        return {}
+    return {
+        'CPU busy mean': (samples[0], samples[1]),
+        'CPU busy max': (samples[0], samples[2]),
+        'Softirq max': (samples[0], samples[4]),
+        'Utilization': utilization(samples, parse_backlog(path), read_bandwidth_changes(path)),
+    }
+
+
+def evaluate_fidelity(path, base_rtts):
+    """
+    Compare the load, the achieved bottleneck rate and the base RTT of every sender during a run with the configured
+    values. base_rtts maps the address of every sender to its configured base RTT in ms.
+    Returns the lines for the parameters of the run, the verdict first.
+    """
+    samples = parse_fidelity(path)
+    details = []
+    problems = []
+
+    if len(samples[0]) > 0:
+        saturated = sum(1 for b in samples[2] if b >= CPU_BUSY_THRESHOLD) / float(len(samples[0]))
+        softirq = max(samples[4])
+        details.append('Fidelity CPU: busy mean {:.2f}, max {:.2f}, saturated {:.1%} of polls, softirq max {:.2f}'
+                       .format(sum(samples[1]) / len(samples[1]), max(samples[2]), saturated, softirq))
+        if saturated > CPU_SATURATED_THRESHOLD:
+            problems.append('A CPU was saturated during {:.1%} of the run.'.format(saturated))
+        if softirq > SOFTIRQ_THRESHOLD:
+            problems.append('Packet processing in softirq took up to {:.0%} of a CPU.'.format(softirq))
+
+        intervals = utilization(samples, parse_backlog(path), read_bandwidth_changes(path))[1]
+        if len(intervals) > 0:
+            mean = sum(intervals) / len(intervals)
+            details.append('Fidelity utilization: {:.3f} of the configured rate in {} backlogged polls'.format(
+                mean, len(intervals)))
+            if mean < UTILIZATION_THRESHOLD:
+                problems.append('The bottleneck only achieved {:.1%} of the configured rate while backlogged.'.format(
+                    mean))
+
+    for address in sorted(base_rtts):
+        observed = min_rtt(path, address)
+        if observed is None:
+            continue
+        configured = base_rtts[address]
+        details.append('Fidelity RTT {}: observed {:.2f}ms, configured {:.2f}ms'.format(address, observed, configured))
+        if abs(observed - configured) > configured * RTT_THRESHOLD + RTT_TOLERANCE:
+            problems.append('The base RTT of {} was {:.2f}ms instead of {:.2f}ms.'.format(address, observed,
+                                                                                          configured))
+
+    verdict = VERDICT_PREFIX + ('degraded' if len(problems) > 0 else 'ok')
+    if len(details) == 0:
+        verdict = VERDICT_PREFIX + 'unknown'
+    return [verdict] + [PROBLEM_PREFIX + p for p in problems] + details
+
+
+def check_fidelity(path):
+    """
+    Warnings for the fidelity problems recorded in the parameters of a run.
+    """
+    warnings = []
+    parameters = os.path.join(path, PARAMETERS_FILE)
+    if not os.path.isfile(parameters):
+        return warnings
+    with open(parameters) as f:
+        for line in f:
+            if line.startswith(PROBLEM_PREFIX):
+                warnings.append(line[len(PROBLEM_PREFIX):].strip())
+    return warnings
@@ -0,0 +1,41 @@
+import bisect
+
+
+class FlowIndex:
+    """
+    Maps the 4-tuple (client ip, client port, server ip, server port) of a socket and a timestamp to the index of
+    the connection in the captures. A tuple reused by a later connection belongs to the last connection that started
+    before the timestamp.
+    """
+
+    def __init__(self, connections, starts):
+        self.connections = len(connections)
+        self.starts = {}
+        self.indices = {}
+        for index, (tcp_tuple, start) in sorted(enumerate(zip(connections, starts)), key=lambda c: c[1][1]):
+            self.starts.setdefault(tcp_tuple, []).append(start)
+            self.indices.setdefault(tcp_tuple, []).append(index)
+
+    def split(self, tcp_tuple, timestamps):
+        """
+        Slices (connection index, first, last) of the timestamps of a socket in time order per connection.
+        """
+        if tcp_tuple not in self.indices:
+            return []
+        starts = self.starts[tcp_tuple]
+        indices = self.indices[tcp_tuple]
+        if len(indices) == 1:
+            return [(indices[0], 0, len(timestamps))]
+
+        slices = []
+        first = 0
+        for position in range(len(indices)):
+            # samples before the first start belong to the first connection
+            if position + 1 < len(indices):
+                last = bisect.bisect_left(timestamps, starts[position + 1], lo=first)
+            else:
+                last = len(timestamps)
+            if last > first:
+                slices.append((indices[position], first, last))
+            first = last
+        return slices
@@ -0,0 +1,47 @@
+import sys
+
+# Server port of the first flow of every host pair, further flows use the following ports
+BASE_PORT = 9000
+
+
+def send_command(cmd, ip, port):
+    if cmd['generator'] == 'workload':
+        return '{} traffic.py workload {} {} --arrival-rate {} --size {} --distribution {} --duration {}'.format(
+            sys.executable, ip, port, cmd['arrival_rate'], cmd['size'], cmd['distribution'], cmd['stop'])
+    if cmd['generator'] == 'sendfile':
+        command = '{} traffic.py send {} {}'.format(sys.executable, ip, port)
+        if cmd['rate'] is not None:
+            command += ' --rate {}'.format(cmd['rate'])
+        return command
+    return 'nc {} {} < /dev/urandom'.format(ip, port)
+
+
+def sink_command(cmd, port):
+    if cmd['generator'] in ['sendfile', 'workload']:
+        return '{} traffic.py sink {}'.format(sys.executable, port)
+    return 'nc -klp {}'.format(port)
+
+
+def background(commands, timeout):
+    # every job ends with '&', which already separates it from the next command
+    return ' '.join('timeout {} {} > /dev/null &'.format(timeout, c) for c in commands)
+
+
+def sender_setup(interface, algorithm):
+    return '; '.join([
+        'tc qdisc add dev {} root fq pacing'.format(interface),
+        'ip route change 10.0.0.0/8 dev {} congctl {}'.format(interface, algorithm),
+        'ethtool -K {} tso off'.format(interface),
+    ])
+
+
+def receiver_setup(interface, cmd, duration):
+    """
+    Delay of the receiver and one listener per flow, so every flow of the host pair has its own 4-tuple.
+    """
+    return 'tc qdisc add dev {} root netem delay {}; {}'.format(
+        interface, cmd['rtt'], background([sink_command(cmd, BASE_PORT + i) for i in range(cmd['flows'])], duration))
+
+
+def start_flows(cmd, ip):
+    return background([send_command(cmd, ip, BASE_PORT + i) for i in range(cmd['flows'])], cmd['stop'])
@@ -0,0 +1,116 @@
+import errno
+import json
+import os
+import shutil
+
+import numpy as np
+
+from helper import HTML_PATH
+
+# Every level of the pyramid reduces FACTOR values of the level below to their minimum and maximum
+FACTOR = 4
+# Values per binary chunk, the client fetches only the chunks of the visible range
+CHUNK_POINTS = 4096
+
+RECORD = np.dtype([('t', '<f8'), ('min', '<f4'), ('max', '<f4')])
+
+TEMPLATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'report.html')
+DATA_PATH = 'data'
+INDEX_FILE = 'report.json'
+
+# name, attribute of PcapData, column, title, unit, with total
+REPORT_SERIES = [
+    ('sending_rate', 'sending_rate', 1, 'Sending Rate', 'bit/s', True),
+    ('throughput', 'throughput', 1, 'Throughput', 'bit/s', True),
+    ('goodput', 'goodput', 1, 'Goodput', 'bit/s', True),
+    ('fairness', 'fairness', 1, 'Fairness', "Jain's Index", False),
+    ('retransmission', 'retransmissions_interval', 1, 'Retransmissions', '#', True),
+    ('avg_rtt', 'avg_rtt', 1, 'Avg RTT', 'ms', False),
+    ('rtt', 'rtt', 1, 'RTT', 'ms', False),
+    ('sojourn_time', 'sojourn_time', 1, 'Sojourn Time', 'ms', False),
+    ('fidelity', 'fidelity', 1, 'Emulation Fidelity', 'fraction', False),
+    ('inflight', 'inflight', 1, 'Inflight', 'bit', False),
+    ('cwnd', 'cwnd_values', 1, 'CWnd', 'MSS', False),
+    ('buffer_backlog', 'buffer_backlog', 1, 'Buffer Backlog', 'bit', False),
+    ('bdp', 'bbr_values', 5, 'BDP', 'bit', False),
+    ('btl_bw', 'bbr_values', 1, 'BtlBw', 'bit/s', False),
+    ('rt_prop', 'bbr_values', 2, 'RTprop', 'ms', False),
+    ('window_gain', 'bbr_values', 4, 'Window Gain', '', False),
+    ('pacing_gain', 'bbr_values', 3, 'Pacing Gain', '', False),
+]
+
+
+def build_pyramid(timestamps, values):
+    """
+    Levels of (t, min, max) records, from the samples themselves up to a level that fits into a single chunk.
+    """
+    level = np.empty(len(timestamps), dtype=RECORD)
+    level['t'] = timestamps
+    level['min'] = values
+    level['max'] = values
+    levels = [level]
+    while len(level) > CHUNK_POINTS:
+        starts = np.arange(0, len(level), FACTOR)
+        reduced = np.empty(len(starts), dtype=RECORD)
+        reduced['t'] = level['t'][starts]
+        reduced['min'] = np.minimum.reduceat(level['min'], starts)
+        reduced['max'] = np.maximum.reduceat(level['max'], starts)
+        level = reduced
+        levels.append(level)
+    return levels
+
+
+def write_series(path, name, timestamps, values):
+    levels = []
+    for n, level in enumerate(build_pyramid(timestamps, values)):
+        chunks = []
+        for i, start in enumerate(range(0, len(level), CHUNK_POINTS)):
+            chunk = level[start:start + CHUNK_POINTS]
+            file_name = '{}_{}_{}.bin'.format(name, n, i)
+            chunk.tofile(os.path.join(path, DATA_PATH, file_name))
+            chunks.append({'file': file_name, 't0': float(chunk['t'][0]), 't1': float(chunk['t'][-1]),
+                           'n': len(chunk)})
+        levels.append({'factor': FACTOR ** n, 'chunks': chunks})
+    return levels
+
+
+def write_report(path, pcap_data, title, plot_only):
+    """
+    Write the min/max pyramid of every series as binary chunks, the index of all chunks and the viewer to
+    html_report/ of the result directory.
+    """
+    path = os.path.join(path, HTML_PATH)
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    try:
+        os.makedirs(os.path.join(path, DATA_PATH))
+    except OSError as exc:  # Guard against race condition
+        if exc.errno != errno.EEXIST:
+            raise
+
+    t_min = pcap_data.get_min_ts()
+    t_max = pcap_data.get_max_ts()
+
+    charts = []
+    for name, attribute, column, chart_title, unit, with_total in REPORT_SERIES:
+        if name not in plot_only:
+            continue
+        data = getattr(pcap_data, attribute)
+        total = len(data) - 1 if with_total else None
+
+        series = []
+        for c in sorted(data, key=str):
+            timestamps = np.asarray(data[c][0], dtype=float)
+            if len(timestamps) == 0:
+                continue
+            values = np.asarray(data[c][column], dtype=float)
+            series_name = '{}_{}'.format(name, len(series))
+            label = 'Total' if c == total else str(c)
+            series.append({'label': label, 'levels': write_series(path, series_name, timestamps - t_min, values)})
+
+        if len(series) > 0:
+            charts.append({'name': name, 'title': chart_title, 'unit': unit, 'series': series})
+
+    with open(os.path.join(path, INDEX_FILE), 'w') as f:
+        json.dump({'title': title, 'duration': t_max - t_min, 'charts': charts}, f)
+    shutil.copy(TEMPLATE, os.path.join(path, 'index.html'))
@@ -0,0 +1,162 @@
+import contextlib
+import gc
+import re
+
+from helper.util import open_compressed_file
+
+# Text read from the log files at once, split at the last complete line
+CHUNK_SIZE = 16 * 1024 * 1024
+
+# <timestamp>;<cwnd>;<ssthresh>;<bbr>[;<pacing_rate>;<delivery_rate>;<rtt>;<retrans>[;<src>;<sport>;<dst>;<dport>]]
+# of ss_poller.py and the former ss_script.sh, the 4-tuple of the socket is missing in older files.
+# The bbr column bw:5Mbps,mrtt:20,pacing_gain:1.25,cwnd_gain:2 is split directly, newer ss versions wrap it in
+# bbr:(...) and add further keys, which are skipped. Any other bbr column is captured as a whole and parsed with
+# BBR_FIELD.
+FLOW_LINE = re.compile(r'^[ \t]*([0-9.]+)[ \t]*;[ \t]*([0-9]*)[ \t]*;[ \t]*([0-9]*)[ \t]*;[ \t]*'
+                       r'(?:(?:bbr:\(?)?bw:([0-9.]+(?:[eE][-+]?[0-9]+)?)([KMG]?bps),mrtt:([0-9.]+)'
+                       r'(?:,pacing_gain:([0-9.]+),cwnd_gain:([0-9.]+))?[^;\n]*|([^;\n]*))'
+                       r'(?:(?:;[^;\n]*){4};([0-9.]+);([0-9]+);([0-9.]+);([0-9]+))?[^\n]*\n?', re.M)
+BBR_FIELD = re.compile(r'(bw|mrtt|pacing_gain|cwnd_gain):([0-9.]+(?:[eE][-+]?[0-9]+)?)([KMG]?bps)?')
+# <timestamp>;<backlog>[;...], buffer_poller.py writes raw bytes, old tc output is formatted with units, e.g. 12Kb
+BUFFER_LINE = re.compile(r'^[ \t]*([0-9.]+)[ \t]*;[ \t]*([0-9.]+)([KMG]?)b?[ \t]*(?:;[^\n]*)?$\n?', re.M)
+
+RATE_UNITS = {
+    'bps': 1,
+    'Kbps': 1000,
+    'Mbps': 1000000,
+    'Gbps': 1000000000,
+}
+SIZE_UNITS = {
+    '': 1,
+    'K': 1000,
+    'M': 1000000,
+    'G': 1000000000,
+}
+
+
+@contextlib.contextmanager
+def paused_gc():
+    """
+    The values parsed from a file are millions of small objects without cycles, collecting them while they are
+    allocated only repeatedly traverses the growing lists.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def text_chunks(path, chunk_size=CHUNK_SIZE):
+    """
+    Yield the text of a (compressed) file in chunks of complete lines.
+    """
+    f = open_compressed_file(path)
+    rest = ''
+    while True:
+        data = f.read(chunk_size)
+        if not isinstance(data, str):
+            data = data.decode('utf-8', 'replace')
+        if data == '':
+            break
+        data = rest + data
+        end = data.rfind('\n') + 1
+        rest = data[end:]
+        if end > 0:
+            yield data[:end]
+    f.close()
+    if rest != '':
+        yield rest
+
+
+def parse_bbr_field(field):
+    """
+    bw, unit, min rtt, pacing gain and cwnd gain of a bbr column in any order, empty if missing.
+    """
+    values = dict((key, (value, unit)) for key, value, unit in BBR_FIELD.findall(field))
+    if 'mrtt' not in values:
+        return '', '', '', '', ''
+    bw, unit = values.get('bw', ('0', ''))
+    pacing_gain = values.get('pacing_gain', ('', ''))[0]
+    cwnd_gain = values.get('cwnd_gain', ('', ''))[0]
+    return bw, unit, values['mrtt'][0], pacing_gain, cwnd_gain
+
+
+def parse_flow_file(path):
+    """
+    Returns the BBR values (timestamp, bw in bit/s, min rtt in ms, pacing gain, cwnd gain, bdp in bit) and the
+    cwnd values (timestamp, cwnd, ssthresh) of every socket of a .bbr file, keyed by the 4-tuple of the socket
+    (client ip, client port, server ip, server port) or None for samples without it.
+    """
+    output = {}
+
+    with paused_gc():
+        for chunk in text_chunks(path):
+            lines = FLOW_LINE.findall(chunk)
+            if len(lines) == 0:
+                continue
+            columns = list(zip(*lines))
+            keys = [(src, int(sport), dst, int(dport)) if src != '' else None
+                    for src, sport, dst, dport in zip(*columns[9:13])]
+            if all(k == keys[0] for k in keys):
+                groups = {keys[0]: columns}
+            else:
+                rows = {}
+                for i, key in enumerate(keys):
+                    rows.setdefault(key, []).append(i)
+                groups = dict((key, [[column[i] for i in rows[key]] for column in columns]) for key in rows)
+
+            for key in groups:
+                if key not in output:
+                    output[key] = (([], [], [], [], [], []), ([], [], []))
+                add_flow_samples(output[key][0], output[key][1], groups[key])
+
+    return output
+
+
+def add_flow_samples(bbr_values, cwnd_values, columns):
+    timestamps, cwnd, ssthresh, bw, unit, rtt, pacing_gain, cwnd_gain, other = columns[:9]
+    timestamps = [float(t) for t in timestamps]
+    cwnd_values[0].extend(timestamps)
+    cwnd_values[1].extend([int(c) if c != '' else 0 for c in cwnd])
+    cwnd_values[2].extend([int(s) if s != '' else 0 for s in ssthresh])
+
+    fallback = [i for i, field in enumerate(other) if field.strip() != '']
+    if len(fallback) > 0:
+        columns = [list(bw), list(unit), list(rtt), list(pacing_gain), list(cwnd_gain)]
+        for i in fallback:
+            for column, value in zip(columns, parse_bbr_field(other[i])):
+                column[i] = value
+        bw, unit, rtt, pacing_gain, cwnd_gain = columns
+
+    rows = [i for i, r in enumerate(rtt) if r != '']
+    if len(rows) == 0:
+        return
+    # without unit the bandwidth is unknown, without gains both are zero
+    bw = [float(bw[i]) * RATE_UNITS[unit[i]] if unit[i] != '' else 0 for i in rows]
+    rtt = [float(rtt[i]) for i in rows]
+    gains = [pacing_gain[i] != '' and cwnd_gain[i] != '' for i in rows]
+    bbr_values[0].extend([timestamps[i] for i in rows])
+    bbr_values[1].extend(bw)
+    bbr_values[2].extend(rtt)
+    bbr_values[3].extend([float(pacing_gain[i]) if g else 0 for i, g in zip(rows, gains)])
+    bbr_values[4].extend([float(cwnd_gain[i]) if g else 0 for i, g in zip(rows, gains)])
+    bbr_values[5].extend([b * r / 1000 for b, r in zip(bw, rtt)])
+
+
+def parse_buffer_file(path):
+    """
+    Returns the timestamps and the backlog in bit of a .buffer file.
+    """
+    output = ([], [])
+    with paused_gc():
+        for chunk in text_chunks(path):
+            lines = BUFFER_LINE.findall(chunk)
+            if len(lines) == 0:
+                continue
+            timestamps, sizes, units = zip(*lines)
+            output[0].extend([float(t) for t in timestamps])
+            output[1].extend([float(s) * SIZE_UNITS[u] * 8 for s, u in zip(sizes, units)])
+    return output
@@ -0,0 +1,138 @@
+import glob
+import hashlib
+import json
+import os
+
+from helper import MANIFEST_FILE, PCAP1, PCAP2, FLOW_FILE_EXTENSION, BUFFER_FILE_EXTENSION, FIDELITY_FILE, EVENT_FILE
+from helper.util import find_capture_files
+
+MANIFEST_VERSION = 1
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def input_files(path):
+    # everything parse_pcap reads
+    files = find_capture_files(os.path.join(path, PCAP1)) + find_capture_files(os.path.join(path, PCAP2))
+    for extension in [FLOW_FILE_EXTENSION, BUFFER_FILE_EXTENSION]:
+        files += sorted(glob.glob(os.path.join(path, '*.{}*'.format(extension))))
+    for name in [FIDELITY_FILE, EVENT_FILE]:
+        if os.path.isfile(os.path.join(path, name)):
+            files.append(os.path.join(path, name))
+    return files
+
+
+def directory_files(path):
+    if not os.path.isdir(path):
+        return []
+    return sorted(os.path.join(path, f) for f in os.listdir(path) if os.path.isfile(os.path.join(path, f)))
+
+
+def hash_file(path):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(HASH_BLOCK_SIZE)
+            if not block:
+                break
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+class Manifest:
+    """
+    Records for each output stage of the analysis (csv, plot) the key of its inputs and options and the checksums
+    of its outputs, so that only stages whose inputs, options or outputs changed are run again.
+    File hashes are cached by size and modification time, unchanged captures are not read again.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_FILE)
+        self.files = {}
+        self.stages = {}
+
+        if os.path.isfile(self.path):
+            try:
+                with open(self.path) as f:
+                    data = json.load(f)
+                if data.get('version') == MANIFEST_VERSION:
+                    self.files = data['files']
+                    self.stages = data['stages']
+            except ValueError:
+                # truncated by a crash, everything is redone
+                pass
+
+    def relative(self, path):
+        return os.path.relpath(path, self.directory)
+
+    def file_hash(self, path):
+        """
+        Checksum of a file or None if it does not exist.
+        """
+        if not os.path.isfile(path):
+            return None
+        stat = os.stat(path)
+        name = self.relative(path)
+        cached = self.files.get(name)
+        if cached is not None and cached['size'] == stat.st_size and cached['mtime'] == stat.st_mtime:
+            return cached['sha1']
+        sha1 = hash_file(path)
+        self.files[name] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha1': sha1}
+        return sha1
+
+    def key(self, files, options):
+        sha1 = hashlib.sha1()
+        for path in files:
+            sha1.update('{}={}\n'.format(self.relative(path), self.file_hash(path)).encode('utf-8'))
+        sha1.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+        return sha1.hexdigest()
+
+    def outputs_intact(self, stage):
+        for name, sha1 in self.stages[stage]['outputs'].items():
+            if self.file_hash(os.path.join(self.directory, name)) != sha1:
+                return False
+        return True
+
+    def is_current(self, stage, key=None, source=None):
+        """
+        True if the stage was completed with the given key and source, and its outputs are unchanged.
+        """
+        if stage not in self.stages:
+            return False
+        entry = self.stages[stage]
+        if key is not None and entry['key'] != key:
+            return False
+        if source is not None and entry['source'] != source:
+            return False
+        return self.outputs_intact(stage)
+
+    def outputs(self, stage):
+        if stage not in self.stages:
+            return []
+        return [os.path.join(self.directory, name) for name in sorted(self.stages[stage]['outputs'])]
+
+    def record(self, stage, key, outputs, source=None):
+        self.stages[stage] = {
+            'key': key,
+            'source': source,
+            'outputs': dict((self.relative(path), self.file_hash(path)) for path in outputs),
+        }
+        self.save()
+
+    def invalidate(self, stage=None):
+        if stage is None:
+            self.stages = {}
+        else:
+            self.stages.pop(stage, None)
+        self.save()
+
+    def save(self):
+        # hashes of deleted files are dropped
+        self.files = dict((name, value) for name, value in self.files.items()
+                          if os.path.isfile(os.path.join(self.directory, name)))
+
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': self.files, 'stages': self.stages}, f,
+                      indent=1, sort_keys=True)
+        os.rename(temporary, self.path)
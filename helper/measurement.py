@@ -0,0 +1,108 @@
+import json
+import os
+import re
+
+from helper import PARAMETERS_FILE
+
+POLL_STATISTICS_PREFIX = 'Poll statistics: '
+
+# Thresholds for warnings of analyze.py
+CAPTURE_LOSS_THRESHOLD = 0.001
+POLL_DELAY_THRESHOLD = 0.1
+POLL_MISSED_THRESHOLD = 0.01
+MEASUREMENT_CPU_THRESHOLD = 0.5
+
+TCPDUMP_COUNTERS = {
+    'captured': 'captured',
+    'received by filter': 'received',
+    'dropped by kernel': 'dropped',
+    'dropped by interface': 'dropped_interface',
+}
+
+CAPTURE_LINE = re.compile(r'Capture (\S+): captured (\d+), received (\d+), dropped (\d+), '
+                          r'cpu ([0-9.]+)s of ([0-9.]+)s')
+POLLER_LINE = re.compile(r'Poller (\S+): requested ([0-9.]+)s, mean ([0-9.]+)s, max ([0-9.]+)s, '
+                         r'missed (\d+) of (\d+), cpu ([0-9.]+)s of ([0-9.]+)s')
+
+
+def parse_tcpdump_statistics(output):
+    """
+    Counters tcpdump prints to stderr when it is stopped, e.g. "12 packets dropped by kernel".
+    """
+    statistics = {}
+    for count, counter in re.findall(r'(\d+) packets? (captured|received by filter|dropped by \w+)', output):
+        if counter in TCPDUMP_COUNTERS:
+            statistics[TCPDUMP_COUNTERS[counter]] = int(count)
+    return statistics
+
+
+def format_capture(name, statistics, cpu, elapsed):
+    if 'captured' not in statistics:
+        return 'Capture {}: no statistics, cpu {:.2f}s of {:.1f}s'.format(name, cpu, elapsed)
+    return 'Capture {}: captured {}, received {}, dropped {}, cpu {:.2f}s of {:.1f}s'.format(
+        name, statistics['captured'], statistics.get('received', 0),
+        statistics.get('dropped', 0) + statistics.get('dropped_interface', 0), cpu, elapsed)
+
+
+def print_poll_statistics(statistics):
+    # read by run_mininet.py from the output of the poller
+    print(POLL_STATISTICS_PREFIX + json.dumps(statistics))
+
+
+def parse_poll_statistics(output):
+    for line in output.splitlines():
+        if line.startswith(POLL_STATISTICS_PREFIX):
+            return json.loads(line[len(POLL_STATISTICS_PREFIX):])
+    return None
+
+
+def format_poller(name, statistics, cpu, elapsed):
+    if statistics is None:
+        return 'Poller {}: no statistics, cpu {:.2f}s of {:.1f}s'.format(name, cpu, elapsed)
+    return 'Poller {}: requested {:.4f}s, mean {:.4f}s, max {:.4f}s, missed {} of {}, cpu {:.2f}s of {:.1f}s'.format(
+        name, statistics['interval'], statistics['mean'], statistics['max'], statistics['missed'],
+        statistics['polls'] + statistics['missed'], cpu, elapsed)
+
+
+def check_measurement(path):
+    """
+    Warnings for capture loss, late polls and CPU usage of the measurement processes recorded in the parameters.
+    """
+    warnings = []
+    parameters = os.path.join(path, PARAMETERS_FILE)
+    if not os.path.isfile(parameters):
+        return warnings
+
+    with open(parameters) as f:
+        for line in f:
+            capture = CAPTURE_LINE.match(line)
+            if capture is not None:
+                name = capture.group(1)
+                captured, received, dropped = [int(x) for x in capture.group(2, 3, 4)]
+                cpu, elapsed = [float(x) for x in capture.group(5, 6)]
+                # on Linux the packets received by the filter include the dropped ones
+                total = max(received, captured + dropped, 1)
+                if dropped > CAPTURE_LOSS_THRESHOLD * total:
+                    warnings.append('tcpdump {} dropped {} of {} packets, throughput and RTT are incomplete.'.format(
+                        name, dropped, total))
+                warnings += check_cpu('tcpdump {}'.format(name), cpu, elapsed)
+
+            poller = POLLER_LINE.match(line)
+            if poller is not None:
+                name = poller.group(1)
+                interval, mean, maximum = [float(x) for x in poller.group(2, 3, 4)]
+                missed, ticks = [int(x) for x in poller.group(5, 6)]
+                cpu, elapsed = [float(x) for x in poller.group(7, 8)]
+                if mean > interval * (1 + POLL_DELAY_THRESHOLD):
+                    warnings.append('{} polled every {:.4f}s instead of {:.4f}s (max {:.4f}s).'.format(
+                        name, mean, interval, maximum))
+                if missed > POLL_MISSED_THRESHOLD * max(1, ticks):
+                    warnings.append('{} missed {} of {} polls.'.format(name, missed, ticks))
+                warnings += check_cpu(name, cpu, elapsed)
+    return warnings
+
+
+def check_cpu(name, cpu, elapsed):
+    if elapsed > 0 and cpu > MEASUREMENT_CPU_THRESHOLD * elapsed:
+        return ['{} used {:.0%} of a CPU and might have disturbed the emulation.'.format(name, cpu / elapsed)]
+    return []
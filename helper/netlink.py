@@ -0,0 +1,113 @@
+import ctypes
+import ctypes.util
+import os
+import socket
+import struct
+
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+
+NLM_F_REQUEST = 0x01
+NLM_F_ROOT = 0x100
+NLM_F_MATCH = 0x200
+NLM_F_DUMP = NLM_F_ROOT | NLM_F_MATCH
+
+NETLINK_ROUTE = 0
+NETLINK_SOCK_DIAG = 4
+
+CLONE_NEWNET = 0x40000000
+
+NLMSG_HEADER = struct.Struct('=IHHII')
+NLA_HEADER = struct.Struct('=HH')
+
+RECEIVE_BUFFER = 1 << 20
+
+_libc = None
+
+
+def align(length):
+    return (length + 3) & ~3
+
+
+def _setns(fd):
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    if _libc.setns(fd, CLONE_NEWNET) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+
+def open_socket(protocol, pid=None):
+    """
+    Open a netlink socket. If pid is given, the socket is created inside the network namespace of that
+    process and stays bound to it after switching back to the original namespace.
+    """
+    if pid is None:
+        return _open_socket(protocol)
+
+    own_ns = os.open('/proc/self/ns/net', os.O_RDONLY)
+    target_ns = os.open('/proc/{}/ns/net'.format(pid), os.O_RDONLY)
+    try:
+        _setns(target_ns)
+        try:
+            return _open_socket(protocol)
+        finally:
+            _setns(own_ns)
+    finally:
+        os.close(target_ns)
+        os.close(own_ns)
+
+
+def _open_socket(protocol):
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, protocol)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER)
+    sock.bind((0, 0))
+    return sock
+
+
+def pack_message(msg_type, flags, seq, payload):
+    return NLMSG_HEADER.pack(NLMSG_HEADER.size + len(payload), msg_type, flags, seq, 0) + payload
+
+
+def pack_attribute(attr_type, payload):
+    length = NLA_HEADER.size + len(payload)
+    return NLA_HEADER.pack(length, attr_type) + payload + b'\0' * (align(length) - length)
+
+
+def dump(sock, msg_type, payload, seq=0):
+    """
+    Send a dump request and yield (type, payload) of every reply message until NLMSG_DONE.
+    """
+    sock.send(pack_message(msg_type, NLM_F_REQUEST | NLM_F_DUMP, seq, payload))
+
+    while True:
+        data = sock.recv(RECEIVE_BUFFER)
+        offset = 0
+        while offset + NLMSG_HEADER.size <= len(data):
+            length, reply_type, _, _, _ = NLMSG_HEADER.unpack_from(data, offset)
+            if length < NLMSG_HEADER.size:
+                return
+            if reply_type == NLMSG_DONE:
+                return
+            if reply_type == NLMSG_ERROR:
+                error = -struct.unpack_from('=i', data, offset + NLMSG_HEADER.size)[0]
+                if error != 0:
+                    raise OSError(error, os.strerror(error))
+                return
+            yield reply_type, data[offset + NLMSG_HEADER.size:offset + length]
+            offset += align(length)
+
+
+def parse_attributes(data, offset=0):
+    """
+    Parse a sequence of netlink attributes into a dict {type: payload}.
+    """
+    attributes = {}
+    while offset + NLA_HEADER.size <= len(data):
+        length, attr_type = NLA_HEADER.unpack_from(data, offset)
+        if length < NLA_HEADER.size:
+            break
+        attributes[attr_type & 0x3fff] = data[offset + NLA_HEADER.size:offset + length]
+        offset += align(length)
+    return attributes
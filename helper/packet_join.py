@@ -0,0 +1,59 @@
+import collections
+
+
+class PacketJoin:
+    """
+    Streaming join of the data packets captured before (s1) and behind (s3) the bottleneck, keyed by connection,
+    sequence number and IP ID. Both captures must be fed in time order. A packet that has not arrived behind the
+    bottleneck within window seconds after its departure is counted as dropped, so only the packets of the last
+    window are kept in memory.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        # (connection, seq, ip id) -> departure timestamps, a retransmission might reuse the IP ID
+        self.pending = {}
+        # (departure timestamp, key) of all pending packets in the order of departure
+        self.departures = collections.deque()
+
+        self.sojourn_time = {}
+        self.drops = {}
+        self.unmatched = 0
+
+    def add_connection(self, connection):
+        self.sojourn_time[connection] = ([], [])
+        self.drops[connection] = ([],)
+
+    def departure(self, ts, connection, seq, ip_id):
+        key = (connection, seq, ip_id)
+        if key not in self.pending:
+            self.pending[key] = collections.deque()
+        self.pending[key].append(ts)
+        self.departures.append((ts, key))
+
+    def arrival(self, ts, connection, seq, ip_id):
+        self.expire(ts)
+
+        key = (connection, seq, ip_id)
+        if key not in self.pending:
+            # departed before the capture started or after the window
+            self.unmatched += 1
+            return
+        departure_ts = self.pending[key].popleft()
+        if len(self.pending[key]) == 0:
+            del self.pending[key]
+
+        self.sojourn_time[connection][0].append(departure_ts)
+        self.sojourn_time[connection][1].append((ts - departure_ts) * 1000)
+
+    def expire(self, now):
+        # driven by the arrivals only, packets sent after the capture behind the bottleneck stopped are not lost
+        while len(self.departures) > 0 and self.departures[0][0] < now - self.window:
+            ts, key = self.departures.popleft()
+            pending = self.pending.get(key)
+            # otherwise this departure has already been matched, the oldest departure of a key is matched first
+            if pending is not None and pending[0] == ts:
+                pending.popleft()
+                if len(pending) == 0:
+                    del self.pending[key]
+                self.drops[key[0]][0].append(ts)
@@ -1,6 +1,7 @@
 class PcapData:
     def __init__(self, rtt, inflight, throughput, fairness, avg_rtt, sending_rate, bbr_values,
                  bbr_total_values, cwnd_values, retransmissions, retransmissions_interval, buffer_backlog,
+                 flow_completion=None, sojourn_time=None, drops=None, goodput=None, fidelity=None,
                  data_info=None):
         self.rtt = rtt
         self.inflight = inflight
@@ -14,6 +15,11 @@ class PcapData:
         self.retransmissions = retransmissions
         self.retransmissions_interval = retransmissions_interval
         self.buffer_backlog = buffer_backlog
+        self.flow_completion = flow_completion if flow_completion is not None else {}
+        self.sojourn_time = sojourn_time if sojourn_time is not None else {}
+        self.drops = drops if drops is not None else {}
+        self.goodput = goodput if goodput is not None else {}
+        self.fidelity = fidelity if fidelity is not None else {}
         self.data_info = data_info
 
     def values_as_dict(self):
@@ -29,7 +35,12 @@ class PcapData:
             'cwnd_values': self.cwnd_values,
             'retransmissions': self.retransmissions,
             'retransmissions_interval': self.retransmissions_interval,
-            'buffer_backlog': self.buffer_backlog
+            'buffer_backlog': self.buffer_backlog,
+            'flow_completion': self.flow_completion,
+            'sojourn_time': self.sojourn_time,
+            'drops': self.drops,
+            'goodput': self.goodput,
+            'fidelity': self.fidelity,
         }
 
     @staticmethod
@@ -46,7 +57,12 @@ class PcapData:
             cwnd_values=pcap_dict['cwnd_values'],
             retransmissions=pcap_dict['retransmissions'],
             retransmissions_interval=pcap_dict['retransmissions_interval'],
-            buffer_backlog=pcap_dict['buffer_backlog']
+            buffer_backlog=pcap_dict['buffer_backlog'],
+            flow_completion=pcap_dict.get('flow_completion', {}),
+            sojourn_time=pcap_dict.get('sojourn_time', {}),
+            drops=pcap_dict.get('drops', {}),
+            goodput=pcap_dict.get('goodput', {}),
+            fidelity=pcap_dict.get('fidelity', {})
         )
 
     def get_min_ts(self):
@@ -70,6 +86,12 @@ class PcapData:
 
 class DataInfo:
 
-    def __init__(self, sync_duration, sync_phases):
+    def __init__(self, sync_duration, sync_phases, rtt_sketches=None, connections=None, connection_starts=None):
         self.sync_duration = sync_duration
         self.sync_phases = sync_phases
+        # (client ip, client port, server ip, server port) per connection index
+        self.connections = connections or []
+        # timestamp of the SYN of every connection
+        self.connection_starts = connection_starts or []
+        # QuantileSketch of all RTT samples per connection
+        self.rtt_sketches = rtt_sketches or {}
@@ -0,0 +1,104 @@
+import signal
+import time
+
+from helper.util import monotonic
+
+
+FLUSH_INTERVAL = 1.0
+
+
+class Poller:
+    """
+    A measurement source that appends one or more lines per poll to an output file.
+    samples returns the samples of one poll, close (if given) releases the source.
+    """
+
+    def __init__(self, output, samples, close=None):
+        self.output = open(output, 'a')
+        self.samples = samples
+        self.close_source = close
+
+    def poll(self):
+        samples = self.samples()
+        timestamp = time.time()
+        for sample in samples:
+            self.output.write(sample.to_line(timestamp))
+
+    def close(self):
+        if self.close_source is not None:
+            self.close_source()
+        self.output.close()
+
+
+def single_sample(query):
+    # samples of a source that returns one sample or None per poll
+    def samples():
+        sample = query()
+        if sample is None:
+            return []
+        return [sample]
+    return samples
+
+
+def run_pollers(interval, pollers):
+    """
+    Poll all sources on a fixed grid of absolute deadlines until SIGTERM/SIGINT is received or no source is left.
+    Returns the achieved poll intervals and the number of missed ticks.
+    """
+    running = [True]
+
+    def stop(*_):
+        running[0] = False
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    deadline = monotonic()
+    next_flush = deadline + FLUSH_INTERVAL
+
+    polls = 0
+    missed = 0
+    last_start = None
+    interval_sum = 0
+    interval_max = 0
+
+    while running[0] and len(pollers) > 0:
+        start = monotonic()
+        if last_start is not None:
+            interval_sum += start - last_start
+            interval_max = max(interval_max, start - last_start)
+        last_start = start
+        polls += 1
+
+        for poller in pollers[:]:
+            try:
+                poller.poll()
+            except (IOError, OSError):
+                # source is gone, e.g. the host or interface has been removed
+                poller.close()
+                pollers.remove(poller)
+
+        now = monotonic()
+        if now >= next_flush:
+            for poller in pollers:
+                poller.output.flush()
+            next_flush = now + FLUSH_INTERVAL
+
+        # Keep a fixed sampling grid and skip ticks that have already passed
+        deadline += interval
+        if deadline < now:
+            skipped = int((now - deadline) / interval) + 1
+            deadline += skipped * interval
+            missed += skipped
+        time.sleep(max(0, deadline - monotonic()))
+
+    for poller in pollers:
+        poller.close()
+
+    return {
+        'interval': interval,
+        'polls': polls,
+        'missed': missed,
+        'mean': interval_sum / (polls - 1) if polls > 1 else 0,
+        'max': interval_max,
+    }
@@ -0,0 +1,117 @@
+import cProfile
+import json
+import os
+import resource
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2
+    tracemalloc = None
+
+from helper import PROFILE_FILE, PROFILE_PATH
+
+
+def cpu_time():
+    # pool workers are included once they have been joined
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+class StageProfiler:
+    """
+    Wall time, CPU time and peak memory of consecutive stages. Every lap ends the current stage and starts the next.
+    Disabled profilers ignore all calls.
+    """
+
+    def __init__(self, enabled=False, cprofile=False):
+        self.enabled = enabled
+        self.cprofile = enabled and cprofile
+        self.stages = []
+        self.profiles = []
+        self.wall = 0
+        self.cpu = 0
+        self.profile = None
+
+    def start(self):
+        if not self.enabled:
+            return
+        self.stages = []
+        self.profiles = []
+        if tracemalloc is not None:
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+            tracemalloc.start()
+        self.mark()
+
+    def mark(self):
+        self.wall = time.time()
+        self.cpu = cpu_time()
+        if self.cprofile:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def lap(self, name):
+        if not self.enabled:
+            return
+        wall = time.time() - self.wall
+        cpu = cpu_time() - self.cpu
+
+        if self.cprofile:
+            self.profile.disable()
+            self.profiles.append((name, self.profile))
+
+        if tracemalloc is not None:
+            memory_source = 'tracemalloc'
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            else:
+                memory_source = 'tracemalloc since start'
+        else:
+            # high-water mark of the process, in kilobytes on Linux
+            memory_source = 'max rss'
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+        self.stages.append({
+            'stage': name,
+            'wall': wall,
+            'cpu': cpu,
+            'peak_memory_mb': peak,
+            'memory_source': memory_source,
+        })
+        self.mark()
+
+    def stop(self):
+        if self.cprofile:
+            self.profile.disable()
+        if tracemalloc is not None and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def total(self):
+        return sum(s['wall'] for s in self.stages)
+
+    def summary(self):
+        return '{:.2f}s ({})'.format(self.total(), ', '.join(
+            '{} {:.2f}s'.format(s['stage'], s['wall']) for s in self.stages))
+
+    def write_report(self, directory):
+        if not self.enabled:
+            return
+        with open(os.path.join(directory, PROFILE_FILE), 'w') as f:
+            json.dump({
+                'directory': os.path.abspath(directory),
+                'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'total_wall': self.total(),
+                'stages': self.stages,
+            }, f, indent=2, sort_keys=True)
+
+        if len(self.profiles) == 0:
+            return
+        path = os.path.join(directory, PROFILE_PATH)
+        if not os.path.exists(path):
+            os.makedirs(path)
+        for i, (name, profile) in enumerate(self.profiles):
+            profile.dump_stats(os.path.join(path, '{:02d}_{}.prof'.format(i, name.replace(' ', '_'))))
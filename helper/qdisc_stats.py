@@ -0,0 +1,114 @@
+import errno
+import socket
+import struct
+
+from helper.netlink import NETLINK_ROUTE, open_socket, dump, parse_attributes
+
+RTM_NEWLINK = 16
+RTM_GETLINK = 18
+RTM_NEWQDISC = 36
+RTM_GETQDISC = 38
+
+IFLA_IFNAME = 3
+
+TCA_KIND = 1
+TCA_STATS = 3
+TCA_STATS2 = 7
+
+TCA_STATS_BASIC = 1
+TCA_STATS_QUEUE = 3
+
+TC_H_ROOT = 0xffffffff
+
+IFINFOMSG = struct.Struct('=BxHiII')
+TCMSG = struct.Struct('=B3xiIII')
+TC_STATS = struct.Struct('=QIIIIIII')
+GNET_STATS_BASIC = struct.Struct('=QI')
+GNET_STATS_QUEUE = struct.Struct('=IIIII')
+
+
+class QdiscSample:
+    def __init__(self, handle, kind, backlog, qlen, drops, overlimits, requeues, bytes, packets):
+        self.handle = handle
+        self.kind = kind
+        self.backlog = backlog
+        self.qlen = qlen
+        self.drops = drops
+        self.overlimits = overlimits
+        self.requeues = requeues
+        self.bytes = bytes
+        self.packets = packets
+
+    def to_line(self, timestamp):
+        """
+        Raw counters of the qdisc:
+            <timestamp>;<backlog bytes>;<backlog packets>;<drops>;<overlimits>;<requeues>;<bytes>;<packets>
+        """
+        return '{:.6f};{};{};{};{};{};{};{}\n'.format(timestamp, self.backlog, self.qlen, self.drops,
+                                                       self.overlimits, self.requeues, self.bytes, self.packets)
+
+
+def get_interface_index(sock, interface):
+    """
+    Index of the interface in the network namespace of the rtnetlink socket.
+    """
+    index = None
+    # read the whole dump, so that no reply is left for the next request
+    for msg_type, payload in dump(sock, RTM_GETLINK, IFINFOMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)):
+        if msg_type != RTM_NEWLINK:
+            continue
+        name = parse_attributes(payload, IFINFOMSG.size).get(IFLA_IFNAME, b'').rstrip(b'\0').decode('ascii')
+        if name == interface:
+            index = IFINFOMSG.unpack_from(payload)[2]
+    if index is None:
+        raise OSError(errno.ENODEV, 'No such interface: {}'.format(interface))
+    return index
+
+
+class QdiscStats:
+    """
+    Read the statistics of the root qdisc of one interface via rtnetlink.
+    The root qdisc (tbf) accounts for the backlog of all its children (netem).
+    """
+
+    def __init__(self, interface, pid=None):
+        self.sock = open_socket(NETLINK_ROUTE, pid)
+        try:
+            self.ifindex = get_interface_index(self.sock, interface)
+        except OSError:
+            self.sock.close()
+            raise
+        self.request = TCMSG.pack(socket.AF_UNSPEC, self.ifindex, 0, 0, 0)
+        self.seq = 0
+
+    def close(self):
+        self.sock.close()
+
+    def query(self):
+        self.seq += 1
+        root = None
+        for msg_type, payload in dump(self.sock, RTM_GETQDISC, self.request, self.seq):
+            if msg_type != RTM_NEWQDISC:
+                continue
+            _, ifindex, handle, parent, _ = TCMSG.unpack_from(payload)
+            # Older kernels ignore the ifindex of dump requests
+            if ifindex != self.ifindex or parent != TC_H_ROOT:
+                continue
+            root = parse_qdisc_message(handle, payload)
+        return root
+
+
+def parse_qdisc_message(handle, payload):
+    attributes = parse_attributes(payload, TCMSG.size)
+    kind = attributes.get(TCA_KIND, b'').rstrip(b'\0').decode('ascii')
+
+    if TCA_STATS2 in attributes:
+        stats = parse_attributes(attributes[TCA_STATS2])
+        nbytes, packets = GNET_STATS_BASIC.unpack_from(stats[TCA_STATS_BASIC])
+        qlen, backlog, drops, requeues, overlimits = GNET_STATS_QUEUE.unpack_from(stats[TCA_STATS_QUEUE])
+    else:
+        nbytes, packets, drops, overlimits, _, _, qlen, backlog = TC_STATS.unpack_from(attributes[TCA_STATS])
+        requeues = 0
+
+    return QdiscSample(handle=handle, kind=kind, backlog=backlog, qlen=qlen, drops=drops,
+                       overlimits=overlimits, requeues=requeues, bytes=nbytes, packets=packets)
@@ -0,0 +1,114 @@
+import math
+
+import numpy as np
+
+QUANTILES = [1, 5, 25, 50, 75, 95, 99]
+
+# Values closer to zero than this are counted as zero by the sketch
+MIN_SKETCH_VALUE = 1e-9
+
+
+def summarize(values):
+    """
+    Moments and quantiles of a series, computed on a single array.
+    """
+    array = np.asarray(values, dtype=float)
+    quantiles = np.percentile(array, QUANTILES)
+    return {
+        'count': len(array),
+        'mean': float(array.mean()),
+        'std': float(array.std()),
+        'min': float(array.min()),
+        'max': float(array.max()),
+        'quantiles': dict(zip(QUANTILES, [float(q) for q in quantiles])),
+    }
+
+
+class QuantileSketch:
+    """
+    Streaming summary of a series with quantiles of a bounded relative error (logarithmic buckets as in DDSketch).
+    Sketches of several connections can be merged without the original values.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zero = 0
+        self.count = 0
+        self.mean = 0.0
+        # sum of squared differences from the mean
+        self.m2 = 0.0
+        self.min = float('inf')
+        self.max = -float('inf')
+
+    def add(self, value):
+        # per sample without numpy, for values arriving one at a time
+        if value > MIN_SKETCH_VALUE:
+            bucket = int(math.ceil(math.log(value) / self.log_gamma))
+            self.positive[bucket] = self.positive.get(bucket, 0) + 1
+        elif value < -MIN_SKETCH_VALUE:
+            bucket = int(math.ceil(math.log(-value) / self.log_gamma))
+            self.negative[bucket] = self.negative.get(bucket, 0) + 1
+        else:
+            self.zero += 1
+        self.merge_moments(1, float(value), 0.0, value, value)
+
+    def merge_moments(self, count, mean, m2, min_value, max_value):
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+        self.min = min(self.min, min_value)
+        self.max = max(self.max, max_value)
+
+    def merge(self, other):
+        if other.gamma != self.gamma:
+            raise ValueError('Cannot merge sketches of different accuracy')
+        if other.count == 0:
+            return
+        for store, other_store in [(self.positive, other.positive), (self.negative, other.negative)]:
+            for bucket, count in other_store.items():
+                store[bucket] = store.get(bucket, 0) + count
+        self.zero += other.zero
+        self.merge_moments(other.count, other.mean, other.m2, other.min, other.max)
+
+    def value(self, bucket):
+        # center of the bucket, at most relative_accuracy away from every value in it
+        return 2 * self.gamma ** bucket / (self.gamma + 1)
+
+    def quantile(self, q):
+        """
+        Value at quantile q (0..1).
+        """
+        if self.count == 0:
+            return float('nan')
+        rank = q * (self.count - 1)
+
+        seen = 0
+        for bucket in sorted(self.negative, reverse=True):
+            seen += self.negative[bucket]
+            if seen > rank:
+                return min(self.max, max(self.min, -self.value(bucket)))
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for bucket in sorted(self.positive):
+            seen += self.positive[bucket]
+            if seen > rank:
+                return min(self.max, max(self.min, self.value(bucket)))
+        return self.max
+
+    def summary(self):
+        # same keys as summarize
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'std': math.sqrt(self.m2 / self.count) if self.count > 0 else float('nan'),
+            'min': self.min,
+            'max': self.max,
+            'quantiles': dict((q, self.quantile(q / 100.0)) for q in QUANTILES),
+        }
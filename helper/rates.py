@@ -0,0 +1,70 @@
+import numpy as np
+
+from helper.resample import regular_times
+
+# --rate-window value for a window of the minimum RTT of each connection
+RTT_WINDOW = 'rtt'
+
+
+class CumulativeSeries:
+    """
+    Timestamps and running sum of the bits of all packets of a connection, from which the rate over any window
+    is the difference of two prefix sums.
+    """
+
+    def __init__(self):
+        self.timestamps = []
+        self.cumulative = []
+        self.total = 0
+
+    def add(self, ts, bits):
+        self.total += bits
+        self.timestamps.append(ts)
+        self.cumulative.append(self.total)
+
+    def rates(self, grid, window):
+        """
+        Rate in bit/s over the window (g - window, g] for each grid point g.
+        """
+        timestamps = np.asarray(self.timestamps)
+        cumulative = np.concatenate(([0], np.asarray(self.cumulative, dtype=float)))
+        upper = np.searchsorted(timestamps, grid, side='right')
+        lower = np.searchsorted(timestamps, grid - window, side='right')
+        return (cumulative[upper] - cumulative[lower]) / window
+
+
+def rate_grid(start_ts, step, end_ts):
+    # the grid points are the ends of the intervals of the fixed rates
+    return regular_times(start_ts + step, step, end_ts)
+
+
+def sliding_rates(series, grid, windows):
+    """
+    Rates of all connections on the grid points between their first and last packet and their total.
+    windows maps each connection to its window in seconds.
+    """
+    grid_array = np.asarray(grid)
+    total = np.zeros(len(grid))
+    rates = {}
+    for c in sorted(series):
+        if len(series[c].timestamps) == 0 or len(grid) == 0:
+            rates[c] = ([], [])
+            continue
+        first = int(np.searchsorted(grid_array, series[c].timestamps[0], side='left'))
+        last = min(len(grid) - 1, int(np.searchsorted(grid_array, series[c].timestamps[-1], side='left')))
+        if first > last:
+            rates[c] = ([], [])
+            continue
+        values = series[c].rates(grid_array[first:last + 1], windows[c])
+        total[first:last + 1] += values
+        rates[c] = (grid[first:last + 1], values.tolist())
+    return rates, (list(grid), total.tolist())
+
+
+def parse_window(string):
+    if string is None or string == RTT_WINDOW:
+        return string
+    window = float(string)
+    if window <= 0:
+        raise ValueError('Rate window must be positive: {}'.format(string))
+    return window
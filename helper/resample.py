@@ -0,0 +1,93 @@
+import numpy as np
+
+# Projection of the samples of a series onto the bins of a grid
+HOLD = 'hold'
+MEAN = 'mean'
+SUM = 'sum'
+METHODS = [HOLD, MEAN, SUM]
+
+
+def regular_times(first_ts, step, last_ts):
+    # accumulated like the fixed intervals of parse_pcap, so that their timestamps are grid times exactly
+    times = []
+    t = first_ts
+    while t <= last_ts:
+        times.append(t)
+        t += step
+    return times
+
+
+class TimeGrid:
+    """
+    Common time base of series with different timestamps: pcap intervals, socket polls, backlog samples and RTTs.
+    Bin i ends at times[i] and covers (times[i - 1], times[i]], a sample belongs to the first bin ending at or
+    after it. Samples after the last bin are dropped.
+    """
+
+    def __init__(self, times):
+        self.times = np.asarray(times, dtype=float)
+
+    @staticmethod
+    def regular(first_ts, step, last_ts):
+        return TimeGrid(regular_times(first_ts, step, last_ts))
+
+    @staticmethod
+    def events(series):
+        """
+        Grid of every distinct timestamp of the series.
+        """
+        timestamps = [np.asarray(series[c][0], dtype=float) for c in series]
+        return TimeGrid(np.unique(np.concatenate(timestamps + [np.empty(0)])))
+
+    def __len__(self):
+        return len(self.times)
+
+    def index(self, timestamps):
+        return np.searchsorted(self.times, timestamps, side='left')
+
+    def first_bins(self, series):
+        """
+        Sorted indices of the bins with the first sample of each non-empty series.
+        """
+        return np.sort(self.index([series[c][0][0] for c in series if len(series[c][0]) > 0]))
+
+    def resample(self, series, column=1, method=HOLD, fill=np.nan):
+        """
+        Project a column of every connection of series onto the grid and return the sorted connections and an array
+        of connections x bins:
+            hold: the last value at or before the end of each bin from the first to the last sample
+            mean: the mean of the values in each bin
+            sum:  the sum of the values in each bin
+        Bins without a value are set to fill, for sum without sample 0.
+        """
+        if method not in METHODS:
+            raise ValueError('Unknown resampling method: {}'.format(method))
+        connections = sorted(series)
+        output = np.full((len(connections), len(self.times)), fill if method != SUM else 0, dtype=float)
+
+        for row, c in enumerate(connections):
+            timestamps = np.asarray(series[c][0], dtype=float)
+            if len(timestamps) == 0 or len(self.times) == 0:
+                continue
+            values = np.asarray(series[c][column], dtype=float)
+
+            if method == HOLD:
+                first = int(self.index(timestamps[0]))
+                last = min(int(self.index(timestamps[-1])), len(self.times) - 1)
+                if first > last:
+                    continue
+                samples = np.searchsorted(timestamps, self.times[first:last + 1], side='right') - 1
+                output[row, first:last + 1] = values[samples]
+                continue
+
+            bins = self.index(timestamps)
+            inside = bins < len(self.times)
+            sums = np.bincount(bins[inside], weights=values[inside], minlength=len(self.times))
+            if method == SUM:
+                output[row] = sums
+                continue
+            counts = np.bincount(bins[inside], minlength=len(self.times))
+            filled = counts > 0
+            output[row, filled] = sums[filled] / counts[filled]
+
+        return connections, output
@@ -0,0 +1,295 @@
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from helper import CSV_PATH, PARAMETERS_FILE, PLOT_PATH
+from helper.csv_writer import read_from_csv, read_connections
+from helper.quantiles import summarize
+from helper.util import parse_rate, parse_size, parse_time
+
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS runs (
+        id INTEGER PRIMARY KEY,
+        directory TEXT UNIQUE NOT NULL,
+        name TEXT,
+        date TEXT,
+        bandwidth TEXT,
+        bandwidth_bps REAL,
+        buffer_size TEXT,
+        buffer_bytes INTEGER,
+        buffer_latency TEXT,
+        buffer_latency_s REAL,
+        rtt TEXT,
+        rtt_s REAL,
+        loss TEXT,
+        hosts INTEGER,
+        signature TEXT,
+        indexed_at TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS parameters (
+        run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+        key TEXT NOT NULL,
+        value TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS commands (
+        run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+        position INTEGER NOT NULL,
+        command TEXT NOT NULL,
+        line TEXT NOT NULL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS flows (
+        run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+        connection INTEGER NOT NULL,
+        host INTEGER,
+        client TEXT,
+        client_port INTEGER,
+        server TEXT,
+        server_port INTEGER,
+        kind TEXT,
+        algorithm TEXT,
+        rtt TEXT,
+        rtt_s REAL,
+        start REAL,
+        stop REAL,
+        throughput_mean REAL,
+        throughput_median REAL,
+        throughput_p99 REAL,
+        throughput_share REAL,
+        sending_rate_mean REAL,
+        avg_rtt_mean REAL,
+        avg_rtt_p99 REAL,
+        retransmissions INTEGER
+    )''',
+    '''CREATE TABLE IF NOT EXISTS files (
+        run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+        kind TEXT NOT NULL,
+        path TEXT NOT NULL
+    )''',
+    'CREATE INDEX IF NOT EXISTS flows_run ON flows(run_id)',
+    'CREATE INDEX IF NOT EXISTS parameters_run ON parameters(run_id, key)',
+]
+
+# parameters.txt keys stored as columns of runs, converted by the given function
+RUN_PARAMETERS = [
+    ('Test Name', 'name', None),
+    ('Date', 'date', None),
+    ('Initial Bandwidth', 'bandwidth', parse_rate),
+    ('Burst Buffer', 'buffer_size', parse_size),
+    ('Buffer Latency', 'buffer_latency', parse_time),
+    ('Initial Link RTT', 'rtt', parse_time),
+    ('Initial Link Loss', 'loss', None),
+]
+NUMERIC_COLUMNS = {
+    'bandwidth': 'bandwidth_bps',
+    'buffer_size': 'buffer_bytes',
+    'buffer_latency': 'buffer_latency_s',
+    'rtt': 'rtt_s',
+}
+
+
+def open_index(path):
+    connection = sqlite3.connect(path)
+    connection.execute('PRAGMA foreign_keys = ON')
+    for statement in SCHEMA:
+        connection.execute(statement)
+    return connection
+
+
+def read_parameters(path):
+    """
+    Returns the "Key: value" lines and the command lines of the parameters.txt of a run.
+    """
+    parameters = []
+    commands = []
+    file_path = os.path.join(path, PARAMETERS_FILE)
+    if not os.path.isfile(file_path):
+        return parameters, commands
+
+    in_commands = False
+    with open(file_path) as f:
+        for line in f:
+            line = line.strip()
+            if line == '':
+                continue
+            if line.startswith('Commands:'):
+                in_commands = True
+            elif in_commands and ':' not in line.split(',')[0]:
+                commands.append(line)
+            elif ': ' in line:
+                # lines appended after the test, e.g. the capture statistics, follow the commands
+                key, value = line.split(': ', 1)
+                parameters.append((key.strip(), value.strip()))
+    return parameters, commands
+
+
+def host_commands(commands):
+    # host i of the topology (sender 10.1.x.y) is created for the i-th host or workload command
+    hosts = []
+    for line in commands:
+        split = [s.strip() for s in line.split(',')]
+        if split[0] in ['host', 'workload'] and len(split) > 2:
+            hosts.append((split[0], split[1], split[2]))
+    return hosts
+
+
+def host_index(ip):
+    split = ip.split('.')
+    if len(split) != 4 or split[0] != '10' or split[1] != '1':
+        return None
+    return int(split[2]) * 256 + int(split[3])
+
+
+def parse_or_none(function, value):
+    try:
+        return function(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def run_signature(path):
+    """
+    Changes whenever the run is analyzed again or its parameters are updated.
+    """
+    signature = []
+    csv_path = os.path.join(path, CSV_PATH)
+    files = [os.path.join(path, PARAMETERS_FILE)]
+    if os.path.isdir(csv_path):
+        files += [os.path.join(csv_path, f) for f in sorted(os.listdir(csv_path))]
+    for file_path in files:
+        if os.path.isfile(file_path):
+            stat = os.stat(file_path)
+            signature.append('{}:{}:{}'.format(os.path.basename(file_path), int(stat.st_mtime), stat.st_size))
+    return ','.join(signature)
+
+
+def flow_rows(pcap_data, connections, hosts):
+    """
+    One row per connection id of connections.csv, which all series of a run share. Runs without it fall back to
+    the ids of the throughput.
+    """
+    # the last series of throughput and sending rate is the total of all connections
+    total = len(pcap_data.throughput) - 1
+    total_bytes = float(np.sum(pcap_data.throughput[total][1])) if total in pcap_data.throughput else 0
+
+    ids = sorted(connections) if len(connections) > 0 else [c for c in sorted(pcap_data.throughput) if c != total]
+    rows = []
+    for c in ids:
+        timestamps, values = pcap_data.throughput.get(c, ([], []))
+        throughput = np.asarray(values, dtype=float)
+        row = {
+            'connection': c,
+            'start': None,
+            'stop': None,
+            'throughput_mean': None,
+            'throughput_median': None,
+            'throughput_p99': None,
+            'throughput_share': None,
+            'sending_rate_mean': None,
+            'avg_rtt_mean': None,
+            'avg_rtt_p99': None,
+            'retransmissions': len(pcap_data.retransmissions.get(c, ([],))[0]),
+        }
+
+        if len(throughput) > 0:
+            summary = summarize(throughput)
+            row['start'] = timestamps[0]
+            row['stop'] = timestamps[-1]
+            row['throughput_mean'] = summary['mean']
+            row['throughput_median'] = summary['quantiles'][50]
+            row['throughput_p99'] = summary['quantiles'][99]
+            if total_bytes > 0:
+                row['throughput_share'] = float(throughput.sum()) / total_bytes
+
+        if c in pcap_data.sending_rate and len(pcap_data.sending_rate[c][1]) > 0:
+            row['sending_rate_mean'] = float(np.mean(pcap_data.sending_rate[c][1]))
+
+        if c in pcap_data.avg_rtt and len(pcap_data.avg_rtt[c][1]) > 0:
+            summary = summarize(pcap_data.avg_rtt[c][1])
+            row['avg_rtt_mean'] = summary['mean']
+            row['avg_rtt_p99'] = summary['quantiles'][99]
+
+        client, client_port, server, server_port = connections.get(c, (None, None, None, None))
+        row.update({'client': client, 'client_port': client_port, 'server': server, 'server_port': server_port})
+
+        host = host_index(client) if client is not None else None
+        row['host'] = host
+        kind, algorithm, rtt = hosts[host] if host is not None and host < len(hosts) else (None, None, None)
+        row.update({'kind': kind, 'algorithm': algorithm, 'rtt': rtt,
+                    'rtt_s': parse_or_none(parse_time, rtt)})
+        rows.append(row)
+    return rows
+
+
+def list_files(path):
+    files = []
+    for name in sorted(os.listdir(path)):
+        if os.path.isfile(os.path.join(path, name)):
+            files.append(('run', name))
+    for kind in [CSV_PATH, PLOT_PATH]:
+        directory = os.path.join(path, kind)
+        if os.path.isdir(directory):
+            files += [(kind, os.path.join(kind, name)) for name in sorted(os.listdir(directory))]
+    return files
+
+
+def index_run(db, root, path, pcap_data=None, force=False):
+    """
+    Add or replace a run in the index. Without pcap_data the metrics are read from its csv files.
+    Returns False if the run is unchanged since it was indexed.
+    """
+    directory = os.path.relpath(path, root)
+    signature = run_signature(path)
+
+    existing = db.execute('SELECT id, signature FROM runs WHERE directory = ?', (directory,)).fetchone()
+    if existing is not None and existing[1] == signature and not force:
+        return False
+
+    if pcap_data is None:
+        pcap_data = read_from_csv(path)
+        if pcap_data == -1:
+            return False
+
+    parameters, commands = read_parameters(path)
+    values = dict(parameters)
+    hosts = host_commands(commands)
+
+    run = {'directory': directory, 'hosts': len(hosts), 'signature': signature,
+           'indexed_at': time.strftime('%Y-%m-%d %H:%M:%S')}
+    for key, column, convert in RUN_PARAMETERS:
+        run[column] = values.get(key)
+        if convert is not None:
+            run[NUMERIC_COLUMNS[column]] = parse_or_none(convert, values.get(key))
+
+    with db:
+        if existing is not None:
+            db.execute('DELETE FROM runs WHERE id = ?', (existing[0],))
+        columns = sorted(run)
+        cursor = db.execute('INSERT INTO runs ({}) VALUES ({})'.format(
+            ', '.join(columns), ', '.join('?' * len(columns))), [run[c] for c in columns])
+        run_id = cursor.lastrowid
+
+        db.executemany('INSERT INTO parameters VALUES (?, ?, ?)', [(run_id, k, v) for k, v in parameters])
+        db.executemany('INSERT INTO commands VALUES (?, ?, ?, ?)',
+                       [(run_id, i, line.split(',')[0].strip(), line) for i, line in enumerate(commands)])
+
+        for row in flow_rows(pcap_data, read_connections(path), hosts):
+            row['run_id'] = run_id
+            columns = sorted(row)
+            db.execute('INSERT INTO flows ({}) VALUES ({})'.format(
+                ', '.join(columns), ', '.join('?' * len(columns))), [row[c] for c in columns])
+
+        db.executemany('INSERT INTO files VALUES (?, ?, ?)', [(run_id, k, p) for k, p in list_files(path)])
+    return True
+
+
+def prune(db, root):
+    # runs whose directory has been deleted or moved
+    removed = 0
+    with db:
+        for run_id, directory in db.execute('SELECT id, directory FROM runs').fetchall():
+            if not os.path.isdir(os.path.join(os.path.join(root, directory), CSV_PATH)):
+                db.execute('DELETE FROM runs WHERE id = ?', (run_id,))
+                removed += 1
+    return removed
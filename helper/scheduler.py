@@ -0,0 +1,75 @@
+import time
+
+from helper import TEXT_WIDTH
+from helper.util import print_timer, monotonic
+
+
+# Sleep until shortly before a deadline and busy wait for the remainder
+SPIN_INTERVAL = 0.002
+
+
+class Event:
+    def __init__(self, offset, action, description):
+        self.offset = offset
+        self.action = action
+        self.description = description
+        self.timestamp = None
+        self.lag = None
+        self.duration = None
+
+
+class Scheduler:
+    """
+    Fire actions at absolute offsets from a common start time. Since every deadline is computed up front,
+    the latency of an action does not delay any later event.
+    """
+
+    def __init__(self, duration):
+        self.duration = duration
+        self.events = []
+        self.start = None
+
+    def add(self, offset, action, description):
+        self.events.append(Event(offset, action, description))
+
+    def run(self):
+        # sorted() is stable, events with the same offset keep their config order
+        self.events = sorted(self.events, key=lambda e: e.offset)
+        self.start = monotonic()
+
+        for event in self.events:
+            self.wait_until(event.offset)
+
+            fired = monotonic()
+            event.timestamp = time.time()
+            event.lag = fired - self.start - event.offset
+            log_string = event.action()
+            event.duration = monotonic() - fired
+
+            if log_string is not None:
+                print(log_string + ' ' * (TEXT_WIDTH - len(log_string)))
+
+        self.wait_until(self.duration)
+        print_timer(complete=self.duration, current=self.duration)
+
+    def wait_until(self, offset):
+        deadline = self.start + offset
+        while True:
+            remaining = deadline - monotonic()
+            if remaining <= SPIN_INTERVAL:
+                break
+            print_timer(complete=self.duration, current=max(0, offset - remaining))
+            time.sleep(min(1, remaining - SPIN_INTERVAL))
+
+        while monotonic() < deadline:
+            pass
+
+    def write_log(self, path):
+        with open(path, 'w') as f:
+            f.write('offset;timestamp;lag_ms;duration_ms;event\n')
+            for event in self.events:
+                if event.timestamp is None:
+                    continue
+                f.write('{:.3f};{:.6f};{:.3f};{:.3f};{}\n'.format(event.offset, event.timestamp,
+                                                                  event.lag * 1000, event.duration * 1000,
+                                                                  event.description))
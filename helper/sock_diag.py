@@ -0,0 +1,143 @@
+import socket
+import struct
+
+from helper.netlink import NETLINK_SOCK_DIAG, open_socket, dump, parse_attributes
+
+SOCK_DIAG_BY_FAMILY = 20
+
+INET_DIAG_INFO = 2
+INET_DIAG_VEGASINFO = 3
+INET_DIAG_CONG = 4
+INET_DIAG_BBRINFO = 16
+
+TCP_ESTABLISHED = 1
+TCP_SYN_SENT = 2
+TCP_FIN_WAIT1 = 4
+TCP_FIN_WAIT2 = 5
+TCP_CLOSE_WAIT = 8
+TCP_LAST_ACK = 9
+TCP_CLOSING = 11
+
+# Same socket states as the default filter of 'ss -t'
+CONNECTED_STATES = (1 << TCP_ESTABLISHED) | (1 << TCP_SYN_SENT) | (1 << TCP_FIN_WAIT1) | \
+                   (1 << TCP_FIN_WAIT2) | (1 << TCP_CLOSE_WAIT) | (1 << TCP_LAST_ACK) | (1 << TCP_CLOSING)
+
+# BBR info is reported for the vegas extension bit, since INET_DIAG_BBRINFO does not fit into the u8 ext field
+REQUESTED_EXTENSIONS = (1 << (INET_DIAG_INFO - 1)) | (1 << (INET_DIAG_VEGASINFO - 1)) | (1 << (INET_DIAG_CONG - 1))
+
+INET_DIAG_REQ_V2 = struct.Struct('=BBBBI48s')
+INET_DIAG_MSG = struct.Struct('=BBBB2H16s16sI8sIIIII')
+
+# struct tcp_info up to tcpi_delivery_rate (linux/tcp.h)
+TCP_INFO = struct.Struct('=8B24I4Q6IQ')
+TCP_INFO_FIELDS = {
+    'rtt': 8 + 15,
+    'rttvar': 8 + 16,
+    'snd_ssthresh': 8 + 17,
+    'snd_cwnd': 8 + 18,
+    'total_retrans': 8 + 23,
+    'pacing_rate': 32,
+    'delivery_rate': 42,
+}
+
+TCP_BBR_INFO = struct.Struct('=5I')
+BBR_UNIT = 256.0
+
+TCP_INFINITE_SSTHRESH = 0xffff
+
+
+class SocketSample:
+    def __init__(self, src, sport, dst, dport, cwnd, ssthresh, rtt, retrans, pacing_rate, delivery_rate, bbr=None):
+        self.src = src
+        self.sport = sport
+        self.dst = dst
+        self.dport = dport
+        self.cwnd = cwnd
+        self.ssthresh = ssthresh
+        self.rtt = rtt
+        self.retrans = retrans
+        self.pacing_rate = pacing_rate
+        self.delivery_rate = delivery_rate
+        self.bbr = bbr
+
+    def to_line(self, timestamp):
+        """
+        Format the sample like the output of the former ss_script.sh followed by the 4-tuple of the socket:
+            <timestamp>;<cwnd>;<ssthresh>;<bbr>;<pacing_rate>;<delivery_rate>;<rtt>;<retrans>;
+            <src>;<sport>;<dst>;<dport>
+        The first four columns and the 4-tuple are read by parse_bbr_and_cwnd_values.
+        """
+        ssthresh = self.ssthresh if self.ssthresh is not None else ''
+        if self.bbr is not None:
+            bw, min_rtt, pacing_gain, cwnd_gain = self.bbr
+            bbr = 'bw:{}bps,mrtt:{:g},pacing_gain:{:g},cwnd_gain:{:g}'.format(bw, min_rtt, pacing_gain, cwnd_gain)
+            ssthresh = ''
+        else:
+            bbr = ''
+        return '{:.6f};{};{};{};{};{};{:g};{};{};{};{};{}\n'.format(timestamp, self.cwnd, ssthresh, bbr,
+                                                                     self.pacing_rate, self.delivery_rate,
+                                                                     self.rtt, self.retrans,
+                                                                     self.src, self.sport, self.dst, self.dport)
+
+
+class SockDiag:
+    """
+    Query tcp_info and BBR info of all TCP sockets in one network namespace via NETLINK_SOCK_DIAG.
+    """
+
+    def __init__(self, pid=None):
+        self.sock = open_socket(NETLINK_SOCK_DIAG, pid)
+        self.request = INET_DIAG_REQ_V2.pack(socket.AF_INET, socket.IPPROTO_TCP, REQUESTED_EXTENSIONS, 0,
+                                             CONNECTED_STATES, b'\0' * 48)
+        self.seq = 0
+
+    def close(self):
+        self.sock.close()
+
+    def query(self):
+        self.seq += 1
+        samples = []
+        for _, payload in dump(self.sock, SOCK_DIAG_BY_FAMILY, self.request, self.seq):
+            sample = parse_diag_message(payload)
+            if sample is not None:
+                samples.append(sample)
+        return samples
+
+
+def parse_diag_message(payload):
+    if len(payload) < INET_DIAG_MSG.size:
+        return None
+
+    msg = INET_DIAG_MSG.unpack_from(payload)
+    sport, dport = socket.ntohs(msg[4]), socket.ntohs(msg[5])
+    src, dst = socket.inet_ntoa(msg[6][:4]), socket.inet_ntoa(msg[7][:4])
+
+    attributes = parse_attributes(payload, INET_DIAG_MSG.size)
+    if INET_DIAG_INFO not in attributes:
+        return None
+
+    # Older kernels report a shorter tcp_info, missing fields stay zero
+    raw_info = attributes[INET_DIAG_INFO][:TCP_INFO.size]
+    info = TCP_INFO.unpack(raw_info + b'\0' * (TCP_INFO.size - len(raw_info)))
+
+    ssthresh = info[TCP_INFO_FIELDS['snd_ssthresh']]
+    if ssthresh >= TCP_INFINITE_SSTHRESH:
+        ssthresh = None
+
+    bbr = None
+    raw_bbr = attributes.get(INET_DIAG_BBRINFO)
+    if raw_bbr is not None and len(raw_bbr) >= TCP_BBR_INFO.size:
+        bw_lo, bw_hi, min_rtt, pacing_gain, cwnd_gain = TCP_BBR_INFO.unpack_from(raw_bbr)
+        bbr = (((bw_hi << 32) | bw_lo) * 8,
+               min_rtt / 1000.0,
+               pacing_gain / BBR_UNIT,
+               cwnd_gain / BBR_UNIT)
+
+    return SocketSample(src=src, sport=sport, dst=dst, dport=dport,
+                        cwnd=info[TCP_INFO_FIELDS['snd_cwnd']],
+                        ssthresh=ssthresh,
+                        rtt=info[TCP_INFO_FIELDS['rtt']] / 1000.0,
+                        retrans=info[TCP_INFO_FIELDS['total_retrans']],
+                        pacing_rate=info[TCP_INFO_FIELDS['pacing_rate']] * 8,
+                        delivery_rate=info[TCP_INFO_FIELDS['delivery_rate']] * 8,
+                        bbr=bbr)
@@ -0,0 +1,146 @@
+import os
+import random
+import socket
+import struct
+
+import dpkt
+
+from helper import PCAP1, PCAP2, BUFFER_FILE_EXTENSION, FLOW_FILE_EXTENSION
+
+MSS = 1448
+SNAPLEN = 88
+SERVER_PORT = 9000
+CLIENT_BASE_PORT = 40000
+# probability of a segment being dropped at the bottleneck and retransmitted
+LOSS = 0.01
+SHORT_FLOW_PACKETS = [3, 20, 200]
+# initial retransmission timeout of a dropped SYN
+SYN_RTO = 1.0
+
+
+def tcp_frame(src, dst, sport, dport, seq, ack, flags, payload=b'', ts_val=0, ts_ecr=0, ip_id=0):
+    # NOP, NOP, timestamp option
+    options = struct.pack('!BBBBII', 1, 1, 8, 10, ts_val, ts_ecr)
+    tcp = dpkt.tcp.TCP(sport=sport, dport=dport, seq=seq % 2 ** 32, ack=ack % 2 ** 32, flags=flags,
+                       opts=options, data=payload)
+    tcp.off = (20 + len(options)) // 4
+    ip = dpkt.ip.IP(src=socket.inet_aton(src), dst=socket.inet_aton(dst), p=dpkt.ip.IP_PROTO_TCP, id=ip_id,
+                    data=tcp)
+    ip.len = 20 + len(bytes(tcp))
+    return bytes(dpkt.ethernet.Ethernet(src=b'\0' * 6, dst=b'\0' * 6, type=dpkt.ethernet.ETH_TYPE_IP, data=ip))
+
+
+def generate_flow(rng, index, start, packets, rate, poll_interval, bbr, syn_timeout=0):
+    """
+    Frames of one connection before (s1) and behind (s3) the bottleneck and its poller samples.
+    With syn_timeout the first SYN is dropped at the bottleneck and retransmitted after syn_timeout seconds.
+    """
+    client = '10.1.{}.{}'.format(index // 256, index % 256)
+    server = '10.2.{}.{}'.format(index // 256, index % 256)
+    sport = CLIENT_BASE_PORT + index
+    isn = rng.randint(0, 2 ** 32 - 1)
+    rtt = 0.02 + 0.01 * (index % 3)
+
+    before = []
+    behind = []
+
+    syn = tcp_frame(client, server, sport, SERVER_PORT, isn, 0, dpkt.tcp.TH_SYN, ts_val=1)
+    if syn_timeout > 0:
+        before.append((start, syn))
+        start += syn_timeout
+    before.append((start, syn))
+    before.append((start + rtt, tcp_frame(server, client, SERVER_PORT, sport, 1, isn + 1,
+                                          dpkt.tcp.TH_SYN | dpkt.tcp.TH_ACK, ts_val=1, ts_ecr=1)))
+    behind.append((start + 0.001, syn))
+
+    seq = 1
+    ts = start + rtt
+    ts_val = 2
+    ip_id = 0
+    payload = b'x' * MSS
+    for _ in range(packets):
+        ts += 1.0 / rate
+        ip_id += 1
+        data = tcp_frame(client, server, sport, SERVER_PORT, isn + seq, 1, dpkt.tcp.TH_PUSH | dpkt.tcp.TH_ACK,
+                         payload, ts_val=ts_val, ip_id=ip_id)
+        before.append((ts, data))
+        if rng.random() < LOSS:
+            ip_id += 1
+            data = tcp_frame(client, server, sport, SERVER_PORT, isn + seq, 1, dpkt.tcp.TH_PUSH | dpkt.tcp.TH_ACK,
+                             payload, ts_val=ts_val, ip_id=ip_id)
+            before.append((ts + 0.002, data))
+            behind.append((ts + 0.007, data))
+        else:
+            behind.append((ts + 0.005, data))
+        seq += MSS
+        before.append((ts + rtt, tcp_frame(server, client, SERVER_PORT, sport, 1, isn + seq, dpkt.tcp.TH_ACK,
+                                           ts_val=ts_val, ts_ecr=ts_val)))
+        ts_val += 1
+
+    ts += 0.001
+    fin = tcp_frame(client, server, sport, SERVER_PORT, isn + seq, 1, dpkt.tcp.TH_FIN | dpkt.tcp.TH_ACK,
+                    ts_val=ts_val)
+    before.append((ts, fin))
+    behind.append((ts + 0.005, fin))
+    before.append((ts + rtt, tcp_frame(server, client, SERVER_PORT, sport, 1, isn + seq + 1,
+                                       dpkt.tcp.TH_FIN | dpkt.tcp.TH_ACK, ts_val=ts_val, ts_ecr=ts_val)))
+
+    samples = []
+    sample_ts = start
+    while sample_ts < ts:
+        if bbr:
+            samples.append('{:.6f};{};;bw:{}bps,mrtt:{:g},pacing_gain:1.25,cwnd_gain:2;{};{};{};0;{};{};{};{}\n'.format(
+                sample_ts, 10 + index, rng.randint(1000000, 10000000), rtt * 1000, 1, 2, int(rtt * 1e6),
+                client, sport, server, SERVER_PORT))
+        else:
+            samples.append('{:.6f};{};{};;{};{};{};0;{};{};{};{}\n'.format(sample_ts, 10 + index, 20, 1, 2,
+                                                                          int(rtt * 1e6), client, sport, server,
+                                                                          SERVER_PORT))
+        sample_ts += poll_interval
+
+    return client, before, behind, samples
+
+
+def generate_result_directory(path, flows, duration, rate, short_flows=0, poll_interval=0.04, seed=1, syn_loss=()):
+    """
+    Write a result directory as run_mininet.py would, without Mininet: captures before and behind the
+    bottleneck, poller samples of every sender and the bottleneck backlog.
+    Long flows send <rate> packets per second for <duration> seconds, every second flow uses BBR. The first SYN of
+    the flows in syn_loss is dropped at the bottleneck, so they pass it after later flows.
+    Returns the number of captured frames.
+    """
+    if not os.path.exists(path):
+        os.makedirs(path)
+
+    rng = random.Random(seed)
+    start_ts = 1000.0
+
+    flow_specs = [(start_ts + 0.1 * i, int((duration - 0.1 * i) * rate)) for i in range(flows)]
+    for _ in range(short_flows):
+        flow_specs.append((start_ts + rng.uniform(0, max(0, duration - 1)), rng.choice(SHORT_FLOW_PACKETS)))
+
+    before = []
+    behind = []
+    for index, (start, packets) in enumerate(flow_specs):
+        client, flow_before, flow_behind, samples = generate_flow(rng, index, start, packets, rate,
+                                                                  poll_interval, bbr=index % 2 == 0,
+                                                                  syn_timeout=SYN_RTO if index in syn_loss else 0)
+        before += flow_before
+        behind += flow_behind
+        with open(os.path.join(path, '{}.{}'.format(client, FLOW_FILE_EXTENSION)), 'a') as f:
+            f.writelines(samples)
+
+    with open(os.path.join(path, 's2-eth2-tbf.{}'.format(BUFFER_FILE_EXTENSION)), 'w') as f:
+        ts = start_ts
+        while ts < start_ts + duration:
+            f.write('{:.6f};{};{};0;0;0;0;0\n'.format(ts, rng.randint(0, 100000), rng.randint(0, 60)))
+            ts += poll_interval
+
+    for name, frames in [(PCAP1, before), (PCAP2, behind)]:
+        frames.sort(key=lambda frame: frame[0])
+        with open(os.path.join(path, name), 'wb') as f:
+            writer = dpkt.pcap.Writer(f, snaplen=SNAPLEN)
+            for ts, frame in frames:
+                writer.writepkt(frame[:SNAPLEN], ts)
+
+    return len(before) + len(behind)
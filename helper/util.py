@@ -1,15 +1,49 @@
+import ctypes
+import ctypes.util
+import multiprocessing
 import subprocess
 import time
+import re
 import sys
 import gzip
 import bz2
+import glob
 
 import os
 
-from helper import CSV_PATH, PLOT_PATH
 from helper import PCAP1, PCAP2
 from helper import FLOW_FILE_EXTENSION, BUFFER_FILE_EXTENSION, COMPRESSION_EXTENSIONS, COMPRESSION_METHODS
 
+CLOCK_MONOTONIC = 1
+
+
+class Timespec(ctypes.Structure):
+    _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+
+def monotonic_clock():
+    """
+    time.monotonic on Python 3, clock_gettime(CLOCK_MONOTONIC) of libc on Python 2, whose time.time follows every
+    step of the wall clock.
+    """
+    if hasattr(time, 'monotonic'):
+        return time.monotonic
+
+    clock_gettime = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True).clock_gettime
+    clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(Timespec)]
+
+    def monotonic():
+        timespec = Timespec()
+        if clock_gettime(CLOCK_MONOTONIC, ctypes.byref(timespec)) != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        return timespec.tv_sec + timespec.tv_nsec * 1e-9
+
+    return monotonic
+
+
+monotonic = monotonic_clock()
+
 colors = {
     'red': '[1;31;40m',
     'green': '[1;32;40m',
@@ -67,7 +101,6 @@ def check_tools():
         'tcpdump': 'tcpdump',
         'ethtool': 'ethtool',
         'netcat': 'netcat',
-        'moreutils': 'ts'
     }
 
     for package, tool in tools.items():
@@ -92,6 +125,112 @@ def check_tool(tool):
     return True
 
 
+NUMBER = re.compile(r'^([0-9]+\.)?[0-9]+')
+
+RATE_UNITS = {
+    'bit': 1 / 8.0,
+    'kbit': 1000 / 8.0,
+    'mbit': 1000000 / 8.0,
+    'gbit': 1000000000 / 8.0,
+    'bps': 1,
+    'kbps': 1000,
+    'mbps': 1000000,
+    'gbps': 1000000000,
+}
+
+SIZE_UNITS = {
+    'b': 1,
+    'k': 1024,
+    'kb': 1024,
+    'kbit': 1024 / 8.0,
+    'm': 1024 * 1024,
+    'mb': 1024 * 1024,
+    'mbit': 1024 * 1024 / 8.0,
+}
+
+TIME_UNITS = {
+    's': 1,
+    'ms': 1e-3,
+    'us': 1e-6,
+}
+
+
+def parse_with_units(string, units, name='value'):
+    """
+    Convert a number followed by one of the (lower case) units to the value of units[unit], e.g. 10mbit.
+    """
+    value = NUMBER.match(string)
+    if value is None:
+        raise ValueError('Malformed {}: {}'.format(name, string))
+    unit = string[value.end():].lower()
+    if unit not in units:
+        raise ValueError('Unknown {} unit: {}'.format(name, string))
+    return float(value.group(0)) * units[unit]
+
+
+def parse_rate(string):
+    """
+    Convert a rate in tc notation (e.g. 10mbit, 2mbps) to bytes per second.
+    """
+    return int(parse_with_units(string, RATE_UNITS, 'rate'))
+
+
+def parse_size(string):
+    """
+    Convert a size in tc notation (e.g. 1600b, 100kb) to bytes.
+    """
+    return int(parse_with_units(string, SIZE_UNITS, 'size'))
+
+
+def parse_time(string):
+    """
+    Convert a time in tc notation (e.g. 50ms) to seconds.
+    """
+    return parse_with_units(string, TIME_UNITS, 'time')
+
+
+def parse_cpu_list(string):
+    """
+    Convert a CPU list in taskset notation (e.g. 0-3,8) to a sorted list of CPU numbers.
+    """
+    cpus = set()
+    for part in string.split(','):
+        match = re.match('^([0-9]+)(-([0-9]+))?$', part.strip())
+        if match is None:
+            raise ValueError('Malformed CPU list: {}'.format(string))
+        first = int(match.group(1))
+        last = int(match.group(3)) if match.group(3) is not None else first
+        if last < first:
+            raise ValueError('Malformed CPU list: {}'.format(string))
+        cpus.update(range(first, last + 1))
+    return sorted(cpus)
+
+
+def format_cpu_list(cpus):
+    """
+    Convert CPU numbers to a CPU list in taskset notation, e.g. [0, 1, 2, 3, 8] to 0-3,8.
+    """
+    ranges = []
+    for cpu in sorted(cpus):
+        if len(ranges) > 0 and ranges[-1][1] == cpu - 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ','.join(str(a) if a == b else '{}-{}'.format(a, b) for a, b in ranges)
+
+
+def cpu_layout(cpus, measurement_cpus):
+    """
+    Split the CPUs of the experiment (e.g. 0-3, default: all) into the CPUs of the hosts and the last
+    measurement_cpus CPUs reserved for tcpdump and the pollers.
+    """
+    available = parse_cpu_list(cpus) if cpus is not None else list(range(multiprocessing.cpu_count()))
+    if measurement_cpus < 1 or measurement_cpus >= len(available):
+        raise ValueError('Cannot reserve {} of the CPUs {} for measurement processes'.format(
+            measurement_cpus, format_cpu_list(available)))
+    return available[:-measurement_cpus], available[-measurement_cpus:]
+
+
 def print_line(string, new_line=False):
     if new_line:
         string += '\n'
@@ -116,14 +255,15 @@ def print_timer(complete, current):
     print_line(string, new_line=complete == current)
 
 
-def sleep_progress_bar(seconds, current_time, complete):
-    print_timer(complete=complete, current=current_time)
-    while seconds > 0:
-        time.sleep(min(1, seconds))
-        current_time = current_time + min(1, seconds)
-        print_timer(complete=complete, current=current_time)
-        seconds -= 1
-    return current_time
+class PhaseTimer:
+    def __init__(self):
+        self.phases = []
+        self.start = time.time()
+
+    def lap(self, name):
+        now = time.time()
+        self.phases.append((name, now - self.start))
+        self.start = now
 
 
 def compress_file(uncompressed_file, method):
@@ -142,6 +282,16 @@ def find_file(path):
     return None
 
 
+def find_capture_files(path):
+    """
+    All files of a capture: the file itself or the chunks of a rotated capture (s1.pcap, s1.pcap1, ... or
+    s1.pcap-<start time>), each optionally compressed.
+    """
+    extensions = '|'.join(re.escape(ext) for ext in COMPRESSION_EXTENSIONS.values() if ext != '')
+    pattern = re.compile('{}[0-9-]*({})?$'.format(re.escape(path), extensions))
+    return sorted(f for f in glob.glob(path + '*') if pattern.match(f))
+
+
 def open_compressed_file(path, write=False):
     file_extension = os.path.splitext(path)[1].replace('.', '')
     if file_extension == 'gz':
@@ -154,7 +304,8 @@ def open_compressed_file(path, write=False):
             f = bz2.BZ2File(path, 'wb')
         else:
             f = bz2.BZ2File(path)
-    elif file_extension in ['csv', 'pcap', FLOW_FILE_EXTENSION, BUFFER_FILE_EXTENSION]:
+    elif file_extension in ['csv', 'pcap', FLOW_FILE_EXTENSION, BUFFER_FILE_EXTENSION] or \
+            re.match('pcap[0-9-]+$', file_extension):
         if write:
             f = open(path, 'w')
         else:
@@ -164,20 +315,11 @@ def open_compressed_file(path, write=False):
     return f
 
 
-def check_directory(dir, only_new=False):
+def check_directory(dir):
 
-    pcap1_exists = find_file(os.path.join(dir, PCAP1)) is not None
-    pcap2_exists = find_file(os.path.join(dir, PCAP2)) is not None
-
-    if not pcap1_exists & pcap2_exists:
-        return False
+    pcap1_exists = len(find_capture_files(os.path.join(dir, PCAP1))) > 0
+    pcap2_exists = len(find_capture_files(os.path.join(dir, PCAP2))) > 0
 
-    if only_new:
-        csv_path = os.path.join(dir, CSV_PATH)
-        pdf_path = os.path.join(dir, PLOT_PATH)
-        if os.path.exists(csv_path) and os.path.exists(pdf_path):
-            return False
-
-    return True
+    return pcap1_exists & pcap2_exists
 
 
@@ -0,0 +1,32 @@
+import ctypes
+import ctypes.util
+import os
+
+SPLICE_F_MOVE = 0x01
+SPLICE_F_NONBLOCK = 0x02
+SPLICE_F_MORE = 0x04
+
+_libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+_libc.sendfile.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.POINTER(ctypes.c_long), ctypes.c_size_t]
+_libc.sendfile.restype = ctypes.c_ssize_t
+_libc.splice.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int, ctypes.c_void_p, ctypes.c_size_t,
+                         ctypes.c_uint]
+_libc.splice.restype = ctypes.c_ssize_t
+
+
+def _check(result):
+    if result < 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+    return result
+
+
+def sendfile(out_fd, in_fd, offset, count):
+    if hasattr(os, 'sendfile'):
+        return os.sendfile(out_fd, in_fd, offset, count)
+    c_offset = ctypes.c_long(offset)
+    return _check(_libc.sendfile(out_fd, in_fd, ctypes.byref(c_offset), count))
+
+
+def splice(fd_in, fd_out, count, flags=SPLICE_F_MOVE | SPLICE_F_MORE):
+    return _check(_libc.splice(fd_in, None, fd_out, None, count, flags))
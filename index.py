@@ -0,0 +1,76 @@
+import argparse
+import os
+import sqlite3
+import sys
+
+from helper.results_index import open_index, index_run, prune
+from helper.util import print_line, print_error
+from helper import CSV_PATH, INDEX_FILE, TEXT_WIDTH
+
+
+def find_runs(root):
+    runs = []
+    for path, subdirs, _ in os.walk(root):
+        if CSV_PATH in subdirs:
+            runs.append(path)
+            # csv_data and pdf_plots are part of this run
+            subdirs[:] = [d for d in subdirs if d != CSV_PATH]
+    return sorted(runs)
+
+
+def print_query(db, query):
+    cursor = db.execute(query)
+    if cursor.description is None:
+        return
+    columns = [c[0] for c in cursor.description]
+    rows = [['' if v is None else '{:.6g}'.format(v) if isinstance(v, float) else str(v) for v in row]
+            for row in cursor.fetchall()]
+    widths = [max([len(c)] + [len(r[i]) for r in rows]) for i, c in enumerate(columns)]
+    print('  '.join(c.ljust(w) for c, w in zip(columns, widths)))
+    print('-' * min(TEXT_WIDTH, sum(widths) + 2 * len(widths)))
+    for row in rows:
+        print('  '.join(v.ljust(w) for v, w in zip(row, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Index the parameters, per-flow metrics and files of all analyzed '
+                                                 'runs below a directory in a SQLite database.')
+    parser.add_argument('directory', nargs='?', default='.',
+                        help='Root of the result directories. (default: .)')
+    parser.add_argument('-o', dest='index',
+                        help='Path to the index. (default: <directory>/{})'.format(INDEX_FILE))
+    parser.add_argument('-f', dest='force', action='store_true',
+                        help='Re-index all runs, even if they are unchanged.')
+    parser.add_argument('-q', dest='query',
+                        help='Run an SQL query on the index after updating it.')
+    parser.add_argument('--no-update', dest='update', action='store_false',
+                        help='Only run the query without scanning the directory.')
+
+    args = parser.parse_args()
+
+    index_path = args.index or os.path.join(args.directory, INDEX_FILE)
+    root = os.path.dirname(os.path.abspath(index_path))
+    db = open_index(index_path)
+
+    if args.update:
+        runs = find_runs(os.path.abspath(args.directory))
+        updated = 0
+        for i, path in enumerate(runs):
+            print_line('Indexing {}/{} {}'.format(i + 1, len(runs), os.path.relpath(path, root)))
+            if index_run(db, root, path, force=args.force):
+                updated += 1
+        removed = prune(db, root)
+        print_line('Indexed {} runs: {} updated, {} removed.'.format(len(runs), updated, removed), new_line=True)
+
+    if args.query is not None:
+        try:
+            print_query(db, args.query)
+        except sqlite3.Error as e:
+            print_error('Query failed: {}'.format(e))
+            return 1
+    db.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
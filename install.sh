@@ -1,5 +1,5 @@
 apt-get update
-apt-get install -y python-pip mininet ethtool netcat moreutils
+apt-get install -y python-pip mininet ethtool netcat cgroup-tools
 pip install -r requirements.txt
 
 # this fixes mininet bug with ovs-controller
@@ -4,40 +4,59 @@ from mininet.link import TCLink
 from mininet.log import setLogLevel
 from mininet.cli import CLI
 from mininet.clean import cleanup
+from mininet.node import Controller, CPULimitedHost
 
 from helper.util import print_error, print_warning, print_success, colorize, print_line
 from helper.util import get_git_revision_hash, get_host_version, get_available_algorithms, check_tools, check_tool
-from helper.util import sleep_progress_bar
-from helper.util import compress_file
-from helper import BUFFER_FILE_EXTENSION, FLOW_FILE_EXTENSION, COMPRESSION_METHODS, TEXT_WIDTH
+from helper.scheduler import Scheduler
+from helper.host_commands import sender_setup, receiver_setup, start_flows
+from helper.measurement import parse_tcpdump_statistics, parse_poll_statistics, format_capture, format_poller
+from helper.measurement import POLL_STATISTICS_PREFIX
+from helper.util import compress_file, find_capture_files, PhaseTimer, format_cpu_list, cpu_layout
+from helper.util import parse_time
+from helper.fidelity import evaluate_fidelity, VERDICT_PREFIX, PROBLEM_PREFIX
+from helper import BUFFER_FILE_EXTENSION, FLOW_FILE_EXTENSION, COMPRESSION_METHODS, TEXT_WIDTH, EVENT_FILE
+from helper import PARAMETERS_FILE, WORKLOAD_DISTRIBUTIONS, PCAP1, PCAP2, FIDELITY_FILE
 
 import os
+import signal
 import sys
 import subprocess
 import time
 import argparse
 import re
 import glob
+import multiprocessing
+from functools import partial
 
 
 MAX_HOST_NUMBER = 256**2
+MAX_FLOWS_PER_HOST = 1000
+TRAFFIC_GENERATORS = ['nc', 'sendfile']
+HOST_COMMANDS = ['host', 'workload']
+CONTROLLER_BASE_PORT = 6653
 
 
 class DumbbellTopo(Topo):
     "Three switchs connected to n senders and receivers."
 
-    def build(self, n=2):
-        switch1 = self.addSwitch('s1')
-        switch2 = self.addSwitch('s2')
-        switch3 = self.addSwitch('s3')
+    def build(self, n=2, prefix='', instance=0, cores=None, cpu_share=1.0):
+        # explicit dpids, since the default is derived from the digits of the (prefixed) name
+        switch1 = self.addSwitch(prefix + 's1', dpid='{:016x}'.format(instance * 4 + 1))
+        switch2 = self.addSwitch(prefix + 's2', dpid='{:016x}'.format(instance * 4 + 2))
+        switch3 = self.addSwitch(prefix + 's3', dpid='{:016x}'.format(instance * 4 + 3))
 
         self.addLink(switch1, switch2)
         self.addLink(switch2, switch3)
 
+        # cpu and cores only take effect with CPULimitedHost, all hosts together get cpu_share of the system
+        cpu = cpu_share * .5 / n
         for h in range(n):
-            host = self.addHost('h%s' % h, cpu=.5 / n)
+            host = self.addHost('%sh%s' % (prefix, h), cpu=cpu, cores=cores,
+                                ip='10.1.{}.{}/8'.format(h // 256, h % 256))
             self.addLink(host, switch1)
-            receiver = self.addHost('r%s' % h, cpu=.5 / n)
+            receiver = self.addHost('%sr%s' % (prefix, h), cpu=cpu, cores=cores,
+                                    ip='10.2.{}.{}/8'.format(h // 256, h % 256))
             self.addLink(receiver, switch3)
 
 
@@ -61,31 +80,58 @@ def parseConfigFile(file):
         command = split[0].strip()
 
         if command == 'host':
-            if len(split) != 5:
-                print_warning('Too few arguments to add host in line\n{}'.format(line))
+            if len(split) < 5 or len(split) > 8:
+                print_warning('Wrong number of arguments to add host in line\n{}'.format(line))
                 continue
             algorithm = split[1].strip()
             rtt = split[2].strip()
             start = float(split[3].strip())
             stop = float(split[4].strip())
-            if algorithm not in cc_algorithms:
-                if algorithm not in unknown_alorithms:
-                    unknown_alorithms.append(algorithm)
+            flows = int(split[5].strip()) if len(split) > 5 else 1
+            if flows < 1 or flows > MAX_FLOWS_PER_HOST:
+                print_warning('Number of flows must be between 1 and {} in line\n{}'.format(MAX_FLOWS_PER_HOST, line))
                 continue
-
-            if number_of_hosts >= MAX_HOST_NUMBER:
-                print_warning('Max host number reached. Skipping further hosts.')
+            generator = split[6].strip() if len(split) > 6 else TRAFFIC_GENERATORS[0]
+            if generator not in TRAFFIC_GENERATORS:
+                print_warning('Unknown traffic generator "{}" in line\n{}'.format(generator, line))
                 continue
-
-            number_of_hosts += 1
-            output.append({
+            rate = split[7].strip() if len(split) > 7 else None
+            if rate is not None and generator != 'sendfile':
+                print_warning('Rate limit is only supported by the sendfile generator in line\n{}'.format(line))
+                continue
+            host = {
                 'command': command,
                 'algorithm': algorithm,
                 'rtt': rtt,
                 'start': start,
-                'stop': stop})
-
-        elif command == 'link':
+                'stop': stop,
+                'flows': flows,
+                'generator': generator,
+                'rate': rate}
+
+        elif command == 'workload':
+            if len(split) not in [7, 8]:
+                print_warning('Wrong number of arguments to add workload in line\n{}'.format(line))
+                continue
+            algorithm = split[1].strip()
+            distribution = split[7].strip() if len(split) > 7 else WORKLOAD_DISTRIBUTIONS[0]
+            if distribution not in WORKLOAD_DISTRIBUTIONS:
+                print_warning('Unknown size distribution "{}" in line\n{}'.format(distribution, line))
+                continue
+            host = {
+                'command': command,
+                'algorithm': algorithm,
+                'rtt': split[2].strip(),
+                'start': float(split[3].strip()),
+                'stop': float(split[4].strip()),
+                'flows': 1,
+                'generator': 'workload',
+                'rate': None,
+                'arrival_rate': float(split[5].strip()),
+                'size': split[6].strip(),
+                'distribution': distribution}
+
+        if command == 'link':
             if len(split) != 4:
                 print_warning('Too few arguments to change link in line\n{}'.format(line))
                 continue
@@ -101,9 +147,21 @@ def parseConfigFile(file):
                 'value': value,
                 'start': start
             })
-        else:
+        elif command not in HOST_COMMANDS:
             print_warning('Skip unknown command "{}" in line\n{}'.format(command, line))
             continue
+        else:
+            if algorithm not in cc_algorithms:
+                if algorithm not in unknown_alorithms:
+                    unknown_alorithms.append(algorithm)
+                continue
+
+            if number_of_hosts >= MAX_HOST_NUMBER:
+                print_warning('Max host number reached. Skipping further hosts.')
+                continue
+
+            number_of_hosts += 1
+            output.append(host)
 
     if len(unknown_alorithms) > 0:
         print_warning('Skipping uninstalled congestion control algorithm:\n  ' + ' '.join(unknown_alorithms))
@@ -128,8 +186,83 @@ def traffic_shaping(mode, interface, add, **kwargs):
     return command
 
 
+def tc_batch(commands):
+    """
+    Combine several tc commands into a single invocation of 'tc -batch'.
+    """
+    lines = ["'{}'".format(c.strip()[len('tc '):].strip()) for c in commands]
+    return "printf '%s\\n' {} | tc -batch -".format(' '.join(lines))
+
+
+def run_concurrently(node_commands):
+    """
+    Send one command to each node and wait for all of them afterwards, so the commands run in parallel.
+    Every node may only appear once.
+    """
+    for node, command in node_commands:
+        node.sendCmd(command)
+    for node, _ in node_commands:
+        node.waitOutput()
+
+
+def tcpdump_command(interface, output_file, rotate_size=None, rotate_time=None):
+    command = ['tcpdump', '-i', interface, '-n', 'tcp', '-s', '88']
+    if rotate_size is not None or rotate_time is not None:
+        # tcpdump drops privileges before opening the next chunk otherwise
+        command += ['-Z', 'root']
+    if rotate_size is not None:
+        # chunks after the first get a counter appended: s1.pcap, s1.pcap1, ...
+        command += ['-C', str(rotate_size)]
+    if rotate_time is not None:
+        # chunks are named by their start time: s1.pcap-20200101-120000
+        command += ['-G', str(rotate_time)]
+        output_file += '-%Y%m%d-%H%M%S'
+    return command + ['-w', output_file]
+
+
+def stop_process(process, output, sig):
+    """
+    Stop a measurement process, returns everything it wrote to output and its CPU time in seconds.
+    """
+    try:
+        process.send_signal(sig)
+    except OSError:
+        # already exited
+        pass
+    text = output.read()
+    if not isinstance(text, str):
+        text = text.decode('utf-8', 'replace')
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+    return text, usage.ru_utime + usage.ru_stime
+
+
+def pin_to_cpus(cpus):
+    """
+    Restrict this process to a set of CPUs (e.g. 0-3,8), all hosts, tcpdump and pollers inherit the affinity.
+    """
+    try:
+        with open(os.devnull, 'w') as devnull:
+            subprocess.check_call(['taskset', '-a', '-p', '-c', cpus, str(os.getpid())], stdout=devnull)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print_error('Cannot pin experiment to CPUs {}: {}'.format(cpus, e))
+        sys.exit(1)
+
+
+def pinned(command, cpus):
+    if cpus is None:
+        return command
+    return ['taskset', '-c', format_cpu_list(cpus)] + command
+
+
+def write_parameters(output_directory, config, command_lines):
+    with open(os.path.join(output_directory, PARAMETERS_FILE), 'w') as f:
+        f.write('\n'.join(config + ['Commands: '] + command_lines))
+
+
 def run_test(commands, output_directory, name, bandwidth, initial_rtt, initial_loss,
-             buffer_size, buffer_latency, poll_interval):
+             buffer_size, buffer_latency, poll_interval, instance=None, cpus=None,
+             rotate_size=None, rotate_time=None, measurement_cpus=None):
 
     duration = 0
     start_time = 0
@@ -151,127 +284,250 @@ def run_test(commands, output_directory, name, bandwidth, initial_rtt, initial_l
         'Buffer Latency: {}'.format(buffer_latency),
         'Initial Link RTT: {}'.format(initial_rtt),
         'Initial Link Loss: {}'.format(initial_loss),
-        'Commands: '
     ]
+
+    # All node and interface names of an isolated experiment are prefixed, e.g. e3s2-eth2
+    prefix = 'e{}'.format(instance) if instance is not None else ''
+    bottleneck_interface = prefix + 's2-eth2'
+    if instance is not None:
+        config.append('Instance: {}'.format(instance))
+    if cpus is not None:
+        pin_to_cpus(cpus)
+        config.append('CPUs: {}'.format(cpus))
+    host_cpus = None
+    reserved_cpus = None
+    if measurement_cpus is not None:
+        try:
+            host_cpus, reserved_cpus = cpu_layout(cpus, measurement_cpus)
+        except ValueError as e:
+            print_error(e)
+            sys.exit(1)
+        host_cpu_share = len(host_cpus) / float(multiprocessing.cpu_count())
+        config.append('Host CPUs: {}'.format(format_cpu_list(host_cpus)))
+        config.append('Host CPU Share: {:.3f}'.format(host_cpu_share))
+        config.append('Measurement CPUs: {}'.format(format_cpu_list(reserved_cpus)))
+    if rotate_size is not None:
+        config.append('Capture Rotation Size: {}MB'.format(rotate_size))
+    if rotate_time is not None:
+        config.append('Capture Rotation Time: {}s'.format(rotate_time))
+    command_lines = []
     for cmd in commands:
         start_time += cmd['start']
 
         config_line = '{}, '.format(cmd['command'])
         if cmd['command'] == 'link':
             config_line += '{}, {}, {}'.format(cmd['change'], cmd['value'], cmd['start'])
+        elif cmd['command'] == 'workload':
+            number_of_hosts += 1
+            config_line += '{}, {}, {}, {}, {}, {}, {}'.format(cmd['algorithm'], cmd['rtt'], cmd['start'], cmd['stop'],
+                                                               cmd['arrival_rate'], cmd['size'], cmd['distribution'])
+            if start_time + cmd['stop'] > duration:
+                duration = start_time + cmd['stop']
         elif cmd['command'] == 'host':
             number_of_hosts += 1
             config_line += '{}, {}, {}, {}'.format(cmd['algorithm'], cmd['rtt'], cmd['start'], cmd['stop'])
+            if cmd['flows'] > 1 or cmd['generator'] != TRAFFIC_GENERATORS[0]:
+                config_line += ', {}'.format(cmd['flows'])
+            if cmd['generator'] != TRAFFIC_GENERATORS[0]:
+                config_line += ', {}'.format(cmd['generator'])
+            if cmd['rate'] is not None:
+                config_line += ', {}'.format(cmd['rate'])
             if start_time + cmd['stop'] > duration:
                 duration = start_time + cmd['stop']
-        config.append(config_line)
+        command_lines.append(config_line)
 
-    with open(os.path.join('{}'.format(output_directory), 'parameters.txt'), 'w') as f:
-        f.write('\n'.join(config))
+    write_parameters(output_directory, config, command_lines)
 
     print('-' * TEXT_WIDTH)
     print('Starting test: {}'.format(name))
     print('Total duration: {}s'.format(duration))
 
+    setup_timer = PhaseTimer()
+
     try:
-        topo = DumbbellTopo(number_of_hosts)
-        net = Mininet(topo=topo, link=TCLink)
+        topo_args = {}
+        net_args = {}
+        if instance is not None:
+            topo_args.update(prefix=prefix, instance=instance)
+            net_args['controller'] = partial(Controller, port=CONTROLLER_BASE_PORT + instance)
+        if host_cpus is not None:
+            # cgroup hosts, limited to their share of the CPU time and confined to the host CPUs
+            topo_args.update(cores=host_cpus, cpu_share=host_cpu_share)
+            net_args['host'] = CPULimitedHost
+        topo = DumbbellTopo(number_of_hosts, **topo_args)
+        net = Mininet(topo=topo, link=TCLink, **net_args)
         net.start()
     except Exception as e:
         print_error('Could not start Mininet:')
         print_error(e)
         sys.exit(1)
+    setup_timer.lap('Mininet')
 
-    # start tcp dump
+    # start tcp dump, its statistics are read from stderr when it is stopped
     try:
-        FNULL = open(os.devnull, 'w')
-        subprocess.Popen(['tcpdump', '-i', 's1-eth1', '-n', 'tcp', '-s', '88',
-                          '-w', os.path.join(output_directory, 's1.pcap')], stderr=FNULL)
-        subprocess.Popen(['tcpdump', '-i', 's3-eth1', '-n', 'tcp', '-s', '88',
-                          '-w', os.path.join(output_directory, 's3.pcap')], stderr=FNULL)
+        captures = []
+        for switch, pcap in [('s1', PCAP1), ('s3', PCAP2)]:
+            process = subprocess.Popen(pinned(tcpdump_command(prefix + switch + '-eth1',
+                                                              os.path.join(output_directory, pcap),
+                                                              rotate_size, rotate_time), reserved_cpus),
+                                       stderr=subprocess.PIPE)
+            captures.append((switch, process, time.time()))
     except Exception as e:
         print_error('Error on starting tcpdump\n{}'.format(e))
         sys.exit(1)
 
 
     time.sleep(1)
+    setup_timer.lap('tcpdump')
 
+    # setup FQ, algorithm, netem, nc host with one shell invocation per host, all hosts run concurrently
     host_counter = 0
+    host_commands = []
+    poll_targets = []
+    # base RTT of every sender from its netem delay and the lowest delay of the bottleneck, in ms
+    link_rtts = [initial_rtt] + [c['value'] for c in commands if c['command'] == 'link' and c['change'] == 'rtt']
+    link_rtt = min(parse_time(rtt) for rtt in link_rtts) * 1000
+    base_rtts = {}
     for cmd in commands:
-        if cmd['command'] != 'host':
+        if cmd['command'] not in HOST_COMMANDS:
             continue
-        send = net.get('h{}'.format(host_counter))
-        send.setIP('10.1.{}.{}/8'.format(host_counter // 256, host_counter % 256))
-        recv = net.get('r{}'.format(host_counter))
-        recv.setIP('10.2.{}.{}/8'.format(host_counter // 256, host_counter % 256))
+        send = net.get('{}h{}'.format(prefix, host_counter))
+        recv = net.get('{}r{}'.format(prefix, host_counter))
         host_counter += 1
 
-        # setup FQ, algorithm, netem, nc host
-        send.cmd('tc qdisc add dev {}-eth0 root fq pacing'.format(send))
-        send.cmd('ip route change 10.0.0.0/8 dev {}-eth0 congctl {}'.format(send, cmd['algorithm']))
-        send.cmd('ethtool -K {}-eth0 tso off'.format(send))
-        recv.cmd('tc qdisc add dev {}-eth0 root netem delay {}'.format(recv, cmd['rtt']))
-        recv.cmd('timeout {} nc -klp 9000 > /dev/null &'.format(duration))
+        host_commands.append((send, sender_setup('{}-eth0'.format(send), cmd['algorithm'])))
+        host_commands.append((recv, receiver_setup('{}-eth0'.format(recv), cmd, duration)))
+
+        poll_targets.append('{}:{}.{}'.format(send.pid, os.path.join(output_directory, send.IP()), FLOW_FILE_EXTENSION))
+        base_rtts[send.IP()] = parse_time(cmd['rtt']) * 1000 + link_rtt
 
-        # pull BBR values
-        send.cmd('./ss_script.sh {} >> {}.{} &'.format(poll_interval, os.path.join(output_directory, send.IP()), FLOW_FILE_EXTENSION))
+    run_concurrently(host_commands)
+    setup_timer.lap('Host configuration')
 
-    s2, s3 = net.get('s2', 's3')
-    s2.cmd(traffic_shaping('tbf', 's2-eth2', add=True, rate=bandwidth, buffer=buffer_size, latency=buffer_latency))
+    # pull BBR values of all senders from a single process
+    try:
+        ss_poller = subprocess.Popen(pinned([sys.executable, 'ss_poller.py', str(poll_interval)] + poll_targets,
+                                            reserved_cpus), stdout=subprocess.PIPE)
+        ss_poller_start = time.time()
+    except Exception as e:
+        print_error('Error on starting ss_poller\n{}'.format(e))
+        sys.exit(1)
+
+    s2 = net.get(prefix + 's2')
+    bottleneck = [traffic_shaping('tbf', bottleneck_interface, add=True, rate=bandwidth, buffer=buffer_size,
+                                  latency=buffer_latency)]
 
     netem_running = False
     if current_netem_delay != '0ms' or current_netem_loss != '0%':
         netem_running = True
-        s2.cmd(traffic_shaping('netem', 's2-eth2', add=True, delay=current_netem_delay, loss=current_netem_loss))
-    s2.cmd('./buffer_script.sh {0} {1} >> {2}.{3} &'.format(poll_interval, 's2-eth2',
-                                                            os.path.join(output_directory, 's2-eth2-tbf'),
-                                                            BUFFER_FILE_EXTENSION))
+        bottleneck.append(traffic_shaping('netem', bottleneck_interface, add=True, delay=current_netem_delay,
+                                          loss=current_netem_loss))
+    s2.cmd(tc_batch(bottleneck))
 
-    complete = duration
-    current_time = 0
+    try:
+        buffer_poller = subprocess.Popen(pinned([sys.executable, 'buffer_poller.py', str(poll_interval),
+                                                 bottleneck_interface,
+                                                 '{}.{}'.format(os.path.join(output_directory, 's2-eth2-tbf'),
+                                                                BUFFER_FILE_EXTENSION),
+                                                 '--pid', str(s2.pid),
+                                                 '--fidelity', os.path.join(output_directory, FIDELITY_FILE)],
+                                                reserved_cpus), stdout=subprocess.PIPE)
+        buffer_poller_start = time.time()
+    except Exception as e:
+        print_error('Error on starting buffer_poller\n{}'.format(e))
+        sys.exit(1)
+    setup_timer.lap('Bottleneck and pollers')
+
+    print('Setup:')
+    for phase, seconds in setup_timer.phases:
+        print('  {:<30} {:8.3f}s'.format(phase, seconds))
+    config += ['Setup {}: {:.3f}s'.format(phase, seconds) for phase, seconds in setup_timer.phases]
+    write_parameters(output_directory, config, command_lines)
+
+    link_state = {
+        'delay': current_netem_delay,
+        'loss': current_netem_loss,
+        'netem_running': netem_running,
+    }
+
+    def change_link(cmd):
+        if cmd['change'] == 'bw':
+            s2.cmd(traffic_shaping('tbf', bottleneck_interface, add=False, rate=cmd['value'], buffer=buffer_size,
+                                   latency=buffer_latency))
+            return '  Change bandwidth to {}.'.format(cmd['value'])
+
+        if cmd['change'] == 'rtt':
+            link_state['delay'] = cmd['value']
+        else:
+            link_state['loss'] = cmd['value']
+        s2.cmd(traffic_shaping('netem', bottleneck_interface, add=not link_state['netem_running'],
+                               delay=link_state['delay'], loss=link_state['loss']))
+        link_state['netem_running'] = True
+        return '  Change {} to {}.'.format(cmd['change'], cmd['value'])
+
+    def start_flow(host_id, cmd):
+        send = net.get('{}h{}'.format(prefix, host_id))
+        recv = net.get('{}r{}'.format(prefix, host_id))
+        send.cmd(start_flows(cmd, recv.IP()))
+        log_string = '  h{}: {} {}, {} -> {}'.format(host_id, cmd['algorithm'], cmd['rtt'], send.IP(), recv.IP())
+        if cmd['command'] == 'workload':
+            log_string += ' ({}/s, {} {})'.format(cmd['arrival_rate'], cmd['size'], cmd['distribution'])
+        elif cmd['flows'] > 1:
+            log_string += ' ({} flows)'.format(cmd['flows'])
+        return log_string
+
+    # compute the complete timeline up front, every event fires at its absolute offset
+    scheduler = Scheduler(duration)
+    offset = 0
     host_counter = 0
-
+    for cmd in commands:
+        offset += cmd['start']
+        if cmd['command'] == 'link':
+            scheduler.add(offset, lambda cmd=cmd: change_link(cmd),
+                          'link {} {}'.format(cmd['change'], cmd['value']))
+        elif cmd['command'] in HOST_COMMANDS:
+            scheduler.add(offset, lambda cmd=cmd, host_id=host_counter: start_flow(host_id, cmd),
+                          '{} h{} {} {}'.format(cmd['command'], host_counter, cmd['algorithm'], cmd['rtt']))
+            host_counter += 1
 
     try:
-        for cmd in commands:
-            start = cmd['start']
-            current_time = sleep_progress_bar(start, current_time=current_time, complete=complete)
-
-            if cmd['command'] == 'link':
-                s2 = net.get('s2')
-
-                if cmd['change'] == 'bw':
-                    s2.cmd(traffic_shaping('tbf', 's2-eth2', add=False, rate=cmd['value'], buffer=buffer_size, latency=buffer_latency))
-                    log_String = '  Change bandwidth to {}.'.format(cmd['value'])
-
-                elif cmd['change'] == 'rtt' or cmd['change'] == 'loss':
-                    current_netem_delay = cmd['value'] if cmd['change'] == 'rtt' else current_netem_delay
-                    current_netem_loss = cmd['value'] if cmd['change'] == 'loss' else current_netem_loss
-
-                    s2.cmd(traffic_shaping('netem', 's2-eth2', add=not netem_running, delay=current_netem_delay,
-                                           loss=current_netem_loss))
-                    netem_running = True
-                    log_String = '  Change {} to {}.'.format(cmd['change'], cmd['value'])
-
-            elif cmd['command'] == 'host':
-                send = net.get('h{}'.format(host_counter))
-                recv = net.get('r{}'.format(host_counter))
-                timeout = cmd['stop']
-                log_String = '  h{}: {} {}, {} -> {}'.format(host_counter, cmd['algorithm'], cmd['rtt'], send.IP(), recv.IP())
-                send.cmd('timeout {} nc {} 9000 < /dev/urandom > /dev/null &'.format(timeout, recv.IP()))
-                host_counter += 1
-            print(log_String + ' ' * (TEXT_WIDTH - len(log_String)))
-
-        current_time = sleep_progress_bar((complete - current_time) % 1, current_time=current_time, complete=complete)
-        current_time = sleep_progress_bar(complete - current_time, current_time=current_time, complete=complete)
+        scheduler.run()
     except (KeyboardInterrupt, Exception) as e:
         if isinstance(e, KeyboardInterrupt):
             print_warning('\nReceived keyboard interrupt. Stop Mininet.')
         else:
             print_error(e)
     finally:
+        scheduler.write_log(os.path.join(output_directory, EVENT_FILE))
+
+        # stop all measurement processes before the interfaces disappear and record their overhead
+        for poller_name, poller, started in [('ss_poller', ss_poller, ss_poller_start),
+                                             ('buffer_poller', buffer_poller, buffer_poller_start)]:
+            output, cpu = stop_process(poller, poller.stdout, signal.SIGTERM)
+            for line in output.splitlines():
+                if not line.startswith(POLL_STATISTICS_PREFIX):
+                    print(line)
+            config.append(format_poller(poller_name, parse_poll_statistics(output), cpu, time.time() - started))
+        for switch, process, started in captures:
+            output, cpu = stop_process(process, process.stderr, signal.SIGINT)
+            config.append(format_capture(switch, parse_tcpdump_statistics(output), cpu, time.time() - started))
+        print('Measurement:')
+        for line in config[-4:]:
+            print('  {}'.format(line))
+
+        fidelity = evaluate_fidelity(output_directory, base_rtts)
+        config += fidelity
+        write_parameters(output_directory, config, command_lines)
+        for line in fidelity:
+            if line.startswith(PROBLEM_PREFIX):
+                print_warning('  ' + line[len(PROBLEM_PREFIX):])
+            elif line.startswith(VERDICT_PREFIX):
+                print(line)
+
         net.stop()
-        cleanup()
+        # cleanup would remove the switches and controllers of all other experiments
+        if instance is None:
+            cleanup()
 
     print('-' * TEXT_WIDTH)
 
@@ -293,8 +549,13 @@ def verify_arguments(args, commands):
                 verified &= verify('time', c['value'])
             elif c['change'] == 'loss':
                 verified &= verify('percent', c['value'])
+        elif c['command'] == 'workload':
+            verified &= verify('time', c['rtt'])
+            verified &= verify('size', c['size'])
         elif c['command'] == 'host':
             verified &= verify('time', c['rtt'])
+            if c['rate'] is not None:
+                verified &= verify('rate', c['rate'])
 
     return verified
 
@@ -323,7 +584,8 @@ def compress_output(dir, method):
 
     all_files = glob.glob(os.path.join(dir, '*.{}'.format(FLOW_FILE_EXTENSION)))
     all_files += glob.glob(os.path.join(dir, '*.{}'.format(BUFFER_FILE_EXTENSION)))
-    all_files += glob.glob(os.path.join(dir, '*.pcap'))
+    all_files += find_capture_files(os.path.join(dir, PCAP1))
+    all_files += find_capture_files(os.path.join(dir, PCAP2))
 
     print('Compressing files:')
 
@@ -355,6 +617,18 @@ if __name__ == '__main__':
                         help='Name of the output directory. (default: <config file name>)')
     parser.add_argument('--poll-interval', dest='poll_interval', type=float,
                         default=0.04, help='Interval to poll TCP values and buffer backlog in seconds. (default: 0.04)')
+    parser.add_argument('--instance', dest='instance', type=int,
+                        help='Run as isolated experiment <N> with prefixed node names and its own controller port, '
+                             'so that several experiments can run at the same time. (default: none)')
+    parser.add_argument('--cpus', dest='cpus',
+                        help='Pin the experiment to a list of CPUs, e.g. 0-3 or 0,2. (default: all)')
+    parser.add_argument('--measurement-cpus', dest='measurement_cpus', type=int,
+                        help='Reserve the last <n> CPUs of the experiment for tcpdump and the pollers and run the '
+                             'hosts as CPU-limited cgroup hosts on the remaining CPUs. (default: shared CPUs)')
+    parser.add_argument('--rotate-size', dest='rotate_size', type=int,
+                        help='Start a new capture file every <n> MB. (default: single file)')
+    parser.add_argument('--rotate-time', dest='rotate_time', type=int,
+                        help='Start a new capture file every <n> seconds. (default: single file)')
     parser.add_argument('-c --compression', dest='compression',
                         choices=COMPRESSION_METHODS, default=COMPRESSION_METHODS[1],
                         help='Compression method of the output files. Default: {}'.format(COMPRESSION_METHODS[1]))
@@ -377,6 +651,12 @@ if __name__ == '__main__':
         print_error('Please fix malformed parameters.')
         sys.exit(128)
 
+    # CPULimitedHost creates its cgroups with the cgroup tools
+    if args.measurement_cpus is not None and not check_tool('cgcreate'):
+        print_error('CPU isolation requires the cgroup tools. Please run')
+        print_error('  apt install cgroup-tools')
+        sys.exit(1)
+
     output_directory = os.path.join(args.directory, '{}_{}'.format(time.strftime('%m%d_%H%M%S'), args.name))
 
     # setLogLevel('info')
@@ -388,7 +668,12 @@ if __name__ == '__main__':
              buffer_latency=args.latency,
              name=args.name,
              output_directory=output_directory,
-             poll_interval=args.poll_interval)
+             poll_interval=args.poll_interval,
+             instance=args.instance,
+             cpus=args.cpus,
+             rotate_size=args.rotate_size,
+             rotate_time=args.rotate_time,
+             measurement_cpus=args.measurement_cpus)
 
     compression = args.compression
 
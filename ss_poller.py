@@ -0,0 +1,42 @@
+import argparse
+import sys
+
+from helper.poller import Poller, run_pollers
+from helper.sock_diag import SockDiag
+from helper.measurement import print_poll_statistics
+from helper.util import print_error
+
+
+def host_poller(pid, output):
+    diag = SockDiag(pid)
+    return Poller(output, diag.query, diag.close)
+
+
+def parse_target(string):
+    pid, _, output = string.partition(':')
+    if not pid.isdigit() or output == '':
+        raise argparse.ArgumentTypeError('Expected <pid>:<output file>, got "{}"'.format(string))
+    return int(pid), output
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Poll tcp_info and BBR values of all TCP sockets of the given '
+                                                 'network namespaces via sock_diag netlink.')
+    parser.add_argument('interval', type=float,
+                        help='Poll interval in seconds.')
+    parser.add_argument('targets', metavar='PID:FILE', type=parse_target, nargs='+',
+                        help='Process id of a process inside the network namespace and the output file.')
+    args = parser.parse_args()
+
+    pollers = []
+    for pid, output in args.targets:
+        try:
+            pollers.append(host_poller(pid, output))
+        except (IOError, OSError) as e:
+            print_error('Cannot poll sockets of pid {}: {}'.format(pid, e))
+
+    print_poll_statistics(run_pollers(args.interval, pollers))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
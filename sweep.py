@@ -0,0 +1,334 @@
+import argparse
+import glob
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from helper.util import print_error, print_warning, print_success
+from helper import TEXT_WIDTH
+
+try:
+    from Queue import Queue, Empty
+except ImportError:
+    from queue import Queue, Empty
+
+SWEEP_PARAMETERS = {
+    'config': None,
+    'bandwidth': '-b',
+    'rtt': '-r',
+    'loss': '--loss',
+    'buffer_size': '-s',
+    'latency': '-l',
+    'poll_interval': '--poll-interval',
+}
+
+JOURNAL_FILE = 'sweep_journal.txt'
+
+
+def parse_sweep_file(path):
+    """
+    Read the parameter sets of a sweep. Lines of the form
+        <parameter>, <value>, <value>, ...
+    span a grid over all combinations, lines of the form
+        run, <parameter>=<value>, <parameter>=<value>, ...
+    add a single parameter set. Parameters missing in a run line are taken from the first grid value.
+    """
+    grid = []
+    runs = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line == '' or line[0] == '#':
+                continue
+
+            split = [s.strip() for s in line.split(',')]
+            if split[0] == 'run':
+                run = {}
+                for assignment in split[1:]:
+                    key, _, value = assignment.partition('=')
+                    run[key.strip()] = value.strip()
+                runs.append(run)
+            else:
+                grid.append((split[0], split[1:]))
+
+    for key, _ in grid:
+        check_parameter(key)
+    for run in runs:
+        for key in run:
+            check_parameter(key)
+
+    parameter_sets = []
+    if len(grid) > 0:
+        keys = [key for key, _ in grid]
+        for values in itertools.product(*[values for _, values in grid]):
+            parameter_sets.append(dict(zip(keys, values)))
+
+    defaults = dict((key, values[0]) for key, values in grid)
+    for run in runs:
+        parameters = dict(defaults)
+        parameters.update(run)
+        parameter_sets.append(parameters)
+
+    return [p for p in parameter_sets if 'config' in p]
+
+
+def check_parameter(key):
+    if key not in SWEEP_PARAMETERS:
+        raise ValueError('Unknown sweep parameter "{}". Known parameters: {}'.format(
+            key, ', '.join(sorted(SWEEP_PARAMETERS))))
+
+
+def run_key(parameters):
+    return hashlib.sha1(json.dumps(parameters, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+
+def run_name(parameters):
+    name = os.path.splitext(os.path.basename(parameters['config']))[0]
+    for key in sorted(parameters):
+        if key != 'config':
+            name += '_{}{}'.format(key, parameters[key].replace('%', 'pct'))
+    return name
+
+
+class Journal:
+    """
+    Append-only record of the runs of a sweep, one JSON object per line. The last entry of a run wins.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.isfile(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # incomplete last line of an interrupted sweep
+                        continue
+                    self.entries[entry['key']] = entry
+
+    def status(self, key):
+        if key not in self.entries:
+            return None
+        return self.entries[key]['status']
+
+    def record(self, key, status, **kwargs):
+        entry = dict(kwargs, key=key, status=status, time=time.strftime('%Y-%m-%d %H:%M:%S'))
+        with self.lock:
+            self.entries[key] = entry
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(entry, sort_keys=True) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def cpu_slices(parallel):
+    """
+    Split the CPUs into one contiguous range per parallel experiment, e.g. ['0-3', '4-7'].
+    """
+    cpus = multiprocessing.cpu_count()
+    if parallel > cpus:
+        return [None] * parallel
+    size = cpus // parallel
+    return ['{}-{}'.format(i * size, (i + 1) * size - 1) for i in range(parallel)]
+
+
+def emulate(parameters, directory, name, extra_args, instance=None, cpus=None):
+    command = [sys.executable, 'run_mininet.py', parameters['config'], '-d', directory, '-n', name]
+    if instance is not None:
+        command += ['--instance', str(instance)]
+    if cpus is not None:
+        command += ['--cpus', cpus]
+    for key, flag in SWEEP_PARAMETERS.items():
+        if flag is not None and key in parameters:
+            command += [flag, parameters[key]]
+    command += extra_args
+
+    returncode = subprocess.call(command)
+
+    # run_mininet.py prefixes the name with the start time
+    outputs = sorted(glob.glob(os.path.join(directory, '*_{}'.format(name))))
+    output = outputs[-1] if len(outputs) > 0 else None
+    return returncode, output
+
+
+class Analyzer:
+    """
+    Analyze finished runs in the background while the next runs are emulated.
+    """
+
+    def __init__(self, journal, analyze_args, max_processes=1):
+        self.journal = journal
+        self.analyze_args = analyze_args
+        self.max_processes = max_processes
+        self.queue = []
+        self.running = []
+        self.lock = threading.Lock()
+
+    def add(self, key, output):
+        with self.lock:
+            self.queue.append((key, output))
+        self.poll()
+
+    def poll(self):
+        with self.lock:
+            for key, output, process in self.running[:]:
+                if process.poll() is not None:
+                    self.running.remove((key, output, process))
+                    status = 'analyzed' if process.returncode == 0 else 'analysis_failed'
+                    self.journal.record(key, status, directory=output, returncode=process.returncode)
+
+            while len(self.queue) > 0 and len(self.running) < self.max_processes:
+                key, output = self.queue.pop(0)
+                log = open(os.path.join(output, 'analysis.log'), 'w')
+                process = subprocess.Popen([sys.executable, 'analyze.py', '-d', output] + self.analyze_args,
+                                           stdout=log, stderr=subprocess.STDOUT)
+                self.running.append((key, output, process))
+
+    def wait(self):
+        while True:
+            self.poll()
+            with self.lock:
+                if len(self.queue) == 0 and len(self.running) == 0:
+                    return
+            time.sleep(1)
+
+
+def run_sweep(parameter_sets, directory, parallel, analyze, analyze_args, extra_args):
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    journal = Journal(os.path.join(directory, JOURNAL_FILE))
+    analyzer = Analyzer(journal, analyze_args) if analyze else None
+
+    pending = Queue()
+    total = 0
+    for parameters in parameter_sets:
+        key = run_key(parameters)
+        status = journal.status(key)
+        if status in ['done', 'analyzed', 'analysis_failed']:
+            # emulated runs are not repeated, only their missing or failed analysis
+            if analyzer is not None and status in ['done', 'analysis_failed']:
+                analyzer.add(key, journal.entries[key]['directory'])
+            continue
+        pending.put((key, parameters))
+        total += 1
+
+    print('-' * TEXT_WIDTH)
+    print('Sweep: {} parameter sets, {} remaining'.format(len(parameter_sets), total))
+
+    stop = threading.Event()
+    counter = [0]
+    counter_lock = threading.Lock()
+
+    # Parallel experiments run isolated from each other, each on its own share of the CPUs
+    isolated = parallel > 1
+    slices = cpu_slices(parallel)
+
+    def worker(instance):
+        while not stop.is_set():
+            try:
+                key, parameters = pending.get_nowait()
+            except Empty:
+                return
+            name = run_name(parameters)
+            with counter_lock:
+                counter[0] += 1
+                print('{}/{} Running {}'.format(counter[0], total, name))
+            journal.record(key, 'started', parameters=parameters, name=name)
+
+            if isolated:
+                returncode, output = emulate(parameters, directory, name, extra_args, instance, slices[instance])
+            else:
+                returncode, output = emulate(parameters, directory, name, extra_args)
+            if returncode != 0 or output is None:
+                print_error('Run {} failed with exit code {}'.format(name, returncode))
+                journal.record(key, 'failed', parameters=parameters, name=name, returncode=returncode)
+                continue
+
+            journal.record(key, 'done', parameters=parameters, name=name, directory=output)
+            if analyzer is not None:
+                analyzer.add(key, output)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(parallel)]
+    for t in threads:
+        t.daemon = True
+        t.start()
+
+    try:
+        while any(t.is_alive() for t in threads):
+            for t in threads:
+                t.join(1)
+            if analyzer is not None:
+                analyzer.poll()
+    except KeyboardInterrupt:
+        stop.set()
+        print_warning('\nReceived keyboard interrupt. Waiting for running experiments, resume the sweep later.')
+        for t in threads:
+            t.join()
+
+    if analyzer is not None:
+        print('Waiting for remaining analyses ...')
+        analyzer.wait()
+
+    failed = [e for e in journal.entries.values() if e['status'] == 'failed']
+    analysis_failed = [e for e in journal.entries.values() if e['status'] == 'analysis_failed']
+    if len(failed) > 0:
+        print_warning('{} runs failed, rerun the sweep to retry them.'.format(len(failed)))
+    if len(analysis_failed) > 0:
+        print_warning('{} analyses failed, rerun the sweep with -a to retry them.'.format(len(analysis_failed)))
+    if len(failed) + len(analysis_failed) == 0:
+        print_success('Sweep complete.')
+    print('-' * TEXT_WIDTH)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run run_mininet.py for all parameter sets of a sweep file. '
+                                                 'Completed runs are journaled, an interrupted sweep resumes '
+                                                 'where it stopped.')
+    parser.add_argument('sweep', metavar='SWEEP',
+                        help='Path to the sweep file.')
+    parser.add_argument('-d', dest='directory',
+                        default='test/', help='Path to the output directory. (default: test/)')
+    parser.add_argument('-j', dest='parallel', type=int, default=1,
+                        help='Number of experiments running at the same time. (default: 1)')
+    parser.add_argument('-a --analyze', dest='analyze', action='store_true',
+                        help='Analyze each finished run while the next one is emulated.')
+    parser.add_argument('--analyze-args', dest='analyze_args', default='',
+                        help='Additional arguments for analyze.py, e.g. "-t 0.1 -o csv".')
+    parser.add_argument('--run-args', dest='run_args', default='',
+                        help='Additional arguments for run_mininet.py, e.g. "-c none".')
+    parser.add_argument('--dry-run', dest='dry_run', action='store_true',
+                        help='Only print the parameter sets.')
+
+    args = parser.parse_args()
+
+    try:
+        parameter_sets = parse_sweep_file(args.sweep)
+    except (IOError, ValueError) as e:
+        print_error(e)
+        return 128
+
+    if len(parameter_sets) == 0:
+        print_error('No parameter sets with a config file found in {}.'.format(args.sweep))
+        return 128
+
+    if args.dry_run:
+        for parameters in parameter_sets:
+            print('{}  {}'.format(run_key(parameters), run_name(parameters)))
+        return 0
+
+    run_sweep(parameter_sets, args.directory, max(1, args.parallel), args.analyze,
+              args.analyze_args.split(), args.run_args.split())
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import analyze
+from helper.synthetic import generate_result_directory, SYN_RTO
+
+
+class ParsePcapTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def parse(self, **kwargs):
+        generate_result_directory(self.path, flows=3, duration=2, rate=200, **kwargs)
+        return analyze.parse_pcap(self.path, 0.1)
+
+    def assert_same_flows(self, data):
+        starts = data.data_info.connection_starts
+        for c in range(len(starts)):
+            # the captures before and behind the bottleneck count the same packets of a connection
+            sent = sum(data.sending_rate[c][1])
+            received = sum(data.throughput[c][1])
+            self.assertAlmostEqual(received / sent, 1, delta=0.05)
+            self.assertGreater(len(data.sojourn_time[c][0]), 0)
+
+    def test_connection_ids_shared_by_both_captures(self):
+        data = self.parse()
+        self.assertEqual(len(data.throughput), 4)
+        self.assert_same_flows(data)
+
+    def test_syn_dropped_at_bottleneck(self):
+        # the first connection passes the bottleneck after the others, but keeps its id
+        data = self.parse(syn_loss=[0])
+        self.assert_same_flows(data)
+        starts = data.data_info.connection_starts
+        self.assertGreaterEqual(data.throughput[0][0][0], starts[0] + SYN_RTO)
+        self.assertLess(data.throughput[1][0][0], starts[0] + SYN_RTO)
+        self.assertGreaterEqual(data.cwnd_values[0][0][0], starts[0] + SYN_RTO)
+        self.assertEqual(data.cwnd_values[1][1][0], 11)
+
+
+class UnwrapSeqTest(unittest.TestCase):
+
+    def test_beyond_four_gib(self):
+        start = 2 ** 32 - 1000
+        highest = 2 ** 32 - 100
+        # the next segment wraps the relative sequence number, a retransmission lies before the highest
+        self.assertEqual(analyze.unwrap_seq((start + highest) % 2 ** 32, start, highest), highest)
+        self.assertEqual(analyze.unwrap_seq((start + highest + 1448) % 2 ** 32, start, highest), highest + 1448)
+        self.assertEqual(analyze.unwrap_seq((start + highest - 1448) % 2 ** 32, start, highest), highest - 1448)
+        highest += 3 * 2 ** 32
+        self.assertEqual(analyze.unwrap_seq((start + highest + 1448) % 2 ** 32, start, highest), highest + 1448)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from helper import FLOW_FILE_EXTENSION
+from helper.fidelity import evaluate_fidelity, utilization, VERDICT_PREFIX, PROBLEM_PREFIX
+
+
+def fidelity_samples(timestamps, tx_bytes):
+    # only the timestamps and the transmitted bytes are read by utilization
+    zeros = [0] * len(timestamps)
+    return timestamps, zeros, zeros, zeros, zeros, tx_bytes, zeros
+
+
+class UtilizationTest(unittest.TestCase):
+
+    def test_backlogged_intervals(self):
+        # 1000 bytes/s until 2.5s, then 2000 bytes/s; the queue runs empty between 3s and 4s
+        samples = fidelity_samples([1.0, 2.0, 3.0, 4.0, 5.0], [0, 900, 2900, 3900, 5900])
+        backlog = ([1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0], [10, 10, 10, 10, 10, 0, 10, 10, 10])
+        bandwidth = [(0, 1000), (2.5, 2000)]
+        timestamps, utilizations = utilization(samples, backlog, bandwidth)
+        # (2, 3] spans the bandwidth change and (3, 4] was not backlogged all the time
+        self.assertEqual(timestamps, [2.0, 5.0])
+        self.assertAlmostEqual(utilizations[0], 0.9)
+        self.assertAlmostEqual(utilizations[1], 1.0)
+
+    def test_without_bandwidth(self):
+        samples = fidelity_samples([1.0, 2.0], [0, 1000])
+        self.assertEqual(utilization(samples, ([1.0, 2.0], [10, 10]), []), ([], []))
+
+
+class EvaluateFidelityTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def evaluate(self, rtt, configured):
+        with open(os.path.join(self.path, '10.1.0.1.{}'.format(FLOW_FILE_EXTENSION)), 'w') as f:
+            f.write('1000.000000;10;20;;0;0;{:.3f};0;10.1.0.1;40000;10.2.0.1;9000\n'.format(rtt + 5))
+            f.write('1000.100000;10;20;;0;0;{:.3f};0;10.1.0.1;40000;10.2.0.1;9000\n'.format(rtt))
+        return evaluate_fidelity(self.path, {'10.1.0.1': configured})
+
+    def test_rtt_within_tolerance(self):
+        # 10% of the configured RTT plus the absolute tolerance of 2ms
+        lines = self.evaluate(23.9, 20.0)
+        self.assertEqual(lines[0], VERDICT_PREFIX + 'ok')
+        self.assertIn('Fidelity RTT 10.1.0.1: observed 23.90ms, configured 20.00ms', lines)
+        self.assertEqual(self.evaluate(16.1, 20.0)[0], VERDICT_PREFIX + 'ok')
+
+    def test_rtt_beyond_tolerance(self):
+        lines = self.evaluate(24.1, 20.0)
+        self.assertEqual(lines[0], VERDICT_PREFIX + 'degraded')
+        self.assertEqual(lines[1], PROBLEM_PREFIX + 'The base RTT of 10.1.0.1 was 24.10ms instead of 20.00ms.')
+
+    def test_unknown(self):
+        self.assertEqual(evaluate_fidelity(self.path, {'10.1.0.1': 20.0}), [VERDICT_PREFIX + 'unknown'])
+
+
+if __name__ == '__main__':
+    unittest.main()
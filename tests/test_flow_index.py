@@ -0,0 +1,26 @@
+import unittest
+
+from helper.flow_index import FlowIndex
+
+A = ('10.1.0.1', 45678, '10.2.0.1', 9000)
+B = ('10.1.0.2', 45678, '10.2.0.2', 9000)
+
+
+class FlowIndexTest(unittest.TestCase):
+
+    def test_single_connection(self):
+        index = FlowIndex([A, B], [0.0, 1.0])
+        self.assertEqual(index.split(B, [1.0, 2.0, 3.0]), [(1, 0, 3)])
+        self.assertEqual(index.split(('10.1.0.3', 1, '10.2.0.3', 9000), [1.0]), [])
+
+    def test_reused_tuple(self):
+        # connection 2 reuses the 4-tuple of connection 0 from second 3 on
+        index = FlowIndex([A, B, A], [0.5, 1.0, 3.0])
+        timestamps = [0.0, 1.0, 2.0, 2.5, 3.0, 4.0]
+        self.assertEqual(index.split(A, timestamps), [(0, 0, 4), (2, 4, 6)])
+        # a connection without samples gets no slice
+        self.assertEqual(index.split(A, [3.5, 4.0]), [(2, 0, 2)])
+
+
+if __name__ == '__main__':
+    unittest.main()
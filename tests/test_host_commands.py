@@ -0,0 +1,38 @@
+import subprocess
+import unittest
+
+from helper.host_commands import receiver_setup, start_flows, BASE_PORT
+
+
+def command(flows, generator='nc'):
+    return {'rtt': '10ms', 'flows': flows, 'generator': generator, 'stop': 30, 'rate': None}
+
+
+def bash_syntax_error(line):
+    process = subprocess.Popen(['bash', '-n', '-c', line], stderr=subprocess.PIPE)
+    return process.communicate()[1].decode()
+
+
+class HostCommandsTest(unittest.TestCase):
+
+    def test_receiver_with_several_flows(self):
+        line = receiver_setup('r0-eth0', command(3), 60)
+        self.assertEqual(bash_syntax_error(line), '')
+        self.assertTrue(line.startswith('tc qdisc add dev r0-eth0 root netem delay 10ms; '))
+        for i in range(3):
+            self.assertIn('timeout 60 nc -klp {} > /dev/null &'.format(BASE_PORT + i), line)
+        self.assertNotIn('&;', line)
+
+    def test_receiver_with_one_flow(self):
+        line = receiver_setup('r0-eth0', command(1, 'sendfile'), 60)
+        self.assertEqual(bash_syntax_error(line), '')
+        self.assertIn('traffic.py sink {}'.format(BASE_PORT), line)
+
+    def test_sender_with_several_flows(self):
+        line = start_flows(command(2), '10.2.0.0')
+        self.assertEqual(bash_syntax_error(line), '')
+        self.assertIn('nc 10.2.0.0 {} < /dev/urandom'.format(BASE_PORT + 1), line)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from helper.html_report import build_pyramid, write_series, FACTOR, CHUNK_POINTS, RECORD, DATA_PATH
+
+# two chunks and a bit at the samples, just over a chunk after the first reduction
+POINTS = 2 * CHUNK_POINTS * FACTOR + 5
+
+
+def series():
+    timestamps = np.arange(POINTS) * 0.01
+    values = (np.arange(POINTS) * 7919 % 1000).astype(float)
+    return timestamps, values
+
+
+class BuildPyramidTest(unittest.TestCase):
+
+    def test_levels(self):
+        timestamps, values = series()
+        levels = build_pyramid(timestamps, values)
+        self.assertEqual([len(level) for level in levels], [POINTS, 2 * CHUNK_POINTS + 2, CHUNK_POINTS // 2 + 1])
+        self.assertLessEqual(len(levels[-1]), CHUNK_POINTS)
+        np.testing.assert_array_equal(levels[0]['min'], values)
+
+        for n in range(1, len(levels)):
+            below = levels[n - 1]
+            for i, record in enumerate(levels[n]):
+                bucket = below[i * FACTOR:(i + 1) * FACTOR]
+                # every record starts at its first sample and spans the extremes of FACTOR samples of the level below
+                self.assertEqual(record['t'], bucket['t'][0])
+                self.assertEqual(record['min'], bucket['min'].min())
+                self.assertEqual(record['max'], bucket['max'].max())
+
+    def test_small_series(self):
+        levels = build_pyramid([0.0, 1.0], [2.0, 1.0])
+        self.assertEqual(len(levels), 1)
+
+
+class WriteSeriesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.path, DATA_PATH))
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_chunks(self):
+        timestamps, values = series()
+        levels = write_series(self.path, 'throughput_0', timestamps, values)
+        self.assertEqual([level['factor'] for level in levels], [1, FACTOR, FACTOR ** 2])
+        self.assertEqual([chunk['n'] for chunk in levels[0]['chunks']], [CHUNK_POINTS] * (2 * FACTOR) + [5])
+        self.assertEqual([chunk['n'] for chunk in levels[1]['chunks']], [CHUNK_POINTS, CHUNK_POINTS, 2])
+
+        pyramid = build_pyramid(timestamps, values)
+        for n, level in enumerate(levels):
+            records = np.concatenate([np.fromfile(os.path.join(self.path, DATA_PATH, chunk['file']), dtype=RECORD)
+                                      for chunk in level['chunks']])
+            np.testing.assert_array_equal(records, pyramid[n])
+            for i, chunk in enumerate(level['chunks']):
+                # chunks split the level at multiples of CHUNK_POINTS
+                self.assertEqual(chunk['file'], 'throughput_0_{}_{}.bin'.format(n, i))
+                self.assertEqual(chunk['t0'], pyramid[n]['t'][i * CHUNK_POINTS])
+                self.assertEqual(chunk['t1'], pyramid[n]['t'][i * CHUNK_POINTS + chunk['n'] - 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from helper.log_parser import FLOW_LINE, BUFFER_LINE, parse_flow_file, parse_buffer_file
+
+TUPLE = ('10.1.0.1', 45678, '10.2.0.1', 9000)
+
+FLOW_LINES = [
+    # former ss_script.sh without the 4-tuple
+    '1.000000;10;20;bw:5Mbps,mrtt:20,pacing_gain:1.25,cwnd_gain:2',
+    # ss_poller.py
+    '2.000000;11;;bw:5Mbps,mrtt:20,pacing_gain:1.25,cwnd_gain:2;1;2;20;0;10.1.0.1;45678;10.2.0.1;9000',
+    # newer ss versions
+    '3.000000;12;;bbr:(bw:2.5Mbps,mrtt:30.5,pacing_gain:2.88672,cwnd_gain:2.88672);1;2;30;0;'
+    '10.1.0.1;45678;10.2.0.1;9000',
+    '4.000000;13;;bbr:(version:3,mrtt:25,bw:1e+06bps);1;2;25;0;10.1.0.1;45678;10.2.0.1;9000',
+    # cubic
+    '5.000000;14;7;;1;2;25;1;10.1.0.1;45678;10.2.0.1;9000',
+]
+
+
+class LogParserTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, name, lines):
+        path = os.path.join(self.root, name)
+        with open(path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        return path
+
+    def test_flow_line(self):
+        columns = FLOW_LINE.match(FLOW_LINES[1] + '\n').groups()
+        self.assertEqual(columns, ('2.000000', '11', '', '5', 'Mbps', '20', '1.25', '2', None,
+                                   '10.1.0.1', '45678', '10.2.0.1', '9000'))
+        # unknown bbr notations are captured as a whole
+        self.assertEqual(FLOW_LINE.match(FLOW_LINES[3]).group(9), 'bbr:(version:3,mrtt:25,bw:1e+06bps)')
+
+    def test_parse_flow_file(self):
+        output = parse_flow_file(self.write('h1.bbr', FLOW_LINES))
+        self.assertEqual(set(output), set([None, TUPLE]))
+
+        bbr, cwnd = output[None]
+        self.assertEqual(bbr, ([1.0], [5000000.0], [20.0], [1.25], [2.0], [100000.0]))
+        self.assertEqual(cwnd, ([1.0], [10], [20]))
+
+        bbr, cwnd = output[TUPLE]
+        self.assertEqual(bbr[0], [2.0, 3.0, 4.0])
+        self.assertEqual(bbr[1], [5000000.0, 2500000.0, 1000000.0])
+        self.assertEqual(bbr[2], [20.0, 30.5, 25.0])
+        # gains are zero if missing
+        self.assertEqual(bbr[3], [1.25, 2.88672, 0])
+        self.assertEqual(cwnd, ([2.0, 3.0, 4.0, 5.0], [11, 12, 13, 14], [0, 0, 0, 7]))
+
+    def test_buffer_line(self):
+        self.assertEqual(BUFFER_LINE.findall('1.5;12Kb\n2.5;1500;3\nnot a sample\n'),
+                         [('1.5', '12', 'K'), ('2.5', '1500', '')])
+
+    def test_parse_buffer_file(self):
+        path = self.write('s1-eth2.buffer', ['1.0;1500', '2.0;12Kb', '3.0;1.5M;1', 'garbage'])
+        self.assertEqual(parse_buffer_file(path), ([1.0, 2.0, 3.0], [12000.0, 96000.0, 12000000.0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
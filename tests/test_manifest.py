@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from analyze import is_complete
+from helper import MANIFEST_FILE, PCAP1
+from helper.manifest import Manifest, input_files
+from helper.synthetic import generate_result_directory
+
+
+class ManifestTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, 'run')
+        generate_result_directory(self.path, flows=2, duration=1, rate=50)
+        self.output = os.path.join(self.path, 'output.csv')
+        with open(self.output, 'w') as f:
+            f.write('0,1\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def record(self, options=None):
+        manifest = Manifest(self.path)
+        key = manifest.key(input_files(self.path), options or {'delta_t': 0.1})
+        manifest.record('csv', key, [self.output], source=key)
+        return key
+
+    def test_unchanged_run_is_skipped(self):
+        key = self.record()
+        manifest = Manifest(self.path)
+        self.assertTrue(manifest.is_current('csv', key=key))
+        self.assertTrue(manifest.is_current('csv', source=key))
+        self.assertTrue(is_complete(manifest, 'csv'))
+        # the plots were never created
+        self.assertFalse(is_complete(manifest, 'csv+pdf'))
+        self.assertEqual(manifest.key(input_files(self.path), {'delta_t': 0.1}), key)
+
+    def test_changed_options(self):
+        key = self.record()
+        manifest = Manifest(self.path)
+        self.assertNotEqual(manifest.key(input_files(self.path), {'delta_t': 0.2}), key)
+
+    def test_changed_input(self):
+        key = self.record()
+        with open(os.path.join(self.path, PCAP1), 'ab') as f:
+            f.write(b'\0')
+        manifest = Manifest(self.path)
+        self.assertFalse(manifest.is_current('csv', key=manifest.key(input_files(self.path), {'delta_t': 0.1})))
+        # the outputs are still intact, only the key differs
+        self.assertTrue(manifest.is_current('csv', key=key))
+
+    def test_changed_output(self):
+        key = self.record()
+        with open(self.output, 'a') as f:
+            f.write('1,2\n')
+        self.assertFalse(Manifest(self.path).is_current('csv', key=key))
+        os.remove(self.output)
+        self.assertFalse(Manifest(self.path).is_current('csv', key=key))
+
+    def test_invalidate(self):
+        key = self.record()
+        Manifest(self.path).invalidate('csv')
+        self.assertFalse(Manifest(self.path).is_current('csv', key=key))
+
+    def test_truncated_manifest(self):
+        self.record()
+        with open(os.path.join(self.path, MANIFEST_FILE), 'w') as f:
+            f.write('{"version": 1, "fi')
+        manifest = Manifest(self.path)
+        self.assertEqual((manifest.files, manifest.stages), ({}, {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import random
+import unittest
+
+import numpy as np
+
+from helper.quantiles import QuantileSketch, QUANTILES, summarize
+
+
+class QuantileSketchTest(unittest.TestCase):
+
+    def setUp(self):
+        generator = random.Random(1)
+        self.values = [generator.lognormvariate(3, 1) for _ in range(5000)]
+
+    def sketch(self, values, relative_accuracy=0.01):
+        sketch = QuantileSketch(relative_accuracy)
+        for v in values:
+            sketch.add(v)
+        return sketch
+
+    def test_relative_accuracy(self):
+        sketch = self.sketch(self.values)
+        exact = np.sort(self.values)
+        for q in QUANTILES:
+            # the rank of the sketch, the lower of the two values np.percentile interpolates between
+            value = exact[int(q / 100.0 * (len(exact) - 1))]
+            self.assertLessEqual(abs(sketch.quantile(q / 100.0) - value), 0.01 * value)
+
+        summary = summarize(self.values)
+        self.assertEqual(sketch.count, summary['count'])
+        self.assertAlmostEqual(sketch.mean, summary['mean'])
+        self.assertAlmostEqual(sketch.summary()['std'], summary['std'])
+        self.assertEqual((sketch.min, sketch.max), (summary['min'], summary['max']))
+
+    def test_merge(self):
+        values = self.values + [0, -1.5, -20]
+        merged = self.sketch(values[:1000])
+        merged.merge(self.sketch(values[1000:]))
+        merged.merge(QuantileSketch())
+        whole = self.sketch(values)
+        self.assertEqual((merged.positive, merged.negative, merged.zero), (whole.positive, whole.negative, whole.zero))
+        self.assertEqual(merged.summary()['quantiles'], whole.summary()['quantiles'])
+        self.assertAlmostEqual(merged.mean, whole.mean)
+        self.assertAlmostEqual(merged.m2, whole.m2, places=3)
+        self.assertEqual((merged.min, merged.max), (-20, whole.max))
+
+    def test_merge_different_accuracy(self):
+        self.assertRaises(ValueError, QuantileSketch(0.01).merge, QuantileSketch(0.02))
+
+    def test_empty(self):
+        self.assertTrue(np.isnan(QuantileSketch().quantile(0.5)))
+
+
+if __name__ == '__main__':
+    unittest.main()
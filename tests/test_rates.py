@@ -0,0 +1,31 @@
+import unittest
+
+import numpy as np
+
+from helper.rates import CumulativeSeries, sliding_rates
+
+
+class CumulativeSeriesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.series = CumulativeSeries()
+        for ts in [0.1, 0.2, 0.3, 0.6, 1.2]:
+            self.series.add(ts, 1000)
+
+    def test_rates(self):
+        # the window (g - window, g] includes its end but not its start
+        rates = self.series.rates(np.array([0.2, 0.5, 1.0, 1.5]), 0.5)
+        np.testing.assert_allclose(rates, [4000, 6000, 2000, 2000])
+        self.assertEqual(self.series.total, 5000)
+
+    def test_sliding_rates(self):
+        empty = CumulativeSeries()
+        rates, total = sliding_rates({0: self.series, 1: empty}, [0.5, 1.0, 1.5], {0: 0.5, 1: 0.5})
+        # only the grid points between the first and the last packet
+        self.assertEqual(rates[0][0], [0.5, 1.0, 1.5])
+        self.assertEqual(rates[1], ([], []))
+        np.testing.assert_allclose(total[1], [6000, 2000, 2000])
+
+
+if __name__ == '__main__':
+    unittest.main()
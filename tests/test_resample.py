@@ -0,0 +1,46 @@
+import unittest
+
+import numpy as np
+
+from helper.resample import TimeGrid, HOLD, MEAN, SUM
+
+
+class TimeGridTest(unittest.TestCase):
+
+    def setUp(self):
+        self.grid = TimeGrid([1.0, 2.0, 3.0, 4.0])
+        # a sample belongs to the first bin ending at or after it, 4.5 is after the last bin
+        self.series = {
+            1: ([1.0, 1.5, 2.0, 3.5, 4.5], [10, 20, 30, 40, 50]),
+            0: ([2.5], [5]),
+        }
+
+    def assert_rows(self, output, rows):
+        np.testing.assert_array_equal(output, np.array(rows, dtype=float))
+
+    def test_hold(self):
+        connections, output = self.grid.resample(self.series, method=HOLD)
+        self.assertEqual(connections, [0, 1])
+        self.assert_rows(output, [[np.nan, np.nan, 5, np.nan],
+                                  [10, 30, 30, 40]])
+
+    def test_mean(self):
+        _, output = self.grid.resample(self.series, method=MEAN, fill=0)
+        self.assert_rows(output, [[0, 0, 5, 0],
+                                  [10, 25, 0, 40]])
+
+    def test_sum(self):
+        _, output = self.grid.resample(self.series, method=SUM)
+        self.assert_rows(output, [[0, 0, 5, 0],
+                                  [10, 50, 0, 40]])
+
+    def test_unknown_method(self):
+        self.assertRaises(ValueError, self.grid.resample, self.series, method='median')
+
+    def test_regular(self):
+        np.testing.assert_allclose(TimeGrid.regular(0.0, 0.1, 0.5).times, [0.0, 0.1, 0.2, 0.3, 0.4, 0.5])
+        self.assertEqual(list(TimeGrid.events(self.series).times), [1.0, 1.5, 2.0, 2.5, 3.5, 4.5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import analyze
+from helper import PARAMETERS_FILE
+from helper.csv_writer import write_to_csv
+from helper.results_index import open_index, index_run
+from helper.synthetic import generate_result_directory
+
+COMMANDS = ['host, bbr, 20ms, 0, 2', 'host, cubic, 30ms, 0, 2', 'host, bbr, 40ms, 0, 2']
+
+
+class ResultsIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, 'run')
+        # the SYN of the first flow passes the bottleneck last
+        generate_result_directory(self.path, flows=3, duration=2, rate=200, syn_loss=[0])
+        with open(os.path.join(self.path, PARAMETERS_FILE), 'w') as f:
+            f.write('\n'.join(['Test Name: synthetic', 'Commands: '] + COMMANDS))
+        self.pcap_data = analyze.parse_pcap(self.path, 0.1)
+        write_to_csv(self.path, self.pcap_data, 'none')
+        self.db = open_index(':memory:')
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.root)
+
+    def test_flows_keyed_by_connection(self):
+        self.assertTrue(index_run(self.db, self.root, self.path))
+        rows = self.db.execute('SELECT connection, host, client, algorithm, rtt, throughput_share, retransmissions '
+                               'FROM flows ORDER BY connection').fetchall()
+        self.assertEqual(len(rows), 3)
+        # the flows send different amounts, so the share behind the bottleneck identifies the flow
+        sent = [sum(self.pcap_data.sending_rate[c][1]) for c in range(3)]
+        for c, host, client, algorithm, rtt, share, retransmissions in rows:
+            self.assertEqual(host, c)
+            self.assertEqual(client, '10.1.0.{}'.format(c))
+            self.assertEqual((algorithm, rtt), tuple(COMMANDS[c].split(', ')[1:3]))
+            self.assertAlmostEqual(share, sent[c] / sum(sent), delta=0.01)
+            self.assertEqual(retransmissions, len(self.pcap_data.retransmissions[c][0]))
+
+    def test_unchanged_run_is_skipped(self):
+        self.assertTrue(index_run(self.db, self.root, self.path))
+        self.assertFalse(index_run(self.db, self.root, self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import socket
+import struct
+import unittest
+
+from helper.netlink import pack_attribute
+from helper.sock_diag import INET_DIAG_MSG, INET_DIAG_INFO, INET_DIAG_BBRINFO, TCP_INFO, TCP_INFO_FIELDS, \
+    TCP_BBR_INFO, TCP_INFINITE_SSTHRESH, parse_diag_message
+
+
+def diag_message(attributes):
+    header = INET_DIAG_MSG.pack(socket.AF_INET, 1, 0, 0, socket.htons(45678), socket.htons(9000),
+                                socket.inet_aton('10.1.0.1') + b'\0' * 12, socket.inet_aton('10.2.0.1') + b'\0' * 12,
+                                0, b'\0' * 8, 0, 0, 0, 0, 0)
+    return header + b''.join(pack_attribute(t, payload) for t, payload in attributes)
+
+
+def tcp_info(**fields):
+    values = list(TCP_INFO.unpack(b'\0' * TCP_INFO.size))
+    for name, value in fields.items():
+        values[TCP_INFO_FIELDS[name]] = value
+    return TCP_INFO.pack(*values)
+
+
+class ParseDiagMessageTest(unittest.TestCase):
+
+    def test_tcp_info(self):
+        info = tcp_info(rtt=20500, snd_ssthresh=30, snd_cwnd=42, total_retrans=3, pacing_rate=1250000,
+                        delivery_rate=1000000)
+        sample = parse_diag_message(diag_message([(INET_DIAG_INFO, info)]))
+        self.assertEqual((sample.src, sample.sport, sample.dst, sample.dport), ('10.1.0.1', 45678, '10.2.0.1', 9000))
+        self.assertEqual(sample.cwnd, 42)
+        self.assertEqual(sample.ssthresh, 30)
+        self.assertAlmostEqual(sample.rtt, 20.5)
+        self.assertEqual(sample.retrans, 3)
+        # rates in bit/s
+        self.assertEqual(sample.pacing_rate, 10000000)
+        self.assertEqual(sample.delivery_rate, 8000000)
+        self.assertIsNone(sample.bbr)
+
+    def test_bbr_info(self):
+        # bandwidth in bytes/s split into two words, gains in units of 1/256
+        bbr = TCP_BBR_INFO.pack(1250000, 1, 20000, 320, 512)
+        info = tcp_info(snd_ssthresh=TCP_INFINITE_SSTHRESH, snd_cwnd=10)
+        sample = parse_diag_message(diag_message([(INET_DIAG_INFO, info), (INET_DIAG_BBRINFO, bbr)]))
+        self.assertIsNone(sample.ssthresh)
+        self.assertEqual(sample.bbr, (((1 << 32) + 1250000) * 8, 20.0, 1.25, 2.0))
+
+    def test_short_tcp_info(self):
+        # older kernels end tcp_info before pacing_rate
+        info = tcp_info(snd_cwnd=7, pacing_rate=1000)[:struct.calcsize('=8B24I')]
+        sample = parse_diag_message(diag_message([(INET_DIAG_INFO, info)]))
+        self.assertEqual(sample.cwnd, 7)
+        self.assertEqual(sample.pacing_rate, 0)
+
+    def test_without_tcp_info(self):
+        self.assertIsNone(parse_diag_message(diag_message([])))
+        self.assertIsNone(parse_diag_message(b'\0' * (INET_DIAG_MSG.size - 1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
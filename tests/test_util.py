@@ -0,0 +1,70 @@
+import time
+import unittest
+
+from helper.util import monotonic, parse_rate, parse_size, parse_time, parse_with_units, RATE_UNITS
+from helper.util import parse_cpu_list, format_cpu_list, cpu_layout
+
+
+class MonotonicTest(unittest.TestCase):
+
+    def test_advances_with_sleep(self):
+        start = monotonic()
+        time.sleep(0.05)
+        elapsed = monotonic() - start
+        self.assertGreaterEqual(elapsed, 0.05)
+        self.assertLess(elapsed, 1)
+
+    def test_independent_of_wall_clock(self):
+        # the monotonic clock counts from boot, not from the epoch
+        self.assertLess(monotonic(), time.time() / 2)
+
+
+class ParseWithUnitsTest(unittest.TestCase):
+
+    def test_rate(self):
+        self.assertEqual(parse_rate('10mbit'), 1250000)
+        self.assertEqual(parse_rate('2.5Mbps'), 2500000)
+        self.assertAlmostEqual(parse_with_units('1bit', RATE_UNITS), 0.125)
+
+    def test_size(self):
+        self.assertEqual(parse_size('1600b'), 1600)
+        self.assertEqual(parse_size('100kb'), 102400)
+        self.assertEqual(parse_size('1mbit'), 131072)
+
+    def test_time(self):
+        self.assertAlmostEqual(parse_time('50ms'), 0.05)
+        self.assertAlmostEqual(parse_time('1.5s'), 1.5)
+        self.assertAlmostEqual(parse_time('20us'), 2e-5)
+
+    def test_errors(self):
+        with self.assertRaises(ValueError) as error:
+            parse_rate('mbit')
+        self.assertIn('Malformed rate', str(error.exception))
+        with self.assertRaises(ValueError) as error:
+            parse_size('10q')
+        self.assertIn('Unknown size unit', str(error.exception))
+        self.assertRaises(ValueError, parse_with_units, '', RATE_UNITS)
+
+
+class CpuListTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        self.assertEqual(parse_cpu_list('0-3,8'), [0, 1, 2, 3, 8])
+        self.assertEqual(format_cpu_list([0, 1, 2, 3, 8]), '0-3,8')
+        self.assertEqual(format_cpu_list(parse_cpu_list('8,2-3,0-1')), '0-3,8')
+
+    def test_malformed(self):
+        for string in ['3-1', '', '1,,2', 'a-b']:
+            self.assertRaises(ValueError, parse_cpu_list, string)
+
+    def test_layout(self):
+        # the measurement processes get the last CPUs
+        self.assertEqual(cpu_layout('0-3,8', 2), ([0, 1, 2], [3, 8]))
+
+    def test_layout_without_host_cpus(self):
+        self.assertRaises(ValueError, cpu_layout, '0-3', 4)
+        self.assertRaises(ValueError, cpu_layout, '0-3', 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
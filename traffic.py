@@ -0,0 +1,244 @@
+import argparse
+import errno
+import os
+import random
+import resource
+import select
+import socket
+import sys
+import tempfile
+
+from helper import WORKLOAD_DISTRIBUTIONS
+from helper.util import parse_rate, parse_size, print_error, monotonic
+from helper.zero_copy import sendfile, splice, SPLICE_F_MOVE, SPLICE_F_MORE, SPLICE_F_NONBLOCK
+
+
+SEND_BUFFER_SIZE = 4 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+SO_MAX_PACING_RATE = 47
+
+PARETO_SHAPE = 1.5
+
+
+def create_send_buffer(size):
+    """
+    Fill a file in shared memory with random data once. Sending from it with sendfile avoids
+    generating and copying data through userspace for every packet.
+    """
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else None
+    f = tempfile.TemporaryFile(dir=directory)
+    f.write(os.urandom(size))
+    f.flush()
+    return f
+
+
+def raise_file_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def send(host, port, rate=None):
+    buffer_file = create_send_buffer(SEND_BUFFER_SIZE)
+
+    sock = socket.create_connection((host, port))
+    if rate is not None:
+        # Paced by the fq qdisc of the sender, no application timers involved
+        sock.setsockopt(socket.SOL_SOCKET, SO_MAX_PACING_RATE, parse_rate(rate))
+
+    offset = 0
+    try:
+        while True:
+            sent = sendfile(sock.fileno(), buffer_file.fileno(), offset, min(CHUNK_SIZE, SEND_BUFFER_SIZE - offset))
+            if sent == 0:
+                break
+            offset = (offset + sent) % SEND_BUFFER_SIZE
+    except (IOError, OSError):
+        # receiver closed the connection
+        pass
+    finally:
+        sock.close()
+        buffer_file.close()
+
+
+class ShortFlow:
+    def __init__(self, host, port, size):
+        self.size = size
+        self.sent = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setblocking(False)
+        self.sock.connect_ex((host, port))
+
+    def fileno(self):
+        return self.sock.fileno()
+
+
+def flow_sizes(mean_size, distribution, rng):
+    if distribution == 'pareto':
+        scale = mean_size * (PARETO_SHAPE - 1) / PARETO_SHAPE
+        while True:
+            yield max(1, int(rng.paretovariate(PARETO_SHAPE) * scale))
+    elif distribution == 'exponential':
+        while True:
+            yield max(1, int(rng.expovariate(1.0 / mean_size)))
+    else:
+        while True:
+            yield mean_size
+
+
+def workload(host, port, arrival_rate, mean_size, distribution, duration, seed=None):
+    """
+    Open short flows with Poisson arrivals and random sizes. All flows are driven by one epoll loop,
+    each flow sends its data with sendfile and is closed as soon as all data is queued, which sends the FIN.
+    """
+    raise_file_limit()
+    buffer_file = create_send_buffer(SEND_BUFFER_SIZE)
+
+    rng = random.Random(seed)
+    sizes = flow_sizes(mean_size, distribution, rng)
+    epoll = select.epoll()
+    flows = {}
+
+    start = monotonic()
+    next_arrival = start + rng.expovariate(arrival_rate)
+
+    try:
+        while True:
+            now = monotonic()
+            while next_arrival <= now and next_arrival - start < duration:
+                flow = ShortFlow(host, port, next(sizes))
+                flows[flow.fileno()] = flow
+                epoll.register(flow.fileno(), select.EPOLLOUT)
+                next_arrival += rng.expovariate(arrival_rate)
+
+            if next_arrival - start >= duration and len(flows) == 0:
+                break
+
+            timeout = max(0, next_arrival - monotonic()) if next_arrival - start < duration else 1
+            for fd, event in epoll.poll(timeout):
+                flow = flows[fd]
+                if event & (select.EPOLLERR | select.EPOLLHUP):
+                    finish_flow(epoll, flows, flow)
+                    continue
+                try:
+                    while flow.sent < flow.size:
+                        offset = flow.sent % SEND_BUFFER_SIZE
+                        count = min(flow.size - flow.sent, SEND_BUFFER_SIZE - offset, CHUNK_SIZE)
+                        flow.sent += sendfile(fd, buffer_file.fileno(), offset, count)
+                except (IOError, OSError) as e:
+                    if e.errno != errno.EAGAIN:
+                        finish_flow(epoll, flows, flow)
+                    continue
+                finish_flow(epoll, flows, flow)
+    finally:
+        for flow in list(flows.values()):
+            finish_flow(epoll, flows, flow)
+        epoll.close()
+        buffer_file.close()
+
+
+def finish_flow(epoll, flows, flow):
+    fd = flow.fileno()
+    epoll.unregister(fd)
+    del flows[fd]
+    flow.sock.close()
+
+
+def sink(port):
+    """
+    Accept any number of concurrent connections and discard their data with splice into /dev/null.
+    """
+    raise_file_limit()
+
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('', port))
+    server.listen(1024)
+    server.setblocking(False)
+
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    pipe_read, pipe_write = os.pipe()
+
+    epoll = select.epoll()
+    epoll.register(server.fileno(), select.EPOLLIN)
+    connections = {}
+
+    while True:
+        for fd, _ in epoll.poll():
+            if fd == server.fileno():
+                while True:
+                    try:
+                        conn, _ = server.accept()
+                    except (IOError, OSError, socket.error):
+                        break
+                    conn.setblocking(False)
+                    connections[conn.fileno()] = conn
+                    epoll.register(conn.fileno(), select.EPOLLIN)
+                continue
+
+            closed = False
+            try:
+                while True:
+                    received = splice(fd, pipe_write, CHUNK_SIZE, SPLICE_F_MOVE | SPLICE_F_MORE | SPLICE_F_NONBLOCK)
+                    if received == 0:
+                        closed = True
+                        break
+                    # the pipe is always drained completely, so it can be shared by all connections
+                    while received > 0:
+                        received -= splice(pipe_read, devnull, received)
+            except (IOError, OSError) as e:
+                closed = e.errno != errno.EAGAIN
+
+            if closed:
+                epoll.unregister(fd)
+                connections.pop(fd).close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='TCP traffic generator using sendfile and a splice sink.')
+    subparsers = parser.add_subparsers(dest='mode')
+
+    send_parser = subparsers.add_parser('send', help='Send data to a sink until terminated.')
+    send_parser.add_argument('host', help='Address of the receiver.')
+    send_parser.add_argument('port', type=int, help='Port of the receiver.')
+    send_parser.add_argument('--rate', dest='rate',
+                             help='Application rate limit in tc notation, e.g. 10mbit. (default: unlimited)')
+
+    workload_parser = subparsers.add_parser('workload', help='Send short flows with Poisson arrivals to a sink.')
+    workload_parser.add_argument('host', help='Address of the receiver.')
+    workload_parser.add_argument('port', type=int, help='Port of the receiver.')
+    workload_parser.add_argument('--arrival-rate', dest='arrival_rate', type=float, required=True,
+                                 help='Mean number of new flows per second.')
+    workload_parser.add_argument('--size', dest='size', required=True,
+                                 help='Mean flow size in tc notation, e.g. 100kb.')
+    workload_parser.add_argument('--distribution', dest='distribution', choices=WORKLOAD_DISTRIBUTIONS,
+                                 default=WORKLOAD_DISTRIBUTIONS[0],
+                                 help='Distribution of the flow sizes. (default: {})'.format(WORKLOAD_DISTRIBUTIONS[0]))
+    workload_parser.add_argument('--duration', dest='duration', type=float, required=True,
+                                 help='Time in seconds during which new flows are started.')
+    workload_parser.add_argument('--seed', dest='seed', type=int,
+                                 help='Seed of the random number generator.')
+
+    sink_parser = subparsers.add_parser('sink', help='Accept connections and discard all data.')
+    sink_parser.add_argument('port', type=int, help='Port to listen on.')
+
+    args = parser.parse_args()
+
+    try:
+        if args.mode == 'send':
+            send(args.host, args.port, args.rate)
+        elif args.mode == 'workload':
+            workload(args.host, args.port, args.arrival_rate, parse_size(args.size), args.distribution,
+                     args.duration, args.seed)
+        else:
+            sink(args.port)
+    except KeyboardInterrupt:
+        pass
+    except (IOError, OSError, ValueError) as e:
+        print_error(e)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())